@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+"""
+结构化API索引
+
+从 xtdata.html / xttrader.html 中提取函数签名与参数、数据结构字段和数据字典枚举值，
+同时写出 JSON 和 SQLite 两种格式，供外部工具按名称直接查询，而不必对整份Markdown
+做正则匹配。
+
+输出：
+    <文档目录>/api_index.json      完整索引
+    <文档目录>/api_index.sqlite    functions/parameters、structures/fields、
+                                   enums/enum_values 六张表，按 name、module 建索引
+
+用法：
+    uv run python api_index.py                  # 重新生成索引
+    uv run python api_index.py --lookup XtTrade # 查询
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+from html_backends import ELEMENT, TEXT, get_backend
+from md_common import atomic_open, atomic_path
+
+
+DOCS_DIR = Path("./QMT-API/QMT_Docs")
+INDEX_JSON = "api_index.json"
+INDEX_DB = "api_index.sqlite"
+
+# 页面文件名 -> 模块名
+API_PAGES = {
+    "xtdata.html": "xtdata",
+    "xttrader.html": "xttrader",
+}
+
+INDEX_VERSION = 1
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# 代码块首行形如 get_market_data(...) 时视为函数签名
+SIGNATURE_RE = re.compile(r'^\s*([A-Za-z_][\w.]*)\s*\(')
+# 参数条目："name - type 说明"，类型只取ASCII标识符
+PARAM_RE = re.compile(r'^([A-Za-z_]\w*)\s*-\s*(.*)$', re.S)
+PARAM_TYPE_RE = re.compile(r'^([A-Za-z_][\w.\[\],]*)(?:\s+(.*))?$', re.S | re.ASCII)
+# 字段列表代码块："'name'  #说明"
+FIELD_LINE_RE = re.compile(r"""^\s*['"]([^'"]+)['"]\s*(?:#\s*(.*))?$""")
+# 数据字典代码块："11 - 说明"、"0,10 - 说明"
+ENUM_LINE_RE = re.compile(r'^\s*([-\w,，]+)\s*-\s*(.+)$')
+# 数据字典列表项："上交所 - `xtconstant.SH_MARKET`"
+ENUM_ITEM_RE = re.compile(r'^(.*?)\s*-\s*`?(xtconstant\.\w+)`?\s*$')
+# 标题末尾的英文名称："委托XtOrder" -> XtOrder
+TRAILING_NAME_RE = re.compile(r'([A-Za-z_]\w*)$')
+# 数据字典标题中的字段名："交易市场(market)" -> market
+PAREN_NAME_RE = re.compile(r'[(（]\s*([A-Za-z_]\w*)\s*[)）]\s*$')
+
+# 函数说明列表中的小节
+FUNCTION_PARTS = {"释义": "description", "参数": "parameters", "返回": "returns", "备注": "notes"}
+
+
+# ================================================================================================
+# 页面结构
+# ================================================================================================
+
+def content_blocks(root) -> list:
+    """
+    返回正文区域中按顺序排列的块级元素
+
+    VuePress 页面的正文是一串平铺的标题、段落、列表、表格和代码块，外面包着若干层
+    只有一个子元素的 div。
+    """
+    node = root.find('div', class_='theme-default-content') or root.find('main') or root.find('body') or root
+    while True:
+        elements = [child for child in node.children() if child.kind == ELEMENT]
+        if len(elements) != 1 or elements[0].tag in HEADING_TAGS:
+            return elements
+        node = elements[0]
+
+
+def heading_title(node) -> str:
+    """标题文本（去掉锚点链接的 "#"）"""
+    return node.get_text().strip().lstrip('#').strip()
+
+
+def own_text(node) -> str:
+    """元素自身的文本，不含嵌套列表和代码块"""
+    parts = []
+    for child in node.children():
+        if child.kind == TEXT:
+            parts.append(child.text)
+        elif child.kind == ELEMENT and child.tag not in ('ul', 'ol') and not is_code_block(child):
+            parts.append(child.get_text())
+    return " ".join("".join(parts).split())
+
+
+def sub_items(node) -> list:
+    """元素下一级列表中的 li"""
+    items = []
+    for lst in node.find_all(['ul', 'ol'], recursive=False):
+        items.extend(lst.find_all('li', recursive=False))
+    return items
+
+
+def item_lines(node, depth: int = 0) -> list[str]:
+    """把嵌套列表展开成带缩进的文本行"""
+    lines = []
+    for item in sub_items(node):
+        lines.append("  " * depth + own_text(item))
+        lines.extend(item_lines(item, depth + 1))
+    return lines
+
+
+def code_text(node) -> str:
+    """代码块的源码（不含行号）"""
+    pre = node.find('pre')
+    return (pre or node).get_text()
+
+
+def table_rows(node) -> list[list[str]]:
+    """表格的所有行（含表头），每行是单元格文本列表"""
+    rows = []
+    for tr in node.find_all('tr'):
+        rows.append([" ".join(cell.get_text().split()) for cell in tr.find_all(['th', 'td'], recursive=False)])
+    return rows
+
+
+def class_names(node) -> list[str]:
+    """元素的 class 列表（BeautifulSoup 返回列表，其他后端返回字符串）"""
+    value = node.get('class') or []
+    return value.split() if isinstance(value, str) else list(value)
+
+
+def is_code_block(node) -> bool:
+    return node.tag == 'pre' or (node.tag == 'div' and any(c.startswith('language-') for c in class_names(node)))
+
+
+# ================================================================================================
+# 提取
+# ================================================================================================
+
+def parse_signature(text: str) -> tuple[str, list[dict]] | None:
+    """
+    解析函数签名
+
+    :param text: 代码块源码，首行以 name( 开头，签名可以跨多行
+    :return: (签名, 参数列表)，不是签名时返回 None
+    """
+    if not SIGNATURE_RE.match(text):
+        return None
+    depth = 0
+    for end, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+    signature = text[:end + 1].strip()
+    params = []
+    try:
+        call = ast.parse(signature, mode='eval').body
+    except SyntaxError:
+        return " ".join(signature.split()), params
+    if not isinstance(call, ast.Call):
+        return None
+    for arg in call.args:
+        segment = ast.get_source_segment(signature, arg)
+        params.append({"name": segment.lstrip('*'), "type": None, "default": None, "description": None})
+    for keyword in call.keywords:
+        params.append({
+            "name": keyword.arg or "**" + ast.get_source_segment(signature, keyword.value),
+            "type": None,
+            "default": ast.get_source_segment(signature, keyword.value) if keyword.arg else None,
+            "description": None,
+        })
+    return " ".join(signature.split()), params
+
+
+def parse_parameter(text: str) -> dict | None:
+    """解析参数条目 "name - type 说明" """
+    m = PARAM_RE.match(text)
+    if not m:
+        return None
+    name, rest = m.group(1), m.group(2).strip()
+    m_type = PARAM_TYPE_RE.match(rest)
+    if m_type:
+        return {"name": name, "type": m_type.group(1), "description": (m_type.group(2) or "").strip()}
+    return {"name": name, "type": None, "description": rest}
+
+
+def fill_function(function: dict, node) -> None:
+    """用签名后面的说明列表（释义/参数/返回/备注）补全函数条目"""
+    for item in node.find_all('li', recursive=False):
+        part = FUNCTION_PARTS.get(own_text(item))
+        if part is None:
+            continue
+        if part != "parameters":
+            function[part] = "\n".join(item_lines(item)) or None
+            continue
+
+        params = {p["name"]: p for p in function["parameters"]}
+        last = None
+        for sub in sub_items(item):
+            text = own_text(sub)
+            extra = item_lines(sub)
+            parsed = parse_parameter(text)
+            if parsed is None:
+                # "默认参数，..." 之类的续行归入上一个参数
+                if last is not None:
+                    last["description"] = "\n".join(filter(None, [last["description"], text, *extra]))
+                continue
+            if parsed["name"] not in params:
+                params[parsed["name"]] = {"name": parsed["name"], "type": None, "default": None, "description": None}
+                function["parameters"].append(params[parsed["name"]])
+            last = params[parsed["name"]]
+            last["type"] = parsed["type"]
+            last["description"] = "\n".join(filter(None, [parsed["description"], *extra]))
+
+
+def new_section(module: str, heading, path: list[str]) -> dict:
+    return {"module": module, "section": " / ".join(path[:-1]), "title": path[-1], "anchor": heading.get("id")}
+
+
+def extract_page(root, module: str) -> dict:
+    """
+    从一个页面中提取函数、数据结构和枚举
+
+    :param root: 解析后的页面
+    :param module: 模块名
+    :return: {"functions": [...], "structures": [...], "enums": [...]}
+    """
+    functions, structures, enums = [], [], []
+    path: list[str] = []
+    levels: list[int] = []
+    heading = None          # 当前标题元素
+    first_block = False     # 当前块是否紧跟在标题后面
+    function = None         # 当前标题下的函数（等待说明列表）
+    structure = None        # 当前标题下的字段列表
+    enum = None             # 当前标题下的枚举
+
+    for block in content_blocks(root):
+        if block.tag in HEADING_TAGS:
+            level = int(block.tag[1])
+            while levels and levels[-1] >= level:
+                levels.pop()
+                path.pop()
+            levels.append(level)
+            path.append(heading_title(block))
+            heading, first_block = block, True
+            function = structure = enum = None
+            continue
+        if heading is None:
+            continue
+
+        after_heading, first_block = first_block, False
+        in_dictionary = any("数据字典" in title for title in path[:-1])
+        in_field_list = any("字段列表" in title for title in path)
+
+        if is_code_block(block):
+            text = code_text(block)
+            parsed = parse_signature(text) if after_heading else None
+            if parsed:
+                signature, params = parsed
+                function = {
+                    **new_section(module, heading, path),
+                    "name": SIGNATURE_RE.match(text).group(1),
+                    "signature": signature,
+                    "description": None, "returns": None, "notes": None,
+                    "parameters": params,
+                }
+                functions.append(function)
+            elif in_dictionary:
+                if enum is None:
+                    enum = new_enum(module, heading, path)
+                    enums.append(enum)
+                for line in text.splitlines():
+                    m = ENUM_LINE_RE.match(line)
+                    if m:
+                        enum["values"].append({"name": None, "value": m.group(1), "label": m.group(2).strip(), "group": None})
+            elif in_field_list:
+                if structure is None:
+                    structure = new_structure(module, heading, path, "field_list")
+                    structures.append(structure)
+                for line in text.splitlines():
+                    m = FIELD_LINE_RE.match(line)
+                    if m:
+                        structure["fields"].append({"name": m.group(1), "type": None, "description": (m.group(2) or "").strip()})
+
+        elif block.tag in ('ul', 'ol'):
+            if function is not None:
+                fill_function(function, block)
+                function = None
+            elif in_dictionary:
+                if enum is None:
+                    enum = new_enum(module, heading, path)
+                    enums.append(enum)
+                collect_enum_items(enum, block)
+
+        elif block.tag == 'table':
+            rows = table_rows(block)
+            if not rows:
+                continue
+            header, body = rows[0], rows[1:]
+            if header[:2] == ["枚举变量名", "值"]:
+                if enum is None:
+                    enum = new_enum(module, heading, path)
+                    enums.append(enum)
+                for row in body:
+                    row += [""] * (3 - len(row))
+                    enum["values"].append({"name": row[0], "value": row[1], "label": row[2], "group": None})
+            elif header and header[0] in ("属性", "字段", "参数"):
+                structure = new_structure(module, heading, path, "table")
+                for row in body:
+                    row += [""] * (3 - len(row))
+                    structure["fields"].append({"name": row[0], "type": row[1] or None, "description": row[2]})
+                structures.append(structure)
+
+    return {"functions": functions, "structures": structures, "enums": [e for e in enums if e["values"] or e["applies_to"]]}
+
+
+def new_structure(module: str, heading, path: list[str], kind: str) -> dict:
+    title = path[-1]
+    if kind == "table":
+        m = TRAILING_NAME_RE.search(title)
+        name = m.group(1) if m else title
+    else:
+        # "tick - 分笔数据" -> tick
+        name = title.split(" - ")[0].strip()
+    return {**new_section(module, heading, path), "name": name, "kind": kind, "fields": []}
+
+
+def new_enum(module: str, heading, path: list[str]) -> dict:
+    title = path[-1]
+    m = PAREN_NAME_RE.search(title)
+    return {**new_section(module, heading, path), "name": m.group(1) if m else title, "values": [], "applies_to": []}
+
+
+def collect_enum_items(enum: dict, node, group: str | None = None) -> None:
+    """收集数据字典列表中的枚举项，没有常量的上级列表项作为分组名"""
+    for item in node.find_all('li', recursive=False):
+        text = own_text(item)
+        m = ENUM_ITEM_RE.match(text)
+        if m:
+            enum["values"].append({"name": m.group(2), "value": None, "label": m.group(1).strip(), "group": group})
+        else:
+            # "level2逐笔委托 - `entrustType`委托类型"：说明该枚举用于哪个字段
+            for code in item.find_all('code', recursive=False):
+                enum["applies_to"].append(code.get_text().strip())
+        for lst in item.find_all(['ul', 'ol'], recursive=False):
+            collect_enum_items(enum, lst, text if not m else group)
+
+
+# ================================================================================================
+# 构建与输出
+# ================================================================================================
+
+def extractor_fingerprint() -> str:
+    """提取代码的指纹（代码变化后索引需要重建）"""
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def build_index(docs_dir: Path = DOCS_DIR, backend_name: str = "auto") -> dict:
+    """
+    解析 API 页面并生成索引
+
+    :param docs_dir: 保存HTML页面的目录
+    :param backend_name: HTML解析后端名称
+    :return: 索引数据
+    """
+    backend = get_backend(backend_name)
+    index = {"version": INDEX_VERSION, "extractor": extractor_fingerprint(), "sources": {},
+             "functions": [], "structures": [], "enums": []}
+    for page, module in API_PAGES.items():
+        path = Path(docs_dir) / page
+        if not path.exists():
+            print(f"✗ 页面不存在，跳过: {path}")
+            continue
+        html = path.read_text(encoding='utf-8')
+        index["sources"][page] = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        extracted = extract_page(backend.parse(html), module)
+        for key in ("functions", "structures", "enums"):
+            index[key].extend(extracted[key])
+    return index
+
+
+def write_json(index: dict, path: Path) -> None:
+    with atomic_open(path) as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE functions (
+    id INTEGER PRIMARY KEY, module TEXT NOT NULL, name TEXT NOT NULL, signature TEXT,
+    section TEXT, title TEXT, anchor TEXT, description TEXT, returns TEXT, notes TEXT
+);
+CREATE TABLE parameters (
+    function_id INTEGER NOT NULL REFERENCES functions(id), position INTEGER NOT NULL,
+    name TEXT NOT NULL, type TEXT, "default" TEXT, description TEXT
+);
+CREATE TABLE structures (
+    id INTEGER PRIMARY KEY, module TEXT NOT NULL, name TEXT NOT NULL, kind TEXT,
+    section TEXT, title TEXT, anchor TEXT
+);
+CREATE TABLE fields (
+    structure_id INTEGER NOT NULL REFERENCES structures(id), position INTEGER NOT NULL,
+    name TEXT NOT NULL, type TEXT, description TEXT
+);
+CREATE TABLE enums (
+    id INTEGER PRIMARY KEY, module TEXT NOT NULL, name TEXT NOT NULL,
+    section TEXT, title TEXT, anchor TEXT, applies_to TEXT
+);
+CREATE TABLE enum_values (
+    enum_id INTEGER NOT NULL REFERENCES enums(id), position INTEGER NOT NULL,
+    name TEXT, value TEXT, label TEXT, "group" TEXT
+);
+CREATE INDEX idx_functions_name ON functions(name);
+CREATE INDEX idx_functions_module ON functions(module);
+CREATE INDEX idx_parameters_function ON parameters(function_id);
+CREATE INDEX idx_structures_name ON structures(name);
+CREATE INDEX idx_structures_module ON structures(module);
+CREATE INDEX idx_fields_structure ON fields(structure_id);
+CREATE INDEX idx_fields_name ON fields(name);
+CREATE INDEX idx_enums_name ON enums(name);
+CREATE INDEX idx_enums_module ON enums(module);
+CREATE INDEX idx_enum_values_enum ON enum_values(enum_id);
+CREATE INDEX idx_enum_values_name ON enum_values(name);
+"""
+
+
+def write_sqlite(index: dict, path: Path) -> None:
+    """写出SQLite索引（先写临时文件再替换）"""
+    with atomic_path(path, suffix=".sqlite") as tmp:
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("version", str(index["version"])),
+                ("extractor", index["extractor"]),
+                ("sources", json.dumps(index["sources"], sort_keys=True)),
+            ])
+            for fn in index["functions"]:
+                cur = conn.execute(
+                    "INSERT INTO functions (module, name, signature, section, title, anchor, description, returns, notes)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (fn["module"], fn["name"], fn["signature"], fn["section"], fn["title"], fn["anchor"],
+                     fn["description"], fn["returns"], fn["notes"]))
+                conn.executemany(
+                    'INSERT INTO parameters (function_id, position, name, type, "default", description) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(cur.lastrowid, i, p["name"], p["type"], p["default"], p["description"])
+                     for i, p in enumerate(fn["parameters"])])
+            for st in index["structures"]:
+                cur = conn.execute(
+                    "INSERT INTO structures (module, name, kind, section, title, anchor) VALUES (?, ?, ?, ?, ?, ?)",
+                    (st["module"], st["name"], st["kind"], st["section"], st["title"], st["anchor"]))
+                conn.executemany(
+                    "INSERT INTO fields (structure_id, position, name, type, description) VALUES (?, ?, ?, ?, ?)",
+                    [(cur.lastrowid, i, f["name"], f["type"], f["description"]) for i, f in enumerate(st["fields"])])
+            for en in index["enums"]:
+                cur = conn.execute(
+                    "INSERT INTO enums (module, name, section, title, anchor, applies_to) VALUES (?, ?, ?, ?, ?, ?)",
+                    (en["module"], en["name"], en["section"], en["title"], en["anchor"], json.dumps(en["applies_to"])))
+                conn.executemany(
+                    'INSERT INTO enum_values (enum_id, position, name, value, label, "group") VALUES (?, ?, ?, ?, ?, ?)',
+                    [(cur.lastrowid, i, v["name"], v["value"], v["label"], v["group"]) for i, v in enumerate(en["values"])])
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def is_current(docs_dir: Path) -> bool:
+    """索引是否已由当前的页面和提取代码生成"""
+    json_path, db_path = docs_dir / INDEX_JSON, docs_dir / INDEX_DB
+    if not json_path.exists() or not db_path.exists():
+        return False
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != INDEX_VERSION or data.get("extractor") != extractor_fingerprint():
+        return False
+    sources = {}
+    for page in API_PAGES:
+        path = docs_dir / page
+        if path.exists():
+            sources[page] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return sources == data.get("sources")
+
+
+def build_api_index(docs_dir: Path = DOCS_DIR, backend_name: str = "auto", force: bool = False) -> dict | None:
+    """
+    生成 JSON 和 SQLite 索引（页面未变化时跳过）
+
+    :param docs_dir: 保存HTML页面的目录，索引也写在这里
+    :param backend_name: HTML解析后端名称
+    :param force: 忽略已有索引，强制重建
+    :return: 新生成的索引，跳过时返回 None
+    """
+    docs_dir = Path(docs_dir)
+    if not force and is_current(docs_dir):
+        print("✓ API索引已是最新")
+        return None
+    index = build_index(docs_dir, backend_name)
+    write_json(index, docs_dir / INDEX_JSON)
+    write_sqlite(index, docs_dir / INDEX_DB)
+    print(f"✓ API索引: {len(index['functions'])} 个函数, {len(index['structures'])} 个数据结构, "
+          f"{len(index['enums'])} 个枚举 -> {docs_dir / INDEX_JSON}, {docs_dir / INDEX_DB}")
+    return index
+
+
+# ================================================================================================
+# 查询
+# ================================================================================================
+
+def lookup(db_path: Path, name: str) -> dict:
+    """
+    按名称查询函数、数据结构和枚举
+
+    :param db_path: SQLite索引文件
+    :param name: 函数名、结构名（如 XtTrade）或枚举名（如 order_type）
+    :return: {"functions": [...], "structures": [...], "enums": [...]}
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        result = {"functions": [], "structures": [], "enums": []}
+        for row in conn.execute("SELECT * FROM functions WHERE name = ?", (name,)):
+            entry = dict(row)
+            entry["parameters"] = [dict(p) for p in conn.execute(
+                "SELECT name, type, \"default\", description FROM parameters WHERE function_id = ? ORDER BY position",
+                (row["id"],))]
+            result["functions"].append(entry)
+        for row in conn.execute("SELECT * FROM structures WHERE name = ?", (name,)):
+            entry = dict(row)
+            entry["fields"] = [dict(f) for f in conn.execute(
+                "SELECT name, type, description FROM fields WHERE structure_id = ? ORDER BY position", (row["id"],))]
+            result["structures"].append(entry)
+        for row in conn.execute("SELECT * FROM enums WHERE name = ?", (name,)):
+            entry = dict(row)
+            entry["applies_to"] = json.loads(entry["applies_to"])
+            entry["values"] = [dict(v) for v in conn.execute(
+                "SELECT name, value, label, \"group\" FROM enum_values WHERE enum_id = ? ORDER BY position",
+                (row["id"],))]
+            result["enums"].append(entry)
+        return result
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从 xtdata / xttrader 页面生成结构化API索引")
+    parser.add_argument("--docs-dir", type=Path, default=DOCS_DIR, help="保存HTML页面的目录")
+    parser.add_argument("--parser", default="auto", help="HTML解析后端（auto/selectolax/lxml/bs4）")
+    parser.add_argument("--force", action="store_true", help="强制重建索引")
+    parser.add_argument("--lookup", metavar="NAME", help="按名称查询已生成的索引")
+    args = parser.parse_args(argv)
+
+    if args.lookup:
+        result = lookup(args.docs_dir / INDEX_DB, args.lookup)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    build_api_index(args.docs_dir, args.parser, args.force)
+
+
+if __name__ == "__main__":
+    main()
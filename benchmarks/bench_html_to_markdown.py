@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+html_to_markdown 微基准
+
+对 QMT_Docs/ 中保存的每个页面单独计时（页面只解析一次，转换重复多次取最小值）。
+指定 --baseline 时，同时从该 git 版本加载 qmt_crawler 作对比，便于查看改动前后的差异。
+
+用法：
+    uv run python benchmarks/bench_html_to_markdown.py
+    uv run python benchmarks/bench_html_to_markdown.py --baseline HEAD~1 --parser bs4
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import qmt_crawler  # noqa: E402
+from html_backends import get_backend  # noqa: E402
+
+
+DOCS_DIR = ROOT / "QMT_Docs"
+
+
+def load_revision(revision: str) -> types.ModuleType:
+    """从指定 git 版本加载 qmt_crawler 模块"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:qmt_crawler.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True, encoding="utf-8",
+    ).stdout
+    module = types.ModuleType(f"qmt_crawler_{revision}")
+    module.__file__ = str(ROOT / "qmt_crawler.py")
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def synthetic_page(depth: int) -> str:
+    """生成深层嵌套的页面（模拟 shiki 代码块中层层包裹的 span）"""
+    opening = "".join(f'<div><span class="line">行 {i} ' for i in range(depth))
+    closing = "</span></div>" * depth
+    return f'<html><body><div class="content">{opening}{closing}</div></body></html>'
+
+
+def time_conversion(convert, element, repeat: int) -> tuple[float, str | None]:
+    """多次转换同一元素，返回 (最短耗时, 输出)；超出递归上限时返回 (nan, None)"""
+    best = float("inf")
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            output = convert(element)
+        except RecursionError:
+            return float("nan"), None
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="html_to_markdown 微基准")
+    parser.add_argument("--parser", default="auto", help="HTML解析后端")
+    parser.add_argument("--repeat", type=int, default=5, help="每个页面的重复次数")
+    parser.add_argument("--baseline", help="对比的 git 版本（如 HEAD~1）")
+    parser.add_argument("--depth", type=int, nargs="*", default=[400, 2000],
+                        help="追加的深层嵌套合成页面的嵌套深度")
+    args = parser.parse_args()
+
+    backend = get_backend(args.parser)
+    baseline = load_revision(args.baseline) if args.baseline else None
+    print(f"后端: {backend.name}，重复 {args.repeat} 次取最小值")
+
+    header = f"{'页面':<24}{'大小(KB)':>10}{'当前(ms)':>12}"
+    if baseline:
+        header += f"{'基线(ms)':>12}{'加速':>8}{'一致':>6}"
+    print(header)
+
+    pages = [(page, (DOCS_DIR / page).read_text(encoding="utf-8")) for page in qmt_crawler.PAGES]
+    pages += [(f"<合成: 嵌套 {depth} 层>", synthetic_page(depth)) for depth in args.depth]
+
+    total_current = total_baseline = 0.0
+    for name, html in pages:
+        root = backend.parse(html)
+        content = root.find('div', class_='content') or root.find('article') or root.find('main') or root.find('body')
+
+        current, output = time_conversion(qmt_crawler.html_to_markdown, content, args.repeat)
+        line = f"{name:<24}{len(html.encode()) / 1024:>10.0f}{current * 1000:>12.1f}"
+        if not baseline:
+            total_current += current
+        else:
+            before, expected = time_conversion(baseline.html_to_markdown, content, args.repeat)
+            if expected is None:
+                line += f"{'递归溢出':>10}"
+            else:
+                total_current += current
+                total_baseline += before
+                line += f"{before * 1000:>12.1f}{before / current:>7.2f}x{'✓' if output == expected else '✗':>6}"
+        print(line)
+
+    summary = f"{'合计（可比较部分）' if baseline else '合计':<24}{'':>10}{total_current * 1000:>12.1f}"
+    if baseline:
+        summary += f"{total_baseline * 1000:>12.1f}"
+    print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+文档生成工具链基准套件
+
+以 QMT_Docs/ 中保存的 6 个页面为素材，分别对每个阶段计时：
+    parse               HTML解析（--parser 指定的后端）
+    html_to_markdown    qmt_crawler.html_to_markdown
+    format_markdown     format_docs.format_lines + collapse_blank_lines
+    fix_links           fix_links.HeaderIndex 构建 + link_lines
+    indent_code_blocks  indent_code_blocks.indent_lines
+
+语料：
+    pages   保存的 6 个页面
+    x10     页面复制 10 份（60 个页面）
+    x100    页面复制 100 份（600 个页面，只运行一次）
+    nested  合成的深层嵌套列表（列表项中带代码块）和大表格
+
+每个阶段重复 --repeat 次取最小值。结果与 benchmarks/baseline.json 对比，任一阶段变慢超过
+--threshold（默认 25%）时以退出码 1 结束；每次运行追加一行到 benchmarks/history.jsonl。
+为了让不同机器上的结果可以比较，耗时都除以一段固定纯 Python 负载的耗时（calibration）后再对比。
+全部只读取本地文件，可离线运行。
+
+用法：
+    uv run python benchmarks/bench_suite.py
+    uv run python benchmarks/bench_suite.py --corpus pages nested --repeat 5
+    uv run python benchmarks/bench_suite.py --save-baseline
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import fix_links  # noqa: E402
+import format_docs  # noqa: E402
+import indent_code_blocks  # noqa: E402
+import qmt_crawler  # noqa: E402
+from html_backends import get_backend  # noqa: E402
+
+
+DOCS_DIR = ROOT / "QMT_Docs"
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+HISTORY_FILE = Path(__file__).resolve().parent / "history.jsonl"
+
+STAGES = ["parse", "html_to_markdown", "format_markdown", "fix_links", "indent_code_blocks"]
+CORPORA = {
+    # 名称: (页面复制份数, 最多重复次数)
+    "pages": (1, None),
+    "x10": (10, None),
+    "x100": (100, 1),
+    "nested": (0, None),
+}
+REGRESSION_THRESHOLD = 0.25
+MIN_SECONDS = 0.005     # 短于此值的测量受噪声影响太大，不参与回归判断
+
+
+# ================================================================================================
+# 语料
+# ================================================================================================
+
+def load_pages() -> list[tuple[str, str]]:
+    """读取保存的页面"""
+    return [(page, (DOCS_DIR / page).read_text(encoding="utf-8")) for page in qmt_crawler.PAGES]
+
+
+def nested_list_html(depth: int, width: int) -> str:
+    """深度为 depth 的嵌套列表，每层 width 个列表项（最后一项继续嵌套），每项带一个代码块"""
+    html = ""
+    for level in reversed(range(depth)):
+        tag = "ol" if level % 2 else "ul"
+        items = "".join(
+            f"<li>第 {level} 层第 {i} 项 <code>call_{i}()</code>"
+            f"<pre><code>def item_{level}_{i}():\n    return {i}\n</code></pre></li>"
+            for i in range(width - 1)
+        )
+        html = f"<{tag}>{items}<li>第 {level} 层末项{html}</li></{tag}>"
+    return html
+
+
+def table_html(rows: int, cols: int) -> str:
+    """rows 行 cols 列的表格"""
+    head = "".join(f"<th>字段{c}</th>" for c in range(cols))
+    body = "".join(
+        "<tr>" + "".join(f"<td>值 {r}-{c} <code>x{c}</code></td>" for c in range(cols)) + "</tr>"
+        for r in range(rows)
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def nested_pages() -> list[tuple[str, str]]:
+    """合成的深层嵌套列表和大表格页面"""
+    def page(body: str) -> str:
+        return f'<html><body><div class="content"><h2>合成页面</h2>{body}</div></body></html>'
+    return [
+        ("<合成: 嵌套列表>", page(nested_list_html(depth=40, width=20))),
+        ("<合成: 大表格>", page(table_html(rows=2000, cols=8))),
+    ]
+
+
+def corpus_pages(name: str, pages: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """语料中的 (页面名, HTML) 列表"""
+    copies = CORPORA[name][0]
+    if copies == 0:
+        return nested_pages()
+    return [(f"{page}#{n}", html) for n in range(copies) for page, html in pages]
+
+
+# ================================================================================================
+# 计时
+# ================================================================================================
+
+def calibrate(repeat: int = 5) -> float:
+    """固定纯 Python 负载的耗时（字符串处理 + 字典操作），用于跨机器归一化"""
+    words = [f"word{i % 997}" for i in range(200_000)]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        counts: dict[str, int] = {}
+        for word in words:
+            key = word.upper()
+            counts[key] = counts.get(key, 0) + 1
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def best_of(func, repeat: int):
+    """重复执行 func，返回 (最短耗时, 最后一次的返回值)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_corpus(pages: list[tuple[str, str]], backend, repeat: int) -> dict[str, float]:
+    """对一个语料的每个阶段计时，返回 {阶段: 秒}"""
+    timings: dict[str, float] = {}
+
+    # HTML阶段逐页解析、转换后即丢弃文档树，避免大语料占用过多内存
+    def html_stages():
+        parse_time = convert_time = 0.0
+        sections = []
+        for name, html in pages:
+            started = time.perf_counter()
+            root = backend.parse(html)
+            parsed = time.perf_counter()
+            content = root.find('div', class_='content') or root.find('body')
+            body = qmt_crawler.html_to_markdown(content) if content else ""
+            convert_time += time.perf_counter() - parsed
+            parse_time += parsed - started
+            sections.append(f"## {name}\n\n{body}\n\n---\n\n")
+        return parse_time, convert_time, sections
+
+    best_parse = best_convert = float("inf")
+    sections: list[str] = []
+    for _ in range(repeat):
+        parse_time, convert_time, sections = html_stages()
+        best_parse = min(best_parse, parse_time)
+        best_convert = min(best_convert, convert_time)
+    timings["parse"] = best_parse
+    timings["html_to_markdown"] = best_convert
+
+    raw = qmt_crawler.markdown_preamble() + "".join(sections)
+    raw_lines = raw.splitlines()
+
+    timings["format_markdown"], formatted = best_of(
+        lambda: list(format_docs.collapse_blank_lines(format_docs.format_lines(raw_lines))), repeat)
+
+    def link():
+        index = fix_links.HeaderIndex(fix_links.collect_headers(formatted), fix_links.collect_link_texts(formatted))
+        return list(fix_links.link_lines(formatted, index))
+    timings["fix_links"], linked = best_of(link, repeat)
+
+    timings["indent_code_blocks"], _ = best_of(lambda: list(indent_code_blocks.indent_lines(linked, {})), repeat)
+    return timings
+
+
+# ================================================================================================
+# 基线与历史
+# ================================================================================================
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    与基线对比（按 calibration 归一化）
+
+    :return: 超出阈值的 "语料/阶段" 列表
+    """
+    regressions = []
+    scale = baseline["calibration"] / results["calibration"]
+    for corpus, timings in results["timings"].items():
+        for stage, seconds in timings.items():
+            before = baseline["timings"].get(corpus, {}).get(stage)
+            if before is None or before < MIN_SECONDS:
+                continue
+            if seconds * scale > before * (1 + threshold):
+                regressions.append(f"{corpus}/{stage}")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None) -> None:
+    scale = baseline["calibration"] / results["calibration"] if baseline else 1.0
+    header = f"{'语料':<10}{'阶段':<22}{'当前(ms)':>12}"
+    if baseline:
+        header += f"{'基线(ms)':>12}{'比值':>8}"
+    print(header)
+    for corpus, timings in results["timings"].items():
+        for stage in STAGES:
+            seconds = timings[stage]
+            line = f"{corpus:<10}{stage:<22}{seconds * 1000:>12.1f}"
+            before = baseline["timings"].get(corpus, {}).get(stage) if baseline else None
+            if before:
+                line += f"{before * 1000:>12.1f}{seconds * scale / before:>7.2f}x"
+            print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="文档生成工具链基准套件")
+    parser.add_argument("--parser", default="lxml", help="HTML解析后端（基线使用 lxml）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段的重复次数（取最小值）")
+    parser.add_argument("--corpus", nargs="+", choices=list(CORPORA), default=list(CORPORA), help="要运行的语料")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="基线文件")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="允许的变慢比例")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为新的基线")
+    args = parser.parse_args(argv)
+
+    backend = get_backend(args.parser)
+    pages = load_pages()
+    print(f"后端: {backend.name}，重复 {args.repeat} 次取最小值")
+
+    results = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser": backend.name,
+        "calibration": calibrate(),
+        "timings": {},
+    }
+    for corpus in args.corpus:
+        max_repeat = CORPORA[corpus][1]
+        repeat = min(args.repeat, max_repeat) if max_repeat else args.repeat
+        results["timings"][corpus] = bench_corpus(corpus_pages(corpus, pages), backend, repeat)
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("parser") != results["parser"]:
+            print(f"⚠ 基线使用的后端是 {baseline.get('parser')}，对比结果仅供参考")
+    print_table(results, baseline)
+
+    with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(results, ensure_ascii=False) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n✓ 基线已保存: {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\n没有基线文件（运行 --save-baseline 生成）: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ 超出 {args.threshold:.0%} 阈值的阶段: {', '.join(regressions)}")
+        return 1
+    print(f"\n✓ 所有阶段都在基线的 {args.threshold:.0%} 以内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
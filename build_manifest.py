@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+增量构建清单
+
+记录每个源HTML页面的内容hash、转换出的Markdown片段hash以及页面引用的图片。
+再次构建时，源HTML未变化的页面直接复用缓存的片段，只需重新执行最终的整合步骤。
+
+目录结构：
+    <root>/manifest.json         页面 -> {source, rendered, fragment, images}
+    <root>/fragments/<页面>.md   页面的Markdown片段
+    <root>/rendered/<页面>       替换图片URL后的HTML
+"""
+
+import json
+import hashlib
+import shutil
+from pathlib import Path
+
+from md_common import atomic_open
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: Path) -> str:
+    return sha256_bytes(path.read_bytes())
+
+
+class BuildManifest:
+    """
+    增量构建清单
+
+    fingerprint 标识转换代码的版本，与清单中记录的不一致时全部页面视为已变化。
+    """
+
+    def __init__(self, root: Path, fingerprint: str) -> None:
+        self.root = Path(root)
+        self.file = self.root / "manifest.json"
+        self.fragments_dir = self.root / "fragments"
+        self.rendered_dir = self.root / "rendered"
+        self.fingerprint = fingerprint
+        self.pages: dict[str, dict] = {}
+        if self.file.exists():
+            with open(self.file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                self.pages = data.get("pages", {})
+
+    def lookup(self, page: str, source_hash: str) -> dict | None:
+        """
+        查找可以复用的构建结果
+
+        源HTML与上次下载的原始页面或上次输出的页面一致，且片段文件完好时才可复用。
+
+        :param page: 页面文件名
+        :param source_hash: 当前源HTML的hash
+        :return: 清单条目，不可复用时返回 None
+        """
+        entry = self.pages.get(page)
+        if not entry or source_hash not in (entry["source"], entry["rendered"]):
+            return None
+        fragment_path = self.fragments_dir / f"{page}.md"
+        rendered_path = self.rendered_dir / page
+        if not fragment_path.exists() or not rendered_path.exists():
+            return None
+        if sha256_file(fragment_path) != entry["fragment"]:
+            return None
+        return entry
+
+    def fragment(self, page: str) -> str:
+        """读取缓存的Markdown片段"""
+        with open(self.fragments_dir / f"{page}.md", 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def restore_rendered(self, page: str, target: Path) -> None:
+        """把上次输出的HTML恢复到目标位置（内容一致时不写入）"""
+        entry = self.pages[page]
+        if target.exists() and sha256_file(target) == entry["rendered"]:
+            return
+        shutil.copyfile(self.rendered_dir / page, target)
+
+    def record(self, page: str, source_hash: str, rendered_path: Path, images: dict[str, str], fragment: str) -> None:
+        """
+        记录一个页面的构建结果
+
+        :param page: 页面文件名
+        :param source_hash: 源HTML的hash
+        :param rendered_path: 替换图片URL后的HTML文件
+        :param images: 页面引用的图片URL到本地路径的映射
+        :param fragment: 页面的Markdown片段
+        """
+        self.fragments_dir.mkdir(parents=True, exist_ok=True)
+        self.rendered_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.fragments_dir / f"{page}.md", 'w', encoding='utf-8', newline='') as f:
+            f.write(fragment)
+        shutil.copyfile(rendered_path, self.rendered_dir / page)
+        self.pages[page] = {
+            "source": source_hash,
+            "rendered": sha256_file(rendered_path),
+            "fragment": sha256_bytes(fragment.encode('utf-8')),
+            "images": images,
+        }
+
+    def save(self) -> None:
+        """保存清单"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {"fingerprint": self.fingerprint, "pages": self.pages}
+        with atomic_open(self.file) as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,210 @@
+"""
+Split the final document into one file per API-level section.
+
+Every header up to --level (default 5, i.e. "##### # 获取行情数据" entries)
+starts a new chunk; deeper headers stay inside their chunk. The chunk directory
+gets a manifest.json listing each chunk's file, title, header path, anchor,
+byte range in the source document and SHA-256, plus an anchor -> chunk map, so
+a consumer can open one entry without reading the rest.
+
+In-page links are pointed at the chunk file that defines their anchor
+("012-获取行情数据.md#-获取行情数据"): the "#-Title" links fix_links writes,
+including titles with spaces, and the table of contents' "#Title" slugs.
+Fragments are matched after md_common.anchor_key normalization. Links to
+anchors in the same chunk are left as they are; a link left pointing at an
+anchor that only exists in another chunk is reported as an error.
+
+Usage:
+    python chunk_docs.py [QMT_Docs/QMT_API_Documentation_Format.md] [--out DIR] [--level N]
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+from md_common import ANCHOR_LINK_RE, anchor_key, header_anchor, split_sections, write_atomic
+
+DOC_FILE = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
+CHUNK_LEVEL = 5
+MANIFEST = "manifest.json"
+
+# Characters that are unsafe in file names or break a markdown link destination
+UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|#%()\[\]\s]+')
+
+
+def chunk_dir(doc_path):
+    return doc_path.with_name(f"{doc_path.stem}.chunks")
+
+
+def anchor(title):
+    return header_anchor(title)
+
+
+def chunk_filename(number, title):
+    slug = UNSAFE_FILENAME_RE.sub("-", title).strip("-.")[:60] or "preamble"
+    return f"{number:03d}-{slug}.md"
+
+
+def plan_chunks(data, level=CHUNK_LEVEL):
+    """
+    Group header sections into chunks.
+
+    Returns (chunks, anchors): chunk dicts without file contents, and a map
+    from every header anchor to the first chunk that defines it.
+    """
+    chunks = []
+    anchors = {}
+    path = []
+    for title, depth, line, offset, length in split_sections(data):
+        if not chunks or 0 < depth <= level:
+            if depth:
+                while path and path[-1][0] >= depth:
+                    path.pop()
+                path.append((depth, title))
+            chunks.append({
+                "id": len(chunks),
+                "file": chunk_filename(len(chunks), title),
+                "title": title,
+                "level": depth,
+                "path": [t for _, t in path[:-1]] if depth else [],
+                "anchor": anchor(title) if title else None,
+                "line": line,
+                "offset": offset,
+                "length": 0,
+            })
+        chunk = chunks[-1]
+        chunk["length"] = offset + length - chunk["offset"]
+        if title:
+            anchors.setdefault(anchor(title), chunk["id"])
+    return chunks, anchors
+
+
+def link_targets(anchors):
+    """
+    Normalized fragment -> chunk map for resolving in-page links: every
+    header's "-Title" anchor, then (where not taken) its plain "Title" slug,
+    which the preamble's table of contents links to.
+    """
+    targets = {}
+    for key, chunk_id in anchors.items():
+        targets.setdefault(anchor_key(key), chunk_id)
+    for key, chunk_id in anchors.items():
+        targets.setdefault(anchor_key(key[1:]), chunk_id)
+    return targets
+
+
+def relink(text, chunk, chunks, targets):
+    """Point "#anchor" links at the chunk file that defines the anchor."""
+    def replace(match):
+        target = targets.get(anchor_key(match.group(1)))
+        if target is None or target == chunk["id"]:
+            return match.group(0)
+        return f"]({chunks[target]['file']}#{match.group(1)})"
+    return ANCHOR_LINK_RE.sub(replace, text)
+
+
+def foreign_links(text, chunk, targets):
+    """In-page fragments in a chunk's text that another chunk defines (left by relink only if it missed them)."""
+    return [m.group(1) for m in ANCHOR_LINK_RE.finditer(text)
+            if targets.get(anchor_key(m.group(1)), chunk["id"]) != chunk["id"]]
+
+
+def write_chunks(doc_path=DOC_FILE, out_dir=None, level=CHUNK_LEVEL):
+    """
+    Write the chunk files and manifest for a markdown document.
+
+    Chunks whose content is unchanged since the last run are not rewritten, and
+    chunk files that no longer exist in the document are removed.
+    Returns the manifest; its "foreign_links" lists in-page links that still
+    point at an anchor defined in another chunk (should be empty).
+    """
+    doc_path = Path(doc_path)
+    out_dir = Path(out_dir) if out_dir else chunk_dir(doc_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = doc_path.read_bytes()
+    chunks, anchors = plan_chunks(data, level)
+    targets = link_targets(anchors)
+
+    manifest_path = out_dir / MANIFEST
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = {c["file"]: c["sha256"] for c in json.load(f).get("chunks", [])}
+
+    written = 0
+    broken = []
+    for chunk in chunks:
+        text = data[chunk["offset"]:chunk["offset"] + chunk["length"]].decode("utf-8")
+        relinked = relink(text, chunk, chunks, targets)
+        broken.extend({"file": chunk["file"], "fragment": f} for f in foreign_links(relinked, chunk, targets))
+        body = relinked.encode("utf-8")
+        chunk["sha256"] = hashlib.sha256(body).hexdigest()
+        chunk["bytes"] = len(body)
+        target = out_dir / chunk["file"]
+        if previous.get(chunk["file"]) != chunk["sha256"] or not target.exists():
+            write_atomic(target, body)
+            written += 1
+
+    current = {c["file"] for c in chunks}
+    for name in previous:
+        if name not in current:
+            (out_dir / name).unlink(missing_ok=True)
+
+    manifest = {
+        "source": doc_path.name,
+        "source_sha256": hashlib.sha256(data).hexdigest(),
+        "level": level,
+        "chunks": chunks,
+        "anchors": anchors,
+        "foreign_links": broken,
+    }
+    write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    manifest["written"] = written
+    return manifest
+
+
+def read_chunk(out_dir, key):
+    """
+    Read one chunk by anchor ("-获取行情数据") or title, loading only the
+    manifest and that chunk's file. Returns None if there is no such chunk.
+    """
+    out_dir = Path(out_dir)
+    with open(out_dir / MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    chunk_id = manifest["anchors"].get(key, manifest["anchors"].get(anchor(key)))
+    if chunk_id is None:
+        return None
+    return (out_dir / manifest["chunks"][chunk_id]["file"]).read_text(encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split the final document into per-section chunk files")
+    parser.add_argument("doc", nargs="?", type=Path, default=DOC_FILE)
+    parser.add_argument("--out", type=Path, help="chunk directory (default: <doc>.chunks next to the document)")
+    parser.add_argument("--level", type=int, default=CHUNK_LEVEL, help="deepest header level that starts a chunk")
+    parser.add_argument("--show", metavar="TITLE", help="print one chunk from an existing chunk directory")
+    args = parser.parse_args(argv)
+
+    out_dir = args.out or chunk_dir(args.doc)
+    if args.show:
+        text = read_chunk(out_dir, args.show)
+        if text is None:
+            print(f"No chunk for: {args.show}")
+            return 1
+        print(text)
+        return 0
+
+    if not args.doc.exists():
+        print(f"File not found: {args.doc}")
+        return 1
+    manifest = write_chunks(args.doc, out_dir, args.level)
+    print(f"Split into {len(manifest['chunks'])} chunks ({manifest['written']} written): {out_dir}")
+    for link in manifest["foreign_links"]:
+        print(f"  Link to another chunk's anchor left in place: {link['file']} #{link['fragment']}")
+    return 1 if manifest["foreign_links"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
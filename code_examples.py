@@ -0,0 +1,264 @@
+"""
+Extract, deduplicate and syntax-check the code examples in the final document.
+
+Every fenced block is extracted with the header path of the section it appears
+in and its line number. Blocks are normalized (common indentation, trailing
+whitespace and surrounding blank lines removed) and identified by the SHA-256
+of the result, so the same snippet pasted into several sections is stored and
+checked once, and a snippet keeps its ID (ex-<hash>) across runs as long as its
+code does not change.
+
+Python blocks (```python, ```py or no language) are parsed with ast in a
+process pool. Results are cached in the output directory's manifest by hash
+and Python version, so a rerun only parses snippets it has not seen before.
+Syntax errors and compile-time warnings (e.g. invalid escape sequences) are
+reported with the first section that contains the snippet.
+
+Output (default <doc>.examples/ next to the document): one file per unique
+snippet, <id>.py, headed by the sections it comes from, and manifest.json
+listing every snippet, its occurrences and check result.
+
+Usage:
+    python code_examples.py [QMT_Docs/QMT_API_Documentation_Format.md] [--out DIR] [--workers N] [--strict]
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import textwrap
+import warnings
+from pathlib import Path
+
+from md_common import ANCHOR_HEADER_RE, HEADER_RE, is_fence_marker, write_atomic
+
+DOC_FILE = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
+MANIFEST = "manifest.json"
+PYTHON_LANGS = frozenset(["python", "py", "python3", ""])
+ID_LENGTH = 12
+
+# Opening fence, also as the first line of a list item ("- ```python")
+FENCE_RE = re.compile(r'^\s*(?:[-*+]\s+)?```\s*([\w+-]*)')
+
+
+def examples_dir(doc_path):
+    return doc_path.with_name(f"{doc_path.stem}.examples")
+
+
+def python_version():
+    return f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def normalize(lines):
+    """Snippet text with common indentation, trailing whitespace and surrounding blank lines removed."""
+    text = textwrap.dedent("\n".join(line.rstrip() for line in lines))
+    return text.strip("\n") + "\n"
+
+
+def extract_blocks(lines):
+    """
+    Yield every fenced block as a dict: lang, normalized code, line number of
+    the opening fence and the header path of the enclosing section.
+    """
+    path = []
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        m = FENCE_RE.match(line)
+        if m:
+            start = i
+            body = []
+            i += 1
+            while i < n and not is_fence_marker(lines[i]):
+                body.append(lines[i])
+                i += 1
+            code = normalize(body)
+            if code.strip():
+                yield {"lang": m.group(1).lower(), "code": code, "line": start + 1, "path": [t for _, t in path]}
+        elif HEADER_RE.match(line):
+            stripped = line.strip()
+            level = len(stripped) - len(stripped.lstrip("#"))
+            anchored = ANCHOR_HEADER_RE.match(line)
+            title = anchored.group(1).strip() if anchored else stripped.lstrip("#").strip()
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, title))
+        i += 1
+
+
+def snippet_id(code):
+    return "ex-" + hashlib.sha256(code.encode("utf-8")).hexdigest()[:ID_LENGTH]
+
+
+def check_python(code):
+    """
+    Parse a snippet with ast. Returns {"status": "ok" | "error", "error": ...,
+    "warnings": [...]}; runs in a worker process.
+    """
+    result = {"status": "ok"}
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            result["status"] = "error"
+            result["error"] = {"type": type(e).__name__, "message": e.msg, "line": e.lineno, "column": e.offset}
+        except ValueError as e:
+            # e.g. source code containing null bytes
+            result["status"] = "error"
+            result["error"] = {"type": type(e).__name__, "message": str(e), "line": None, "column": None}
+    messages = [f"line {w.lineno}: {w.category.__name__}: {w.message}" for w in caught]
+    if messages:
+        result["warnings"] = messages
+    return result
+
+
+def check_all(codes, workers=0):
+    """Check snippets in a process pool; returns results in the same order."""
+    if workers != 1 and len(codes) > 1:
+        # Imported here: multiprocessing is slow to import and most reruns have nothing to parse
+        from concurrent.futures import ProcessPoolExecutor
+        max_workers = min(workers or os.cpu_count() or 1, len(codes))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(check_python, codes, chunksize=max(1, len(codes) // (max_workers * 4))))
+    return [check_python(code) for code in codes]
+
+
+def snippet_file(snippet):
+    return snippet["id"] + (".py" if snippet["lang"] in PYTHON_LANGS else ".txt")
+
+
+def file_body(snippet, code):
+    if snippet["lang"] not in PYTHON_LANGS:
+        return code
+    sources = "".join(f"#   {' / '.join(o['path']) or '(preamble)'} (line {o['line']})\n"
+                      for o in snippet["occurrences"])
+    return f"# {snippet['id']}, from:\n{sources}\n{code}"
+
+
+def write_examples(doc_path=DOC_FILE, out_dir=None, workers=0):
+    """
+    Extract, deduplicate and check the document's code blocks and write one
+    file per unique snippet. Returns the manifest, plus "checked" (snippets
+    parsed this run) and "written" (files written this run).
+    """
+    doc_path = Path(doc_path)
+    out_dir = Path(out_dir) if out_dir else examples_dir(doc_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    text = doc_path.read_text(encoding="utf-8")
+
+    snippets = {}
+    codes = {}
+    blocks = 0
+    for block in extract_blocks(text.splitlines()):
+        blocks += 1
+        sid = snippet_id(block["code"])
+        snippet = snippets.get(sid)
+        if snippet is None:
+            snippet = snippets[sid] = {
+                "id": sid,
+                "sha256": hashlib.sha256(block["code"].encode("utf-8")).hexdigest(),
+                "lang": block["lang"],
+                "lines": block["code"].count("\n"),
+                "occurrences": [],
+            }
+            codes[sid] = block["code"]
+        snippet["occurrences"].append({"path": block["path"], "line": block["line"]})
+
+    manifest_path = out_dir / MANIFEST
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        previous = {s["sha256"]: s for s in old.get("snippets", [])}
+        if old.get("python") != python_version():
+            # The grammar changes between versions; keep the files, re-parse everything
+            previous = {sha: {"file": s.get("file"), "file_sha256": s.get("file_sha256")} for sha, s in previous.items()}
+
+    pending = []
+    for snippet in snippets.values():
+        cached = previous.get(snippet["sha256"], {})
+        if snippet["lang"] not in PYTHON_LANGS:
+            snippet["status"] = "skipped"
+        elif "status" in cached:
+            for key in ("status", "error", "warnings"):
+                if key in cached:
+                    snippet[key] = cached[key]
+        else:
+            pending.append(snippet)
+    for snippet, result in zip(pending, check_all([codes[s["id"]] for s in pending], workers)):
+        snippet.update(result)
+
+    written = 0
+    previous_files = {s.get("file"): s.get("file_sha256") for s in previous.values()}
+    for snippet in snippets.values():
+        snippet["file"] = snippet_file(snippet)
+        body = file_body(snippet, codes[snippet["id"]]).encode("utf-8")
+        snippet["file_sha256"] = hashlib.sha256(body).hexdigest()
+        target = out_dir / snippet["file"]
+        if previous_files.get(snippet["file"]) != snippet["file_sha256"] or not target.exists():
+            write_atomic(target, body)
+            written += 1
+
+    current = {s["file"] for s in snippets.values()}
+    for name in previous_files:
+        if name and name not in current:
+            (out_dir / name).unlink(missing_ok=True)
+
+    ordered = list(snippets.values())
+    manifest = {
+        "source": doc_path.name,
+        "python": python_version(),
+        "blocks": blocks,
+        "unique": len(ordered),
+        "duplicates": sum(len(s["occurrences"]) - 1 for s in ordered),
+        "errors": sum(s["status"] == "error" for s in ordered),
+        "snippets": ordered,
+    }
+    write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    manifest["checked"] = len(pending)
+    manifest["written"] = written
+    return manifest
+
+
+def print_report(manifest, out_dir, doc_path):
+    print(f"{manifest['blocks']} code blocks, {manifest['unique']} unique "
+          f"({manifest['duplicates']} duplicates); parsed {manifest['checked']}, "
+          f"{manifest['written']} files written: {out_dir}")
+    for snippet in manifest["snippets"]:
+        where = snippet["occurrences"][0]
+        section = " / ".join(where["path"]) or "(preamble)"
+        if snippet["status"] == "error":
+            error = snippet["error"]
+            print(f"  {snippet['id']}  {error['type']}: {error['message']} (snippet line {error['line']})")
+            print(f"      {doc_path}:{where['line']}  {section}")
+        for message in snippet.get("warnings", []):
+            print(f"  {snippet['id']}  warning, {message}  [{doc_path}:{where['line']}]")
+    if manifest["duplicates"]:
+        repeated = sorted(manifest["snippets"], key=lambda s: -len(s["occurrences"]))[:5]
+        print("Most repeated: " + ", ".join(f"{s['id']} x{len(s['occurrences'])}"
+                                            for s in repeated if len(s["occurrences"]) > 1))
+    print(f"Syntax errors: {manifest['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract, deduplicate and syntax-check the document's code examples")
+    parser.add_argument("doc", nargs="?", type=Path, default=DOC_FILE)
+    parser.add_argument("--out", type=Path, help="output directory (default: <doc>.examples next to the document)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0: one per CPU, 1: no pool)")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if any snippet has a syntax error")
+    args = parser.parse_args(argv)
+
+    if not args.doc.exists():
+        print(f"File not found: {args.doc}")
+        return 1
+    out_dir = args.out or examples_dir(args.doc)
+    manifest = write_examples(args.doc, out_dir, args.workers)
+    print_report(manifest, out_dir, args.doc)
+    return 1 if args.strict and manifest["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
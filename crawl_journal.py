@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+爬取任务日志（SQLite）
+
+记录每个URL的下载状态、保存路径、字节数和 SHA-256，使中断的爬取可以续传：
+    - 页面：上次运行未正常结束时，本次运行视为续传，已在该次运行中完成且校验通过的页面
+      不再请求；上次运行已正常结束时，所有页面照常重新抓取（条件请求）。
+    - 图片：按内容寻址保存，一旦完成并校验通过，任何运行中都不再请求。
+    - 失败或校验不通过（文件缺失、长度或hash不符，例如被中断的下载）的条目会重新下载。
+
+表结构：
+    runs(id, started, finished)
+    jobs(url, kind, state, run, path, size, sha256, attempts, error, updated)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    started  REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    url      TEXT PRIMARY KEY,
+    kind     TEXT NOT NULL,
+    state    TEXT NOT NULL,
+    run      INTEGER,
+    path     TEXT,
+    size     INTEGER,
+    sha256   TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error    TEXT,
+    updated  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(kind, state);
+"""
+
+# 任务状态
+DONE = "done"
+FAILED = "failed"
+
+
+def file_digest(path: Path) -> tuple[int, str] | None:
+    """文件的 (字节数, SHA-256)，文件不存在时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+                size += len(chunk)
+    except FileNotFoundError:
+        return None
+    return size, digest.hexdigest()
+
+
+class CrawlJournal:
+    """
+    爬取任务日志
+
+    每次更新立即提交，进程在任意位置被终止后日志仍与磁盘一致。可在多个下载线程中共享。
+
+    :param path: SQLite 数据库文件
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.run: int | None = None
+        self.resumed = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------ 运行
+
+    def begin(self) -> bool:
+        """
+        开始一次运行；上次运行未正常结束时继续使用它
+
+        :return: 是否为续传
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id, finished FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            if row is not None and row[1] is None:
+                self.run, self.resumed = row[0], True
+            else:
+                self.run = self._conn.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+                self.resumed = False
+        return self.resumed
+
+    def finish(self) -> None:
+        """标记本次运行正常结束（下次运行重新抓取所有页面）"""
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run))
+
+    # ------------------------------------------------------------------ 任务
+
+    def entry(self, url: str) -> dict | None:
+        """URL的日志条目"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip((column[0] for column in cursor.description), row))
+
+    def done(self, url: str, kind: str, path: Path, size: int | None = None, sha256: str | None = None) -> None:
+        """
+        记录完成的任务
+
+        :param size: 文件字节数，与 sha256 都为空时从文件计算
+        """
+        if size is None or sha256 is None:
+            size, sha256 = file_digest(path)
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO jobs (url, kind, state, run, path, size, sha256, attempts, error, updated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 1, NULL, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       kind = excluded.kind, state = excluded.state, run = excluded.run, path = excluded.path,
+                       size = excluded.size, sha256 = excluded.sha256, attempts = jobs.attempts + 1,
+                       error = NULL, updated = excluded.updated""",
+                (url, kind, DONE, self.run, str(path), size, sha256, time.time()),
+            )
+
+    def failed(self, url: str, kind: str, error: str) -> None:
+        """记录失败的任务（下次运行会重试）"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO jobs (url, kind, state, run, attempts, error, updated)
+                   VALUES (?, ?, ?, ?, 1, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       state = excluded.state, run = excluded.run, attempts = jobs.attempts + 1,
+                       error = excluded.error, updated = excluded.updated""",
+                (url, kind, FAILED, self.run, error, time.time()),
+            )
+
+    def verified(self, url: str, path: Path, this_run: bool = False) -> bool:
+        """
+        任务是否已完成，且文件的长度和hash与日志一致
+
+        :param path: 期望的文件位置
+        :param this_run: 只接受本次运行（含续传的运行）中完成的任务
+        """
+        entry = self.entry(url)
+        if entry is None or entry["state"] != DONE or entry["path"] != str(path):
+            return False
+        if this_run and entry["run"] != self.run:
+            return False
+        return file_digest(path) == (entry["size"], entry["sha256"])
+
+    def counts(self, kind: str | None = None) -> dict[str, int]:
+        """各状态的任务数"""
+        query = "SELECT state, COUNT(*) FROM jobs"
+        params: tuple = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        with self._lock:
+            return dict(self._conn.execute(query + " GROUP BY state", params).fetchall())
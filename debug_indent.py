@@ -1,7 +1,7 @@
 import re
 from pathlib import Path
 
-FILE_PATH = Path(r"QMT_Docs\QMT_API_Documentation_Format.md")
+FILE_PATH = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
 
 def debug_indent():
     if not FILE_PATH.exists():
@@ -0,0 +1,226 @@
+"""
+Merkle tree of the document's sections, for fast diffs between crawls.
+
+The markdown is split at its headers (outside code blocks, the "#### # Title"
+structure fix_links parses) and the sections are nested by header level: the
+document is the root, each crawled page ("## 快速开始") a subtree, each API
+entry a node below it. Every node stores the hash of its own text (its header
+line and the lines up to the next header) and a tree hash over its title, its
+own text hash and its children's tree hashes. Whitespace-only changes (trailing
+spaces, blank lines) do not change a hash.
+
+`diff` compares two trees from the root down and only descends into children
+whose tree hash differs, so unchanged pages and entries are skipped without
+looking at their contents: the work grows with the number of changed
+sections, not with the size of the document. Siblings are matched by title
+(repeated titles by their order), so a renamed entry shows up as removed +
+added.
+
+postprocess.py writes the tree for every build as <doc>.merkle.json and keeps
+the previous build's tree as <doc>.merkle.prev.json, so `diff` without
+arguments shows what the last crawl changed.
+
+Usage:
+    python doc_merkle.py build [QMT_Docs/QMT_API_Documentation_Format.md]
+    python doc_merkle.py diff [OLD NEW] [--json]     (markdown files or .merkle.json trees)
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from md_common import atomic_open, split_sections, write_atomic
+
+DOC_FILE = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
+VERSION = 1
+
+
+def tree_path(doc_path):
+    return doc_path.with_name(f"{doc_path.stem}.merkle.json")
+
+
+def previous_tree_path(doc_path):
+    return doc_path.with_name(f"{doc_path.stem}.merkle.prev.json")
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def content_hash(text):
+    # Ignore trailing whitespace and blank lines
+    lines = [line.rstrip() for line in text.splitlines()]
+    return digest("\n".join(line for line in lines if line).encode("utf-8"))
+
+
+def seal(node):
+    """Compute the tree hash of a node from its children (post-order)."""
+    for child in node["children"]:
+        seal(child)
+    node["hash"] = digest(node["title"].encode("utf-8"), node["content"].encode("ascii"),
+                          *(child["hash"].encode("ascii") for child in node["children"]))
+    return node
+
+
+def build_tree(data):
+    """Merkle tree of a markdown document (bytes)."""
+    root = {"title": "", "level": 0, "line": 1, "content": content_hash(""), "children": []}
+    stack = [root]
+    for title, level, line, offset, length in split_sections(data):
+        text = data[offset:offset + length].decode("utf-8", errors="replace")
+        if level == 0:
+            root["content"] = content_hash(text)
+            continue
+        while stack[-1]["level"] >= level:
+            stack.pop()
+        node = {"title": title, "level": level, "line": line, "content": content_hash(text), "children": []}
+        stack[-1]["children"].append(node)
+        stack.append(node)
+    return seal(root)
+
+
+def count_sections(node):
+    return 1 + sum(count_sections(child) for child in node["children"])
+
+
+def write_tree(doc_path=DOC_FILE, out_path=None, keep_previous=True):
+    """
+    Build the tree for a markdown file and write it next to the document.
+
+    When `keep_previous` is set and the document changed since the stored tree
+    was written, the stored tree is kept as <doc>.merkle.prev.json first.
+    Returns the tree.
+    """
+    doc_path = Path(doc_path)
+    out_path = Path(out_path) if out_path else tree_path(doc_path)
+    tree = build_tree(doc_path.read_bytes())
+    if keep_previous and out_path.exists():
+        try:
+            with open(out_path, "r", encoding="utf-8") as f:
+                old_hash = json.load(f)["tree"]["hash"]
+        except (ValueError, KeyError):
+            old_hash = None
+        if old_hash != tree["hash"]:
+            write_atomic(previous_tree_path(doc_path), out_path.read_bytes())
+    data = {"version": VERSION, "source": doc_path.name, "sections": count_sections(tree) - 1, "tree": tree}
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(out_path) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return tree
+
+
+def load_tree(path):
+    """A tree from a .merkle.json file, or built from a markdown file."""
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != VERSION:
+            raise ValueError(f"Unsupported tree version in {path}; rebuild it with: python doc_merkle.py build")
+        return data["tree"]
+    return build_tree(path.read_bytes())
+
+
+def keyed(children):
+    """Children by title; a repeated title gets its occurrence number ("Title [2]")."""
+    keys = {}
+    seen = {}
+    for child in children:
+        n = seen[child["title"]] = seen.get(child["title"], 0) + 1
+        keys[child["title"] if n == 1 else f"{child['title']} [{n}]"] = child
+    return keys
+
+
+def diff_trees(old, new, stats=None):
+    """
+    Changes between two trees as (kind, path, old node, new node) tuples, kind
+    being "added", "removed" or "modified" (the section's own text changed).
+    Added and removed subtrees are reported once, at their top. `stats`, if
+    given, counts the nodes compared.
+    """
+    changes = []
+    if stats is None:
+        stats = {}
+    stats.setdefault("compared", 0)
+
+    def walk(a, b, path):
+        stats["compared"] += 1
+        if a["hash"] == b["hash"]:
+            return
+        if a["content"] != b["content"] or a["level"] != b["level"]:
+            changes.append(("modified", path, a, b))
+        old_children = keyed(a["children"])
+        new_children = keyed(b["children"])
+        for key, child in new_children.items():
+            before = old_children.get(key)
+            if before is None:
+                changes.append(("added", path + (key,), None, child))
+            else:
+                walk(before, child, path + (key,))
+        for key, child in old_children.items():
+            if key not in new_children:
+                changes.append(("removed", path + (key,), child, None))
+
+    walk(old, new, ())
+    return changes
+
+
+MARKS = {"added": "+", "removed": "-", "modified": "~"}
+
+
+def print_changes(changes, stats, total):
+    for kind, path, old, new in changes:
+        node = new or old
+        inner = count_sections(node) - 1
+        extra = f" (+{inner} subsections)" if kind != "modified" and inner else ""
+        where = f"line {old['line']} -> {new['line']}" if old and new else f"line {node['line']}"
+        print(f"{MARKS[kind]} {' / '.join(path) or '(preamble)'}{extra}  [{where}]")
+    counts = {kind: sum(1 for c in changes if c[0] == kind) for kind in MARKS}
+    print(f"{counts['added']} added, {counts['removed']} removed, {counts['modified']} modified; "
+          f"compared {stats['compared']} of {total} sections")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merkle tree of the document's sections and fast diffs between builds")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="write the tree for a markdown file")
+    p_build.add_argument("doc", nargs="?", type=Path, default=DOC_FILE)
+    p_diff = sub.add_parser("diff", help="compare two documents or trees (default: previous and current build)")
+    p_diff.add_argument("old", nargs="?", type=Path)
+    p_diff.add_argument("new", nargs="?", type=Path)
+    p_diff.add_argument("--json", action="store_true", help="print the changes as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not args.doc.exists():
+            print(f"File not found: {args.doc}")
+            return 1
+        tree = write_tree(args.doc)
+        print(f"Hashed {count_sections(tree) - 1} sections, root {tree['hash'][:16]}: {tree_path(args.doc)}")
+        return 0
+
+    old_path = args.old or previous_tree_path(DOC_FILE)
+    new_path = args.new or tree_path(DOC_FILE)
+    for path in (old_path, new_path):
+        if not path.exists():
+            print(f"File not found: {path}")
+            return 1
+    old, new = load_tree(old_path), load_tree(new_path)
+    stats = {}
+    changes = diff_trees(old, new, stats)
+    if args.json:
+        print(json.dumps([{"change": kind, "path": list(path),
+                           "old_line": o["line"] if o else None, "new_line": n["line"] if n else None}
+                          for kind, path, o, n in changes], ensure_ascii=False, indent=2))
+    else:
+        print_changes(changes, stats, count_sections(new))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,62 +1,228 @@
-import re
+import json
+from collections import Counter, deque
 from pathlib import Path
 
-FILE_PATH = Path(r"QMT_Docs\QMT_API_Documentation_Format.md")
+from md_common import ANCHOR_HEADER_RE, NEW_WINDOW_LINK_RE, header_anchor
 
-def fix_links():
-    if not FILE_PATH.exists():
-        print(f"File not found: {FILE_PATH}")
-        return
+FILE_PATH = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
 
-    content = FILE_PATH.read_text(encoding='utf-8')
-    
-    # 1. Gather headers
-    headers = []
+# Ambiguous links list at most this many alternative headers in the report
+REPORT_CANDIDATES = 10
+
+def collect_headers(lines):
     # Matches "#### # Title" or "## # Title"
     # Capture the Title part
-    for line in content.splitlines():
-        m = re.match(r'^\s*#+\s+#\s+(.*)$', line)
+    headers = []
+    for line in lines:
+        m = ANCHOR_HEADER_RE.match(line)
         if m:
             headers.append(m.group(1).strip())
-            
-    print(f"Found {len(headers)} headers.")
-    
-    # 2. Replace links
+    return headers
+
+def collect_link_texts(lines):
+    """Distinct "在新窗口打开" link texts, in order of first appearance."""
+    texts = {}
+    for line in lines:
+        for m in NEW_WINDOW_LINK_RE.finditer(line):
+            texts.setdefault(m.group(1).strip(), None)
+    return list(texts)
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over a text finds every pattern in it."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(pattern)
+
+        # Breadth-first: a node's fail link is the longest proper suffix that is
+        # also a trie path; it inherits that node's outputs.
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def matches(self, text):
+        """Set of patterns occurring in `text`."""
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found.update(self.out[node])
+        return found
+
+class HeaderIndex:
+    """
+    Header lookup for link resolution, built once per document.
+
+    A link resolves to the first header (in document order) that ends with the
+    link text, else the first header that contains it - the same choice the old
+    linear scan made. The suffix map answers the first question directly; the
+    substring fallback is precomputed for the prescanned link texts with an
+    Aho-Corasick pass over the headers. Texts that were not prescanned fall
+    back to a scan once and are memoized.
+    """
+
+    def __init__(self, headers, link_texts=()):
+        self.headers = list(headers)
+        self.exact = {}
+        self.suffix = {}
+        for i, header in enumerate(self.headers):
+            self.exact.setdefault(header, []).append(i)
+            for start in range(len(header) + 1):
+                self.suffix.setdefault(header[start:], []).append(i)
+
+        self.substring = {text: [] for text in link_texts}
+        if "" in self.substring:
+            self.substring[""] = list(range(len(self.headers)))
+        automaton = AhoCorasick(self.substring)
+        for i, header in enumerate(self.headers):
+            for text in automaton.matches(header):
+                self.substring[text].append(i)
+
+        self.resolved = {}
+        self.uses = Counter()
+
+    def _containing(self, text):
+        hits = self.substring.get(text)
+        if hits is None:
+            hits = [i for i, h in enumerate(self.headers) if text in h]
+            self.substring[text] = hits
+        return hits
+
+    def resolve(self, text):
+        """Header title the link text points at, or None."""
+        self.uses[text] += 1
+        if text in self.resolved:
+            return self.resolved[text][0]
+
+        if text in self.suffix:
+            hits = self.suffix[text]
+            tier = "exact" if self.headers[hits[0]] == text else "suffix"
+        else:
+            hits = self._containing(text)
+            tier = "substring"
+        best = self.headers[hits[0]] if hits else None
+        self.resolved[text] = (best, tier if hits else None, hits)
+        return best
+
+    def report(self):
+        """Resolution summary of every link text seen so far, JSON-serializable."""
+        ambiguous = []
+        unresolved = []
+        for text, (best, tier, hits) in self.resolved.items():
+            if best is None:
+                unresolved.append({"text": text, "count": self.uses[text]})
+            elif len({self.headers[i] for i in hits}) > 1 or (tier != "exact" and text in self.exact):
+                # Several different headers qualify, or an exact header lost to an
+                # earlier suffix match
+                ambiguous.append({
+                    "text": text,
+                    "count": self.uses[text],
+                    "target": best,
+                    "match": tier,
+                    "candidates": len(hits),
+                    "alternatives": [self.headers[i] for i in hits[1:REPORT_CANDIDATES + 1]],
+                })
+        duplicates = sorted(h for h, positions in self.exact.items() if len(positions) > 1)
+        return {
+            "headers": len(self.headers),
+            "links": sum(self.uses.values()),
+            "link_texts": len(self.resolved),
+            "resolved": sum(1 for best, _, _ in self.resolved.values() if best is not None),
+            "ambiguous": ambiguous,
+            "unresolved": unresolved,
+            "duplicate_headers": duplicates,
+        }
+
+def make_replacer(index):
     # Pattern: [LinkText 在新窗口打开](URL)
     # Target: [LinkText](#-MatchingHeaderTitle)
-    
+
     def replacer(match):
         raw_text = match.group(1) # e.g. "XtCreditDetail"
         link_text = raw_text.strip()
-        
-        # Find header
-        candidates = [h for h in headers if link_text in h]
-        
-        if not candidates:
-            # Try fuzzy match?
+
+        # Prefer suffix match (e.g. Header "FooBar" ends with Link "Bar"),
+        # then any header containing the link text
+        best = index.resolve(link_text)
+        if best is None:
             return match.group(0) # No change
-            
-        # Select best match
-        # Prefer suffix match (e.g. Header "FooBar" ends with Link "Bar")
-        best = candidates[0]
-        suffix_matches = [c for c in candidates if c.endswith(link_text)]
-        if suffix_matches:
-            best = suffix_matches[0]
-            
-        new_link = f"[{link_text}](#-{best})"
+
+        new_link = f"[{link_text}](#{header_anchor(best)})"
         return new_link
 
-    # Regex: [ (capture) space 在新窗口打开 ] ( ... )
-    new_content = re.sub(r'\[(.*?)\s+在新窗口打开\]\(.*?\)', replacer, content)
-    
-    # Also replace "参见数据字典在新窗口打开" -> "参见[数据字典](#-数据字典)"
-    # And "参见投保类型在新窗口打开" -> "参见[投保类型](#-投保类型)"
-    new_content = new_content.replace("参见数据字典在新窗口打开", "参见[数据字典](#-数据字典)")
-    new_content = new_content.replace("参见投保类型在新窗口打开", "参见[投保类型](#-投保类型)")
-    
+    return replacer
+
+def link_lines(lines, index):
+    """Line transform: point "在新窗口打开" links at the matching header in this document."""
+    if not isinstance(index, HeaderIndex):
+        index = HeaderIndex(index)
+    replacer = make_replacer(index)
+    for line in lines:
+        line = NEW_WINDOW_LINK_RE.sub(replacer, line)
+
+        # Also replace "参见数据字典在新窗口打开" -> "参见[数据字典](#-数据字典)"
+        # And "参见投保类型在新窗口打开" -> "参见[投保类型](#-投保类型)"
+        line = line.replace("参见数据字典在新窗口打开", "参见[数据字典](#-数据字典)")
+        line = line.replace("参见投保类型在新窗口打开", "参见[投保类型](#-投保类型)")
+        yield line
+
+def report_path(path):
+    return path.with_name(f"{path.stem}.links.json")
+
+def write_report(index, path):
+    """Save the link resolution report and print a one-line summary."""
+    report = index.report()
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Links: {report['links']} ({report['link_texts']} distinct), "
+          f"{len(report['ambiguous'])} ambiguous, {len(report['unresolved'])} unresolved. "
+          f"Report: {path}")
+    return report
+
+def fix_links():
+    if not FILE_PATH.exists():
+        print(f"File not found: {FILE_PATH}")
+        return
+
+    content = FILE_PATH.read_text(encoding='utf-8')
+
+    # 1. Gather headers and link texts, index them
+    lines = content.split("\n")
+    index = HeaderIndex(collect_headers(lines), collect_link_texts(lines))
+
+    print(f"Found {len(index.headers)} headers.")
+
+    # 2. Replace links
+    new_content = "\n".join(link_lines(lines, index))
+
     # Write back
     FILE_PATH.write_text(new_content, encoding='utf-8')
     print("Links fixed.")
+    write_report(index, report_path(FILE_PATH))
 
 if __name__ == "__main__":
     fix_links()
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+HTML解析后端
+
+HTML到Markdown的转换只依赖这里定义的一组很小的节点接口，因此可以在
+selectolax、lxml 或 BeautifulSoup(html.parser) 上运行。安装了更快的解析库时
+自动使用，否则退回 BeautifulSoup；各后端产生的Markdown逐字节一致。
+
+节点接口：
+    kind            TEXT / COMMENT / ELEMENT / OTHER
+    tag             元素标签名（小写），非元素为 None
+    text            文本节点的内容
+    children()      子节点列表（含文本节点）
+    get(name)       读取属性
+    set(name, val)  设置属性
+    get_text()      所有后代文本拼接
+    find_all(names, recursive=True)
+    find(name, class_=None)
+"""
+
+TEXT = "text"
+COMMENT = "comment"
+ELEMENT = "element"
+OTHER = "other"
+
+# 解析库在创建对应后端时才导入，这里缓存节点类型判断需要用到的类
+_soup_types: tuple = ()
+_lxml_comment_tag = None
+
+
+# ================================================================================================
+# BeautifulSoup (html.parser)
+# ================================================================================================
+
+class SoupNode:
+    """BeautifulSoup 节点适配器"""
+
+    __slots__ = ("raw", "kind", "tag")
+
+    def __init__(self, raw) -> None:
+        Comment, NavigableString, Tag = _soup_types
+        self.raw = raw
+        if isinstance(raw, Comment):
+            self.kind, self.tag = COMMENT, None
+        elif isinstance(raw, NavigableString):
+            self.kind, self.tag = TEXT, None
+        elif isinstance(raw, Tag) and raw.name:
+            self.kind, self.tag = ELEMENT, raw.name
+        else:
+            self.kind, self.tag = OTHER, None
+
+    @property
+    def text(self) -> str:
+        return str(self.raw)
+
+    def children(self) -> list["SoupNode"]:
+        return [SoupNode(child) for child in self.raw.children]
+
+    def get(self, name: str, default=None):
+        return self.raw.get(name, default)
+
+    def set(self, name: str, value: str) -> None:
+        self.raw[name] = value
+
+    def get_text(self) -> str:
+        return self.raw.get_text()
+
+    def find_all(self, names, recursive: bool = True) -> list["SoupNode"]:
+        return [SoupNode(node) for node in self.raw.find_all(names, recursive=recursive)]
+
+    def find(self, name: str, class_: str | None = None) -> "SoupNode | None":
+        node = self.raw.find(name, class_=class_) if class_ else self.raw.find(name)
+        return SoupNode(node) if node is not None else None
+
+
+class SoupBackend:
+    """BeautifulSoup + html.parser（纯Python，始终可用）"""
+
+    name = "bs4"
+
+    def __init__(self) -> None:
+        global _soup_types
+        from bs4 import Comment, NavigableString, Tag
+
+        _soup_types = (Comment, NavigableString, Tag)
+
+    def parse(self, html: str) -> SoupNode:
+        from bs4 import BeautifulSoup
+
+        return SoupNode(BeautifulSoup(html, 'html.parser'))
+
+    def serialize(self, root: SoupNode) -> str:
+        return str(root.raw)
+
+
+# ================================================================================================
+# lxml
+# ================================================================================================
+
+class LxmlText:
+    """lxml 的 text/tail 字符串包装成独立的文本节点"""
+
+    __slots__ = ("text",)
+
+    kind = TEXT
+    tag = None
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def children(self) -> list:
+        return []
+
+    def get_text(self) -> str:
+        return self.text
+
+
+class LxmlNode:
+    """lxml.html 元素适配器"""
+
+    __slots__ = ("raw", "kind", "tag")
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        tag = raw.tag
+        if isinstance(tag, str):
+            self.kind, self.tag = ELEMENT, tag.lower()
+        elif tag is _lxml_comment_tag:
+            self.kind, self.tag = COMMENT, None
+        else:
+            self.kind, self.tag = OTHER, None
+
+    @property
+    def text(self) -> str:
+        return self.raw.text or ""
+
+    def children(self) -> list:
+        raw = self.raw
+        nodes = []
+        if raw.text and self.kind == ELEMENT:
+            nodes.append(LxmlText(raw.text))
+        for child in raw:
+            nodes.append(LxmlNode(child))
+            if child.tail:
+                nodes.append(LxmlText(child.tail))
+        return nodes
+
+    def get(self, name: str, default=None):
+        return self.raw.get(name, default)
+
+    def set(self, name: str, value: str) -> None:
+        self.raw.set(name, value)
+
+    def get_text(self) -> str:
+        parts = []
+        _lxml_collect_text(self.raw, parts)
+        return "".join(parts)
+
+    def find_all(self, names, recursive: bool = True) -> list["LxmlNode"]:
+        names = {names} if isinstance(names, str) else set(names)
+        if recursive:
+            elements = (el for el in self.raw.iterdescendants() if isinstance(el.tag, str))
+        else:
+            elements = (el for el in self.raw if isinstance(el.tag, str))
+        return [LxmlNode(el) for el in elements if el.tag.lower() in names]
+
+    def find(self, name: str, class_: str | None = None) -> "LxmlNode | None":
+        for el in self.raw.iter(name):
+            if el is self.raw:
+                continue
+            if class_ is None or class_ in (el.get("class") or "").split():
+                return LxmlNode(el)
+        return None
+
+
+def _lxml_collect_text(element, parts: list[str]) -> None:
+    """
+    按文档顺序收集元素内的文本（不含注释和处理指令的内容）
+
+    用显式栈代替递归，嵌套很深的页面也不会超出递归深度限制。栈中的字符串是
+    子元素的 tail，在该子元素的全部后代之后输出。
+    """
+    stack: list = [element]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        if isinstance(item.tag, str) and item.text:
+            parts.append(item.text)
+        for child in reversed(item):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+
+
+class LxmlBackend:
+    """lxml.html（libxml2）"""
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        global _lxml_comment_tag
+        from lxml import etree
+        import lxml.html  # noqa: F401
+
+        _lxml_comment_tag = etree.Comment
+
+    def parse(self, html: str) -> LxmlNode:
+        import lxml.html
+
+        return LxmlNode(lxml.html.document_fromstring(html))
+
+    def serialize(self, root: LxmlNode) -> str:
+        import lxml.html
+
+        return lxml.html.tostring(root.raw.getroottree(), encoding="unicode", doctype="<!DOCTYPE html>")
+
+
+# ================================================================================================
+# selectolax (lexbor)
+# ================================================================================================
+
+class LexborNode:
+    """selectolax 节点适配器"""
+
+    __slots__ = ("raw", "kind", "tag")
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        tag = raw.tag
+        if tag == "-text":
+            self.kind, self.tag = TEXT, None
+        elif tag == "_comment":
+            self.kind, self.tag = COMMENT, None
+        elif tag and not tag.startswith(("-", "_", "!")):
+            self.kind, self.tag = ELEMENT, tag
+        else:
+            self.kind, self.tag = OTHER, None
+
+    @property
+    def text(self) -> str:
+        return self.raw.text_content or ""
+
+    def children(self) -> list["LexborNode"]:
+        return [LexborNode(child) for child in self.raw.iter(include_text=True)]
+
+    def get(self, name: str, default=None):
+        value = self.raw.attributes.get(name, default)
+        return default if value is None else value
+
+    def set(self, name: str, value: str) -> None:
+        self.raw.attrs[name] = value
+
+    def get_text(self) -> str:
+        return self.raw.text(deep=True)
+
+    def find_all(self, names, recursive: bool = True) -> list["LexborNode"]:
+        names = {names} if isinstance(names, str) else set(names)
+        if recursive:
+            elements = self.raw.traverse(include_text=False)
+            return [LexborNode(el) for el in elements if el is not None and el.tag in names and el != self.raw]
+        return [LexborNode(el) for el in self.raw.iter(include_text=False) if el.tag in names]
+
+    def find(self, name: str, class_: str | None = None) -> "LexborNode | None":
+        selector = f"{name}.{class_}" if class_ else name
+        node = self.raw.css_first(selector)
+        return LexborNode(node) if node is not None else None
+
+
+class LexborBackend:
+    """selectolax.lexbor"""
+
+    name = "selectolax"
+
+    def __init__(self) -> None:
+        from selectolax.lexbor import LexborHTMLParser  # noqa: F401  仅用于检测是否安装
+
+    def parse(self, html: str) -> LexborNode:
+        from selectolax.lexbor import LexborHTMLParser
+
+        parser = LexborHTMLParser(html)
+        return LexborNode(parser.root)
+
+    def serialize(self, root: LexborNode) -> str:
+        return "<!DOCTYPE html>" + root.raw.html
+
+
+# ================================================================================================
+# 后端选择
+# ================================================================================================
+
+BACKENDS = {
+    "selectolax": LexborBackend,
+    "lxml": LxmlBackend,
+    "bs4": SoupBackend,
+}
+
+# auto 模式下的尝试顺序（由快到慢）
+AUTO_ORDER = ["selectolax", "lxml", "bs4"]
+
+
+def available_backends() -> list[str]:
+    """返回当前环境中可用的后端名称"""
+    names = []
+    for name in AUTO_ORDER:
+        try:
+            BACKENDS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_backend(name: str = "auto"):
+    """
+    获取解析后端
+
+    :param name: 后端名称（selectolax / lxml / bs4），auto 表示选择可用的最快后端
+    :return: 后端实例
+    """
+    if name == "auto":
+        for candidate in AUTO_ORDER:
+            try:
+                return BACKENDS[candidate]()
+            except ImportError:
+                continue
+    if name not in BACKENDS:
+        raise ValueError(f"未知的解析后端: {name}（可选: {', '.join(BACKENDS)}, auto）")
+    return BACKENDS[name]()
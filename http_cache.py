@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+持久化HTTP缓存
+
+按URL保存响应体以及 ETag / Last-Modified 校验信息，重新抓取时发送
+If-None-Match / If-Modified-Since，服务器返回 304 时直接复用本地副本。
+"""
+
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from md_common import write_atomic
+
+
+class HttpCache:
+    """
+    磁盘上的HTTP缓存
+
+    目录结构：
+        <root>/index.json      URL -> {etag, last_modified, file, size}
+        <root>/bodies/<hash>   响应体
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.bodies_dir = self.root / "bodies"
+        self.index_file = self.root / "index.json"
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+    def body_path(self, url: str) -> Path:
+        """URL对应的响应体文件"""
+        return self.bodies_dir / hashlib.sha256(url.encode()).hexdigest()[:32]
+
+    def lookup(self, url: str) -> bytes | None:
+        """
+        读取缓存的响应体
+
+        :param url: 请求URL
+        :return: 响应体，未缓存或文件缺失时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return None
+        path = self.root / entry["file"]
+        if not path.exists():
+            return None
+        return path.read_bytes()
+
+    def validators(self, url: str) -> dict[str, str]:
+        """
+        生成条件请求头
+
+        :param url: 请求URL
+        :return: If-None-Match / If-Modified-Since 请求头
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry or not (self.root / entry["file"]).exists():
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, body: bytes, response_headers) -> None:
+        """
+        写入缓存（响应体先写临时文件再原子重命名）
+
+        :param url: 请求URL
+        :param body: 响应体
+        :param response_headers: 响应头，用于提取 ETag / Last-Modified
+        """
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        path = self.body_path(url)
+        write_atomic(path, body)
+        entry = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "file": path.relative_to(self.root).as_posix(),
+            "size": len(body),
+        }
+        with self._lock:
+            self._entries[url] = entry
+
+    def save(self) -> None:
+        """保存缓存索引"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False, indent=2, sort_keys=True)
+        write_atomic(self.index_file, data)
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+本地文档站点替身
+
+用已保存的 QMT_Docs/*.html 和 QMT_Docs/images/ 模拟 dict.thinktrader.net，
+便于在离线环境下验证并发抓取、限速和图片下载流程。
+
+用法：
+    uv run python local_mirror.py --port 8765 --latency 0.2
+    uv run python qmt_crawler.py --base-url http://127.0.0.1:8765/nativeApi/
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+
+DOCS_DIR = Path(__file__).resolve().parent / "QMT_Docs"
+PAGE_PREFIX = "/nativeApi/"
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+}
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+    """按线上站点的路径布局返回本地文件"""
+
+    docs_dir: Path = DOCS_DIR
+    latency: float = 0.0
+    request_count: int = 0
+    _count_lock = threading.Lock()
+
+    def resolve(self, path: str) -> Path | None:
+        """把请求路径映射到本地文件"""
+        path = unquote(urlparse(path).path)
+        name = path.rsplit("/", 1)[-1]
+        if not name:
+            return None
+        if path.startswith(PAGE_PREFIX):
+            candidate = self.docs_dir / name
+            return candidate if candidate.is_file() else None
+        # 图片以 "<hash>_<原文件名>" 保存，按原文件名匹配
+        images_dir = self.docs_dir / "images"
+        exact = images_dir / name
+        if exact.is_file():
+            return exact
+        for candidate in sorted(images_dir.glob(f"*_{name}")):
+            return candidate
+        return None
+
+    def do_GET(self):
+        with self._count_lock:
+            type(self).request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        local = self.resolve(self.path)
+        if local is None:
+            self.send_error(404)
+            return
+        body = local.read_bytes()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES.get(local.suffix.lower(), "application/octet-stream"))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(local.stat().st_mtime, usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port: int = 0, latency: float = 0.0, docs_dir: Path = DOCS_DIR) -> ThreadingHTTPServer:
+    """
+    创建替身服务器
+
+    :param port: 监听端口，0 表示随机端口
+    :param latency: 每个请求的模拟延迟（秒）
+    :param docs_dir: 保存的文档目录
+    :return: 未启动的服务器实例
+    """
+    handler = type("BoundMirrorHandler", (MirrorHandler,), {"docs_dir": docs_dir, "latency": latency})
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+@contextmanager
+def serve(port: int = 0, latency: float = 0.0, docs_dir: Path = DOCS_DIR):
+    """
+    在后台线程中运行替身服务器
+
+    :return: 指向替身站点的 BASE_URL
+    """
+    server = make_server(port, latency, docs_dir)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, bound_port = server.server_address[:2]
+        yield f"http://{host}:{bound_port}{PAGE_PREFIX}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地文档站点替身")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--docs-dir", type=Path, default=DOCS_DIR, help="保存的文档目录")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.docs_dir)
+    host, port = server.server_address[:2]
+    print(f"✓ 替身站点已启动: http://{host}:{port}{PAGE_PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
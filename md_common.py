@@ -0,0 +1,228 @@
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Shared, precompiled patterns for the markdown post-processors, and the
+# atomic file writes every script uses.
+
+# "#### Title" (any ATX header)
+HEADER_RE = re.compile(r'^\s*#{1,6}\s')
+# "#### # Title" - the crawler's headers keep the site's "#" permalink marker
+ANCHOR_HEADER_RE = re.compile(r'^\s*#+\s+#\s+(.*)$')
+HR_RE = re.compile(r'^\s*[-*_]{3,}\s*$')
+BULLET_RE = re.compile(r'^\s*[-*+]\s')
+ORDERED_RE = re.compile(r'^\s*\d+\.\s')
+# Bullet or ordered list item, capturing its indentation
+LIST_ITEM_RE = re.compile(r'^(\s*)([-*+]|\d+\.)\s')
+TABLE_RE = re.compile(r'^\s*\|.*\|\s*$')
+# Opening fence as indent_code_blocks sees it (also "- ```" inside a list item)
+FENCE_OPEN_RE = re.compile(r'^\s*(- )?```')
+NON_INDENTED_RE = re.compile(r'^\S')
+# [LinkText 在新窗口打开](URL)
+NEW_WINDOW_LINK_RE = re.compile(r'\[(.*?)\s+在新窗口打开\]\(.*?\)')
+# ](#fragment) - an in-page link; the fragment may contain spaces and one level of parentheses
+ANCHOR_LINK_RE = re.compile(r'\]\(#((?:[^()\n]|\([^()\n]*\))+)\)')
+# Characters dropped when a header or link fragment is normalized (GitHub-style, case kept)
+ANCHOR_STRIP_RE = re.compile(r'[^\w\- ]')
+
+
+def header_anchor(title):
+    """Fragment fix_links links a "#### # Title" header with: "-Title"."""
+    return f"-{title}"
+
+
+def anchor_key(fragment):
+    """
+    Normalized form of a link fragment or header anchor, so the two can be
+    matched: punctuation is dropped and each space becomes "-", as in the
+    GitHub-style slugs of the table of contents. "-指定session id范围连接交易"
+    and the header's "-指定session-id范围连接交易" get the same key, and so do
+    "XtQuantXtData-行情模块" and "XtQuant.XtData 行情模块".
+    """
+    return ANCHOR_STRIP_RE.sub("", fragment.replace("\t", " ")).replace(" ", "-")
+
+
+def is_fence_marker(line):
+    return line.strip().startswith("```")
+
+
+class FenceTracker:
+    """
+    Tracks whether a line stream is inside a fenced code block.
+
+    A block closes on any line starting with ``` (after stripping). What opens
+    one is configurable: by default the same test, or a regex such as
+    FENCE_OPEN_RE. feed() returns "open", "close", "inside" or "outside".
+    """
+
+    def __init__(self, opening=None):
+        self.opening = opening
+        self.inside = False
+
+    def feed(self, line):
+        if self.inside:
+            if is_fence_marker(line):
+                self.inside = False
+                return "close"
+            return "inside"
+        opens = self.opening.match(line) if self.opening is not None else is_fence_marker(line)
+        if opens:
+            self.inside = True
+            return "open"
+        return "outside"
+
+
+def leading_spaces(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def content_column(line, match):
+    """
+    Column where a list item's content starts, from its LIST_ITEM_RE match:
+    the end of the marker plus the spaces after it. Like CommonMark, five or
+    more spaces (an indented code block) count as one.
+    """
+    marker_end = end = match.end(2)
+    n = len(line)
+    while end < n and line[end] == " ":
+        end += 1
+    if end == marker_end or end - marker_end > 4 or end == n:
+        # A tab, an indented code block or an empty item
+        return marker_end + 1
+    return end
+
+
+class ListContext:
+    """
+    Forward-tracked list/heading context.
+
+    Keeps a stack of the open list items' content columns (where the text
+    after the marker starts: 2 for "- item", 3 for "1. item"). After feeding
+    lines in order, `indent` is the indentation a code fence placed next
+    should get: the content column of the innermost open item, 0 when no item
+    is open. A header or a non-indented line closes every item; a list item
+    closes the items it is not nested in (its siblings and deeper items); an
+    indented text line closes the items whose content column lies to its
+    right. Blank lines change nothing. Fenced code blocks should not be fed -
+    they do not open or close items.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    @property
+    def indent(self):
+        return self.items[-1] if self.items else 0
+
+    def feed(self, line):
+        if not line.strip():
+            return
+        if HEADER_RE.match(line) or (NON_INDENTED_RE.match(line) and not LIST_ITEM_RE.match(line)):
+            self.items.clear()
+            return
+        m_list = LIST_ITEM_RE.match(line)
+        if m_list:
+            indent = len(m_list.group(1))
+            while self.items and self.items[-1] > indent:
+                self.items.pop()
+            self.items.append(content_column(line, m_list))
+            return
+        indent = len(line) - len(line.lstrip())
+        while self.items and self.items[-1] > indent:
+            self.items.pop()
+
+
+def split_sections(data):
+    """
+    Split markdown bytes into header-delimited sections, skipping "#" lines
+    inside code blocks.
+
+    Returns (title, level, line number, byte offset, byte length) tuples. Text
+    before the first header is a section with an empty title and level 0.
+    """
+    fence = FenceTracker(FENCE_OPEN_RE)
+    sections = []
+    title, level, line_no, start = "", 0, 1, 0
+    offset = 0
+    for number, raw in enumerate(data.splitlines(keepends=True), 1):
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if fence.feed(line) == "outside" and HEADER_RE.match(line):
+            if offset > start or title:
+                sections.append((title, level, line_no, start, offset - start))
+            stripped = line.strip()
+            m = ANCHOR_HEADER_RE.match(line)
+            title = m.group(1).strip() if m else stripped.lstrip("#").strip()
+            level = len(stripped) - len(stripped.lstrip("#"))
+            line_no, start = number, offset
+        offset += len(raw)
+    if offset > start or title:
+        sections.append((title, level, line_no, start, offset - start))
+    return sections
+
+
+# Atomic writes
+#
+# Outputs are written to a temporary file next to the target and renamed over
+# it, so a reader never sees a half-written file. mkstemp creates the temporary
+# file with mode 0600; before the rename it gets the mode open() would have
+# given a new file (0666 minus the umask), so the docs, images and indexes stay
+# readable by other users and by a web server.
+
+# Read once at import, while the process is single-threaded: os.umask can only
+# be read by setting it
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def file_mode():
+    """Permissions open() gives a new file: 0o666 minus the umask."""
+    return 0o666 & ~_UMASK
+
+
+def temp_path(directory, prefix=".tmp-", suffix=".tmp"):
+    """A new, empty temporary file in `directory` (for publish_file)."""
+    fd, name = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=suffix)
+    os.close(fd)
+    return Path(name)
+
+
+def publish_file(tmp, path):
+    """Give a finished temporary file open()'s permissions and rename it over `path`."""
+    os.chmod(tmp, file_mode())
+    os.replace(tmp, path)
+
+
+@contextmanager
+def atomic_path(path, suffix=".tmp"):
+    """
+    Yield a temporary file name next to `path`. When the block completes the
+    file replaces `path` (see publish_file); if it raises, the file is removed.
+    """
+    path = Path(path)
+    tmp = temp_path(path.parent, prefix=f".{path.name}-", suffix=suffix)
+    try:
+        yield tmp
+        publish_file(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def atomic_open(path, mode="w", encoding=None, newline=None):
+    """open() for an atomic write: `mode` is "w" (text) or "wb"."""
+    if "b" not in mode and encoding is None:
+        encoding = "utf-8"
+    with atomic_path(path) as tmp:
+        with open(tmp, mode, encoding=encoding, newline=newline) as f:
+            yield f
+
+
+def write_atomic(path, data):
+    """Atomically write bytes, or str as UTF-8."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_open(path, "wb") as f:
+        f.write(data)
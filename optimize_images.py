@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+图片优化
+
+在图片下载完成后、替换页面中的图片URL之前执行：
+    - PNG 无损重新压缩：去掉不影响显示的元数据块（文本、时间、EXIF 等），
+      以最高压缩级别重新压缩图像数据，像素数据与原图逐字节一致；安装了 Pillow 时
+      还会让 Pillow 重新选择扫描行过滤方式，取两者中更小的结果。
+    - 可选（需要 Pillow）：生成 WebP 版本和指定宽度的缩略图。
+    - 各图片在进程池中并行处理；结果按源文件内容hash和选项缓存，未变化的图片不会重复处理。
+
+优化后的文件保存在 images/opt/ 中，文件名保留源文件的内容hash；Markdown 中的图片引用
+指向优化后的文件（启用 WebP 且更小时指向 WebP）。优化没有收益的图片继续引用原文件。
+images/opt/manifest.json 记录每张图片的各个版本及字节数。
+"""
+
+import hashlib
+import json
+import os
+import struct
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+from md_common import write_atomic
+
+
+OPT_DIR_NAME = "opt"
+MANIFEST_NAME = "manifest.json"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 影响显示的块（颜色、调色板、透明度）；其余辅助块（tEXt、tIME、eXIf 等）被去掉
+PNG_KEEP_CHUNKS = frozenset([b"IHDR", b"PLTE", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"pHYs"])
+# 可生成 WebP / 缩略图的格式
+RASTER_SUFFIXES = frozenset([".png", ".jpg", ".jpeg", ".gif", ".webp"])
+WEBP_QUALITY = 85
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ================================================================================================
+# PNG 无损重新压缩（仅使用标准库）
+# ================================================================================================
+
+def png_chunks(data: bytes):
+    """遍历PNG的 (类型, 数据)，签名或CRC不正确时抛出 ValueError"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("不是PNG文件")
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise ValueError("PNG块不完整")
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        crc = data[pos + 8 + length:pos + 12 + length]
+        if len(body) != length or len(crc) != 4 or struct.unpack(">I", crc)[0] != zlib.crc32(kind + body):
+            raise ValueError(f"PNG块损坏: {kind!r}")
+        yield kind, body
+        pos += 12 + length
+        if kind == b"IEND":
+            return
+    raise ValueError("缺少IEND块")
+
+
+def png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def recompress_png(data: bytes) -> bytes:
+    """
+    无损重新压缩PNG
+
+    解压后的图像数据（含每行的过滤类型）保持不变，只去掉辅助块并用更强的压缩参数重新压缩，
+    因此像素与原图完全一致。动画PNG原样返回。
+
+    :return: 新的PNG数据（不小于原图时返回原数据）
+    """
+    head, tail, idat = [], [], []
+    for kind, body in png_chunks(data):
+        if kind == b"acTL":
+            return data
+        if kind == b"IDAT":
+            idat.append(body)
+        elif kind in PNG_KEEP_CHUNKS:
+            (tail if idat else head).append(png_chunk(kind, body))
+    raw = zlib.decompress(b"".join(idat))
+
+    best = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        packed = compressor.compress(raw) + compressor.flush()
+        if best is None or len(packed) < len(best):
+            best = packed
+    result = PNG_SIGNATURE + b"".join(head) + png_chunk(b"IDAT", best) + b"".join(tail) + png_chunk(b"IEND", b"")
+    return result if len(result) < len(data) else data
+
+
+def pillow_png(data: bytes) -> bytes | None:
+    """用 Pillow 重新编码PNG（重新选择过滤方式，像素不变），未安装时返回 None"""
+    if not pillow_available():
+        return None
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        if getattr(image, "is_animated", False):
+            return None
+        out = BytesIO()
+        params = {"optimize": True}
+        for key in ("transparency", "icc_profile", "gamma"):
+            if key in image.info:
+                params[key] = image.info[key]
+        image.save(out, format="PNG", **params)
+    return out.getvalue()
+
+
+# ================================================================================================
+# 单张图片（进程池工作函数）
+# ================================================================================================
+
+
+def optimize_one(source: Path, out_dir: Path, webp: bool, thumbnails: tuple[int, ...]) -> dict:
+    """
+    优化一张图片
+
+    :param source: 源图片
+    :param out_dir: 输出目录（images/opt）
+    :param webp: 是否生成 WebP 版本
+    :param thumbnails: 缩略图宽度
+    :return: 结果条目：源文件、首选文件及各版本的 {文件名: 字节数}
+    """
+    data = source.read_bytes()
+    suffix = source.suffix.lower()
+    entry = {
+        "source": source.name,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "bytes": len(data),
+        "variants": {},
+        "preferred": source.name,
+        "errors": [],
+    }
+    best_name, best_size = None, len(data)
+
+    if suffix == ".png":
+        try:
+            candidates = [recompress_png(data)]
+            try:
+                candidates.append(pillow_png(data))
+            except Exception as e:  # Pillow 无法处理的文件仍使用标准库结果
+                entry["errors"].append(f"pillow: {e}")
+            optimized = min((c for c in candidates if c), key=len)
+            if len(optimized) < len(data):
+                name = source.name
+                write_atomic(out_dir / name, optimized)
+                entry["variants"][name] = len(optimized)
+                best_name, best_size = name, len(optimized)
+        except (ValueError, zlib.error) as e:
+            entry["errors"].append(str(e))
+
+    if (webp or thumbnails) and suffix in RASTER_SUFFIXES and pillow_available():
+        from PIL import Image
+
+        try:
+            with Image.open(BytesIO(data)) as image:
+                image.load()
+                if webp:
+                    out = BytesIO()
+                    image.save(out, format="WEBP", quality=WEBP_QUALITY, method=6)
+                    name = f"{source.stem}.webp"
+                    write_atomic(out_dir / name, out.getvalue())
+                    entry["variants"][name] = len(out.getvalue())
+                    if len(out.getvalue()) < best_size:
+                        best_name, best_size = name, len(out.getvalue())
+                for width in thumbnails:
+                    if image.width <= width:
+                        continue
+                    thumb = image.copy()
+                    thumb.thumbnail((width, round(image.height * width / image.width)))
+                    out = BytesIO()
+                    if webp:
+                        thumb.save(out, format="WEBP", quality=WEBP_QUALITY, method=6)
+                        name = f"{source.stem}-w{width}.webp"
+                    else:
+                        thumb.save(out, format="PNG", optimize=True)
+                        name = f"{source.stem}-w{width}.png"
+                    write_atomic(out_dir / name, out.getvalue())
+                    entry["variants"][name] = len(out.getvalue())
+        except Exception as e:
+            entry["errors"].append(f"pillow: {e}")
+
+    if best_name is not None:
+        entry["preferred"] = f"{OPT_DIR_NAME}/{best_name}"
+    return entry
+
+
+# ================================================================================================
+# 图片目录
+# ================================================================================================
+
+def options_key(webp: bool, thumbnails: tuple[int, ...]) -> str:
+    """选项和优化代码的指纹（变化后缓存失效）"""
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(json.dumps([webp, list(thumbnails), pillow_available()]).encode())
+    return digest.hexdigest()[:16]
+
+
+def optimize_images(
+    images_dir: Path,
+    names: list[str] | None = None,
+    webp: bool = False,
+    thumbnails: tuple[int, ...] = (),
+    workers: int = 0,
+) -> dict[str, dict]:
+    """
+    优化图片目录中的图片
+
+    :param images_dir: 图片目录
+    :param names: 要处理的文件名，为空时处理目录中的所有图片
+    :param webp: 是否生成 WebP 版本（需要 Pillow）
+    :param thumbnails: 缩略图宽度（需要 Pillow）
+    :param workers: 进程数，0 为使用全部CPU核心
+    :return: 源文件名到结果条目的映射（见 optimize_one）
+    """
+    images_dir = Path(images_dir)
+    out_dir = images_dir / OPT_DIR_NAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if names is None:
+        names = sorted(p.name for p in images_dir.iterdir() if p.is_file() and not p.name.startswith("."))
+    if (webp or thumbnails) and not pillow_available():
+        print("  ⚠ 未安装 Pillow，跳过 WebP 和缩略图（pip install pillow）")
+
+    manifest_path = out_dir / MANIFEST_NAME
+    key = options_key(webp, thumbnails)
+    previous: dict[str, dict] = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("options") == key:
+            previous = data.get("images", {})
+
+    results: dict[str, dict] = {}
+    pending = []
+    for name in names:
+        entry = previous.get(name)
+        # 源文件按内容hash命名：条目存在、源文件大小一致且各版本文件都在时直接复用
+        if (entry is not None and (images_dir / name).exists()
+                and (images_dir / name).stat().st_size == entry["bytes"]
+                and all((out_dir / variant).exists() for variant in entry["variants"])):
+            results[name] = entry
+        elif (images_dir / name).exists():
+            pending.append(name)
+
+    if pending:
+        # 进程池模块（multiprocessing）只在确实有图片需要处理时才导入
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        max_workers = min(workers or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(optimize_one, images_dir / name, out_dir, webp, tuple(thumbnails)): name
+                       for name in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"  ✗ 优化失败 {name}: {e}")
+
+    # 清单只包含本次处理的图片，不再引用的版本文件（以及中断留下的临时文件）被删除
+    keep = {variant for entry in results.values() for variant in entry["variants"]}
+    for path in out_dir.iterdir():
+        if path.is_file() and path.name != MANIFEST_NAME and path.name not in keep:
+            path.unlink()
+    write_atomic(manifest_path, json.dumps({"options": key, "images": results}, ensure_ascii=False, indent=2).encode("utf-8"))
+    before = sum(results[name]["bytes"] for name in results)
+    after = sum(preferred_size(images_dir, results[name]) for name in results)
+    print(f"  ✓ 优化 {len(pending)} 张，复用 {len(results) - len(pending)} 张；"
+          f"引用的图片共 {before / 1024:.1f} KiB → {after / 1024:.1f} KiB")
+    return results
+
+
+def preferred_size(images_dir: Path, entry: dict) -> int:
+    """首选版本的字节数"""
+    preferred = entry["preferred"]
+    if preferred == entry["source"]:
+        return entry["bytes"]
+    return entry["variants"][Path(preferred).name]
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="优化图片目录中的图片")
+    parser.add_argument("images_dir", nargs="?", type=Path, default=Path("QMT-API/QMT_Docs/images"))
+    parser.add_argument("--webp", action="store_true", help="生成 WebP 版本（需要 Pillow）")
+    parser.add_argument("--thumbnails", type=int, nargs="*", default=[], metavar="WIDTH", help="缩略图宽度（需要 Pillow）")
+    parser.add_argument("--workers", type=int, default=0, help="进程数，0 为使用全部CPU核心")
+    args = parser.parse_args(argv)
+    if not args.images_dir.is_dir():
+        print(f"✗ 图片目录不存在: {args.images_dir}")
+        return 1
+    optimize_images(args.images_dir, webp=args.webp, thumbnails=tuple(args.thumbnails), workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
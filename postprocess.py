@@ -0,0 +1,215 @@
+"""
+Single-pass post-processing engine.
+
+Replaces running format_docs.py, fix_links.py and indent_code_blocks.py one
+after another: the raw document is read once, every registered line transform
+runs as a stage of one streaming generator pipeline, and the result is written
+once. The output is identical to the three-step sequence.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import doc_merkle
+import fix_links
+import format_docs
+import indent_code_blocks
+import search_index
+import stage_metrics
+from md_common import atomic_open
+
+# chunk_docs, code_examples and static_site are imported only when their
+# option is given, to keep startup cheap for the common case.
+
+DOCS_DIR = Path("QMT_Docs")
+INPUT_FILE = DOCS_DIR / "QMT_API_Documentation.md"
+OUTPUT_FILE = DOCS_DIR / "QMT_API_Documentation_Format.md"
+
+
+class Document:
+    """Whole-document facts that line transforms need up front."""
+
+    def __init__(self, lines):
+        # fix_links resolves links against every header, including later ones.
+        # Formatting only adds/removes blank lines, so headers and link texts
+        # can be collected from the raw input.
+        self.headers = fix_links.collect_headers(lines)
+        self.links = fix_links.HeaderIndex(self.headers, fix_links.collect_link_texts(lines))
+        self.stats = {}
+
+
+def _splitlines_boundary(lines, document):
+    # indent_code_blocks.py used to re-read the file with splitlines(), which
+    # drops the final empty line of "\n".join(lines). Keep that behaviour.
+    pending = False
+    for line in lines:
+        if pending:
+            yield ""
+            pending = False
+        if line == "":
+            pending = True
+            continue
+        yield line
+
+
+# Registered transforms, in order. Each takes (lines, document) and yields lines.
+TRANSFORMS = [
+    ("format", lambda lines, document: format_docs.format_lines(lines)),
+    ("collapse_blank_lines", lambda lines, document: format_docs.collapse_blank_lines(lines)),
+    ("fix_links", lambda lines, document: fix_links.link_lines(lines, document.links)),
+    ("splitlines_boundary", _splitlines_boundary),
+    ("indent_code_blocks", lambda lines, document: indent_code_blocks.indent_lines(lines, document.stats)),
+]
+
+
+def _timed(stream, name, timings):
+    # Time spent pulling lines out of `stream`, which includes every upstream stage
+    clock = time.perf_counter
+    total = 0.0
+    try:
+        while True:
+            start = clock()
+            try:
+                line = next(stream)
+            except StopIteration:
+                total += clock() - start
+                return
+            total += clock() - start
+            yield line
+    finally:
+        timings[name] = timings.get(name, 0.0) + total
+
+
+def run_transforms(lines, document, transforms=None, timings=None):
+    """
+    Chain the transforms into one lazy pipeline over `lines`.
+
+    If `timings` is a dict, it receives each transform's cumulative time
+    (including the stages before it) once the pipeline is consumed; see
+    exclusive_timings().
+    """
+    stream = iter(lines)
+    for name, transform in transforms or TRANSFORMS:
+        stream = transform(stream, document)
+        if timings is not None:
+            stream = _timed(stream, name, timings)
+    return stream
+
+
+def exclusive_timings(timings):
+    """Turn the cumulative per-transform times from run_transforms() into per-transform times."""
+    exclusive = {}
+    upstream = 0.0
+    for name, total in timings.items():
+        exclusive[name] = max(total - upstream, 0.0)
+        upstream = total
+    return exclusive
+
+
+def postprocess(content):
+    lines = content.splitlines()
+    document = Document(lines)
+    return "\n".join(run_transforms(lines, document))
+
+
+def write_lines(path, lines):
+    """Stream lines to a temp file next to `path`, then atomically replace it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(path) as f:
+        first = True
+        for line in lines:
+            if not first:
+                f.write("\n")
+            f.write(line)
+            first = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Format, link and indent the crawled documentation in one pass")
+    parser.add_argument("input", nargs="?", type=Path, default=INPUT_FILE)
+    parser.add_argument("output", nargs="?", type=Path, default=OUTPUT_FILE)
+    parser.add_argument("--chunks", action="store_true",
+                        help="also split the output into per-section files (see chunk_docs.py)")
+    parser.add_argument("--examples", action="store_true",
+                        help="also extract and syntax-check the code examples (see code_examples.py)")
+    parser.add_argument("--site", action="store_true",
+                        help="also build the static HTML site (see static_site.py)")
+    parser.add_argument("--metrics", type=Path, metavar="PATH", help="write per-stage metrics as JSON to PATH")
+    parser.add_argument("--profile", type=Path, metavar="DIR", help="save a cProfile dump (.pstats) per stage in DIR")
+    args = parser.parse_args(argv)
+    input_file, output_file = args.input, args.output
+
+    if not input_file.exists():
+        print(f"File not found: {input_file}")
+        return
+
+    recorder = stage_metrics.MetricsRecorder(profile_dir=args.profile)
+    with recorder.stage("read"):
+        lines = input_file.read_text(encoding='utf-8').splitlines()
+        stage_metrics.add(bytes_read=input_file.stat().st_size)
+        document = Document(lines)
+    print(f"Processing {len(lines)} lines, {len(document.headers)} headers...")
+
+    with recorder.stage("transform") as stage:
+        timings = {}
+        write_lines(output_file, run_transforms(lines, document, timings=timings))
+        stage.breakdown = exclusive_timings(timings)
+        stage_metrics.add(bytes_written=output_file.stat().st_size)
+
+    print(f"Processed {document.stats.get('blocks', 0)} code blocks.")
+    print(f"Post-processed file saved to: {output_file}")
+    with recorder.stage("links_report"):
+        report_file = fix_links.report_path(output_file)
+        fix_links.write_report(document.links, report_file)
+        stage_metrics.add(bytes_written=report_file.stat().st_size)
+
+    with recorder.stage("search_index"):
+        stats = search_index.build_index(output_file)
+        stage_metrics.add(bytes_read=output_file.stat().st_size, bytes_written=stats["bytes"])
+    print(f"Search index: {stats['sections']} sections, {stats['terms']} terms: {stats['path']}")
+
+    with recorder.stage("merkle"):
+        tree = doc_merkle.write_tree(output_file)
+        stage_metrics.add(bytes_read=output_file.stat().st_size,
+                          bytes_written=doc_merkle.tree_path(output_file).stat().st_size)
+    print(f"Section hashes: {doc_merkle.count_sections(tree) - 1} sections, root {tree['hash'][:16]}: "
+          f"{doc_merkle.tree_path(output_file)}")
+
+    if args.chunks:
+        import chunk_docs
+        with recorder.stage("chunks"):
+            manifest = chunk_docs.write_chunks(output_file)
+            stage_metrics.add(bytes_read=output_file.stat().st_size)
+        print(f"Split into {len(manifest['chunks'])} chunks ({manifest['written']} written): "
+              f"{chunk_docs.chunk_dir(output_file)}")
+        if manifest["foreign_links"]:
+            print(f"  Warning: {len(manifest['foreign_links'])} links still point at another chunk's anchor")
+
+    if args.examples:
+        import code_examples
+        with recorder.stage("examples"):
+            examples = code_examples.write_examples(output_file)
+            stage_metrics.add(bytes_read=output_file.stat().st_size)
+        print(f"Code examples: {examples['blocks']} blocks, {examples['unique']} unique, "
+              f"{examples['checked']} parsed, {examples['errors']} with syntax errors: "
+              f"{code_examples.examples_dir(output_file)}")
+
+    if args.site:
+        import static_site
+        with recorder.stage("site"):
+            manifest = static_site.build_site(output_file)
+            stage_metrics.add(bytes_read=output_file.stat().st_size,
+                              bytes_written=sum(e["bytes"] for e in manifest["pages"] + manifest["assets"]))
+        print(f"Static site: {len(manifest['pages'])} pages ({manifest['written']} written): "
+              f"{static_site.site_dir(output_file)}")
+
+    print("\nStages:")
+    for line in recorder.summary():
+        print(f"  {line}")
+    if args.metrics:
+        recorder.save(args.metrics)
+        print(f"Metrics saved to: {args.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,40 @@ QMT API 文档爬虫
 2. 下载文档中的所有图片
 3. 替换图片URL为本地路径
 4. 整合为markdown文件
+
+requests 只在第一次发起网络请求时导入，离线转换（--offline）不会加载它。
 """
 
+from __future__ import annotations
+
 import os
 import re
 import time
+import json
 import hashlib
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from html.parser import HTMLParser
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
+from typing import TYPE_CHECKING
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import stage_metrics
+from api_index import INDEX_DB, INDEX_JSON, build_api_index
+from build_manifest import BuildManifest, sha256_bytes
+from crawl_journal import CrawlJournal, file_digest
+from html_backends import COMMENT, ELEMENT, TEXT, get_backend
+from http_cache import HttpCache
+from md_common import publish_file, temp_path
+from optimize_images import optimize_images
+from retry_policy import CircuitBreaker, RetryPolicy, send_with_retry
+from stage_metrics import MetricsRecorder
 
-import requests
-from bs4 import BeautifulSoup
+if TYPE_CHECKING:
+    import requests
 
 
 # ================================================================================================
@@ -27,6 +50,12 @@ from bs4 import BeautifulSoup
 BASE_URL = "https://dict.thinktrader.net/nativeApi/"
 OUTPUT_DIR = Path("./QMT-API/QMT_Docs")
 IMAGES_DIR = OUTPUT_DIR / "images"
+CACHE_DIR = OUTPUT_DIR / ".cache"
+IMAGE_INDEX_FILE = CACHE_DIR / "image_index.json"   # 图片URL -> 内容寻址文件名
+HTTP_CACHE_DIR = CACHE_DIR / "http"                  # 条件请求缓存（ETag / Last-Modified）
+BUILD_DIR = CACHE_DIR / "build"                      # 增量构建清单与页面片段
+METRICS_FILE = CACHE_DIR / "metrics.json"            # 最近一次运行的阶段指标
+JOURNAL_FILE = CACHE_DIR / "journal.sqlite"          # 爬取任务日志（中断后续传）
 
 # 需要爬取的页面列表
 PAGES = [
@@ -38,6 +67,10 @@ PAGES = [
     "download_xtquant.html",
 ]
 
+# 页面发现（--discover）：从 PAGES 出发，沿侧边栏和导航菜单链接广度优先爬取
+DISCOVERY_DEPTH = 2         # 最大链接深度（PAGES 为第 0 层）
+DISCOVERY_MAX_PAGES = 500   # 最多发现的页面数
+
 # 请求头
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -47,6 +80,25 @@ HEADERS = {
     "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
 }
 
+# 并发抓取配置
+MAX_WORKERS = 6         # 工作线程数
+PER_HOST_LIMIT = 4      # 单个主机的最大并发请求数
+RATE_LIMIT = 4.0        # 令牌桶速率（请求/秒），替代固定的 sleep
+RATE_BURST = 4          # 令牌桶容量（允许的突发请求数）
+
+# 重试与熔断（429/5xx/超时可重试，404 等立即失败）
+RETRY_ATTEMPTS = 3      # 每个请求最多尝试次数
+RETRY_BACKOFF = 1.0     # 第一次重试前的最长等待（秒），之后指数增长并加随机抖动
+RETRY_MAX_DELAY = 30.0  # 退避等待上限（秒）；Retry-After 上限为 120 秒
+CIRCUIT_FAILURES = 5    # 同一主机连续失败多少次后熔断
+CIRCUIT_COOLDOWN = 30.0 # 熔断持续时间（秒）
+
+# HTML解析后端：auto / selectolax / lxml / bs4（auto 选择已安装的最快后端）
+PARSER_BACKEND = "auto"
+
+# Markdown转换进程数：1 为在主进程中逐页转换，0 为使用全部CPU核心
+CONVERT_WORKERS = 1
+
 
 # ================================================================================================
 # 辅助函数
@@ -56,122 +108,711 @@ def ensure_dirs() -> None:
     """确保输出目录存在"""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
     print(f"✓ 创建目录: {OUTPUT_DIR}")
     print(f"✓ 创建目录: {IMAGES_DIR}")
 
 
-def fetch_page(url: str, max_retries: int = 3) -> str | None:
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+    
+    每秒补充 rate 个令牌，最多累积 capacity 个；每个请求消耗一个令牌，
+    令牌不足时阻塞等待，从而在并发下仍保持整体请求速率。
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """获取一个令牌，必要时阻塞"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """按主机限制并发请求数"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        """占用目标主机的一个并发名额"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.limit))
+        with semaphore:
+            yield
+
+
+class CrawlClient:
+    """
+    共享的HTTP客户端
+    
+    所有请求复用同一个 keep-alive 会话，并经过令牌桶限速和按主机的并发限制。
+    配置了缓存时页面请求会带上条件请求头；离线模式下只从缓存读取。
+    send() 按重试策略重试失败的请求，并按主机熔断。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        per_host_limit: int = PER_HOST_LIMIT,
+        rate: float = RATE_LIMIT,
+        burst: int = RATE_BURST,
+        cache: HttpCache | None = None,
+        offline: bool = False,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self._session: requests.Session | None = None
+        self._session_lock = threading.Lock()
+        self.bucket = TokenBucket(rate, burst)
+        self.hosts = HostLimiter(per_host_limit)
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self.offline = offline
+        self.retry = retry or RetryPolicy(RETRY_ATTEMPTS, RETRY_BACKOFF, RETRY_MAX_DELAY)
+        self.breaker = breaker or CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_COOLDOWN)
+        self.stats: Counter[str] = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """keep-alive 会话，第一次请求时才创建（并导入 requests）"""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def count(self, key: str, n: int = 1) -> None:
+        """累加运行统计"""
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """限速后发送GET请求"""
+        kwargs.setdefault("timeout", 30)
+        if self.offline:
+            raise RuntimeError(f"离线模式下不能发起请求: {url}")
+        with self.hosts.slot(url):
+            self.bucket.acquire()
+            self.count("requests")
+            return self.session.get(url, **kwargs)
+
+    def send(self, url: str, read=None, **kwargs) -> requests.Response:
+        """按重试策略发送GET请求（等待重试时不占用主机并发名额），read 见 send_with_retry"""
+        return send_with_retry(lambda: self.get(url, **kwargs), url, self.retry, self.breaker, self.count, read=read)
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.save()
+        if self._session is not None:
+            self._session.close()
+
+
+def fetch_page(url: str, client: CrawlClient | None = None) -> str | None:
     """
     获取网页内容
     
+    失败的请求按客户端的重试策略重试（见 retry_policy.py），404 等不可重试的状态码立即返回。
+    
     :param url: 网页URL
-    :param max_retries: 最大重试次数
+    :param client: 共享的HTTP客户端，为空时使用独立请求
     :return: 网页HTML内容
     """
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            if response.status_code == 200:
-                response.encoding = 'utf-8'
-                return response.text
-            else:
-                print(f"  ✗ 请求失败 [{response.status_code}]: {url}")
-                time.sleep(2)
-        except Exception as e:
-            print(f"  ✗ 请求异常: {e}")
-            time.sleep(2)
+    cache = client.cache if client is not None else None
+    if cache is not None and client.offline:
+        cached = cache.lookup(url)
+        if cached is None:
+            print(f"  ✗ 离线模式下缓存中没有: {url}")
+            return None
+        client.count("cache_offline")
+        return cached.decode('utf-8')
+    
+    try:
+        if client is not None:
+            headers = cache.validators(url) if cache is not None else {}
+            response = client.send(url, headers=headers)
+        else:
+            import requests
+            response = send_with_retry(lambda: requests.get(url, headers=HEADERS, timeout=30), url, RetryPolicy())
+    except Exception as e:
+        print(f"  ✗ 请求异常: {e}")
+        return None
+    
+    if response.status_code == 304 and cache is not None:
+        cached = cache.lookup(url)
+        if cached is not None:
+            client.count("cache_revalidated")
+            return cached.decode('utf-8')
+    if response.status_code == 200:
+        if client is not None:
+            client.count("bytes_downloaded", len(response.content))
+        if cache is not None:
+            cache.store(url, response.content, response.headers)
+            client.count("cache_stored")
+        response.encoding = 'utf-8'
+        return response.text
+    print(f"  ✗ 请求失败 [{response.status_code}]: {url}")
     return None
 
 
-def download_image(url: str, save_path: Path) -> bool:
+# Content-Type 到扩展名的映射（URL 中没有扩展名时使用）
+IMAGE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+    "image/webp": ".webp",
+    "image/x-icon": ".ico",
+}
+
+
+def get_image_extension(url: str, content_type: str = "") -> str:
+    """
+    确定图片扩展名
+    
+    :param url: 图片URL
+    :param content_type: 响应的 Content-Type
+    :return: 扩展名（含点号）
+    """
+    ext = os.path.splitext(os.path.basename(urlparse(url).path))[1].lower()
+    if ext:
+        return ext
+    return IMAGE_EXTENSIONS.get(content_type.split(";")[0].strip().lower(), ".png")
+
+
+def download_image(
+    url: str,
+    client: CrawlClient | None = None,
+    journal: CrawlJournal | None = None,
+) -> tuple[str, int] | None:
     """
-    下载图片
+    下载图片到内容寻址存储
+    
+    响应体流式写入临时文件并同时计算 SHA-256，完成后原子重命名为
+    "<内容hash><扩展名>"；内容相同的图片只保存一份。读取响应体时连接中途断开会按
+    重试策略重新下载；响应体短于 Content-Length 时视为失败，不会留下截断的文件。
     
     :param url: 图片URL
-    :param save_path: 保存路径
-    :return: 是否成功
+    :param client: 共享的HTTP客户端，为空时使用独立请求
+    :param journal: 爬取任务日志，记录完成或失败
+    :return: (文件名, 字节数)，失败时返回 None
     """
+    tmp_path = None
+    digest = size = None
+
+    def read_body(response):
+        # 在重试范围内读取：中途断开时重新请求，临时文件从头写起
+        nonlocal tmp_path, digest, size
+        if response.status_code != 200:
+            return
+        digest = hashlib.sha256()
+        size = 0
+        if tmp_path is None:
+            tmp_path = temp_path(IMAGES_DIR, prefix=".download-")
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+
     try:
-        response = requests.get(url, headers=HEADERS, timeout=30, stream=True)
-        if response.status_code == 200:
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            return True
+        if client is not None:
+            response = client.send(url, stream=True, read=read_body)
+        else:
+            import requests
+            response = send_with_retry(
+                lambda: requests.get(url, headers=HEADERS, timeout=30, stream=True), url, RetryPolicy(),
+                read=read_body)
+        with response:
+            if response.status_code != 200:
+                print(f"  ✗ 下载图片失败 [{response.status_code}]: {url}")
+                if journal is not None:
+                    journal.failed(url, "image", f"HTTP {response.status_code}")
+                return None
+            
+            ext = get_image_extension(url, response.headers.get("Content-Type", ""))
+            expected = response.headers.get("Content-Length")
+            if expected and not response.headers.get("Content-Encoding") and int(expected) != size:
+                raise IOError(f"响应不完整: {size}/{expected} 字节")
+        
+        if client is not None:
+            client.count("bytes_downloaded", size)
+        filename = f"{digest.hexdigest()[:16]}{ext}"
+        save_path = IMAGES_DIR / filename
+        if save_path.exists() and save_path.stat().st_size == size:
+            # 相同内容已存在（例如不同CDN地址上的同一张图）
+            tmp_path.unlink()
+        else:
+            publish_file(tmp_path, save_path)
+            stage_metrics.add(bytes_written=size)
+        if journal is not None:
+            journal.done(url, "image", save_path, size, digest.hexdigest())
+        return filename, size
     except Exception as e:
         print(f"  ✗ 下载图片失败: {e}")
-    return False
+        if journal is not None:
+            journal.failed(url, "image", str(e))
+        if tmp_path is not None and tmp_path.exists():
+            tmp_path.unlink()
+    return None
 
 
-def get_image_filename(url: str) -> str:
+def verify_image(url: str, filename: str, journal: CrawlJournal | None = None) -> bool:
     """
-    根据URL生成图片文件名
+    检查已下载的图片是否完整
     
-    :param url: 图片URL
-    :return: 文件名
+    有日志记录时核对长度和hash；没有记录时（旧版本下载的图片）检查内容hash是否与文件名一致，
+    通过后补记到日志中。
     """
-    parsed = urlparse(url)
-    path = parsed.path
-    
-    # 获取原始文件名
-    original_name = os.path.basename(path)
-    
-    if original_name and '.' in original_name:
-        # 添加hash前缀避免重名
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        name, ext = os.path.splitext(original_name)
-        return f"{url_hash}_{name}{ext}"
-    else:
-        # 使用hash作为文件名
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        return f"{url_hash}.png"
+    path = IMAGES_DIR / filename
+    if journal is not None and journal.entry(url) is not None:
+        return journal.verified(url, path)
+    digest = file_digest(path)
+    if digest is None or not digest[1].startswith(Path(filename).stem):
+        return False
+    if journal is not None:
+        journal.done(url, "image", path, *digest)
+    return True
+
+
+def load_image_index() -> dict[str, str]:
+    """读取图片URL到文件名的索引，仅保留文件仍存在的条目"""
+    if not IMAGE_INDEX_FILE.exists():
+        return {}
+    with open(IMAGE_INDEX_FILE, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return {url: name for url, name in index.items() if (IMAGES_DIR / name).exists()}
+
+
+def save_image_index(index: dict[str, str]) -> None:
+    """保存图片URL到文件名的索引"""
+    IMAGE_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(IMAGE_INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
 
 
 # ================================================================================================
 # 步骤2：下载所有网页
 # ================================================================================================
 
-def download_all_pages() -> list[Path]:
+def save_page(page: str, html: str) -> Path:
+    """把页面HTML保存到输出目录"""
+    save_path = OUTPUT_DIR / page
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    stage_metrics.add(bytes_written=save_path.stat().st_size)
+    return save_path
+
+
+def download_page(url: str, page: str, client: CrawlClient, journal: CrawlJournal | None = None) -> str | None:
+    """
+    下载页面并保存到输出目录
+    
+    续传时，本次运行中已完成且文件长度和hash与日志一致的页面直接从磁盘读取，不再请求。
+    
+    :param url: 页面URL
+    :param page: 保存的文件名
+    :param client: 共享的HTTP客户端
+    :param journal: 爬取任务日志
+    :return: 页面HTML，失败时返回 None
+    """
+    save_path = OUTPUT_DIR / page
+    if journal is not None and journal.verified(url, save_path, this_run=True):
+        client.count("resumed")
+        with open(save_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    html = fetch_page(url, client=client)
+    if not html:
+        if journal is not None:
+            journal.failed(url, "page", "下载失败")
+        return None
+    save_page(page, html)
+    if journal is not None:
+        journal.done(url, "page", save_path)
+    return html
+
+
+def download_all_pages(
+    client: CrawlClient | None = None,
+    base_url: str = BASE_URL,
+    journal: CrawlJournal | None = None,
+) -> list[Path]:
     """
-    下载所有API文档页面
+    并发下载所有API文档页面
+    
+    使用有界线程池和共享会话，速率由令牌桶控制而不是固定等待。
     
-    :return: 已下载的文件路径列表
+    :param client: 共享的HTTP客户端，为空时按默认配置创建
+    :param base_url: 文档站点根地址（可指向镜像）
+    :param journal: 爬取任务日志，提供时跳过续传运行中已完成的页面
+    :return: 已下载的文件路径列表（按 PAGES 顺序）
     """
     print("\n" + "=" * 60)
     print("步骤2: 下载所有网页")
     print("=" * 60)
     
-    downloaded_files: list[Path] = []
+    own_client = client is None
+    if own_client:
+        client = CrawlClient()
     
-    for page in PAGES:
-        url = urljoin(BASE_URL, page)
-        save_path = OUTPUT_DIR / page
-        
-        print(f"\n正在下载: {page}")
-        html = fetch_page(url)
-        
-        if html:
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write(html)
-            print(f"  ✓ 保存到: {save_path}")
-            downloaded_files.append(save_path)
-        else:
-            print(f"  ✗ 下载失败: {page}")
-        
-        time.sleep(1)  # 避免请求过快
+    def download(page: str) -> Path | None:
+        html = download_page(urljoin(base_url, page), page, client, journal)
+        return OUTPUT_DIR / page if html else None
+    
+    results: dict[str, Path] = {}
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=client.max_workers) as executor:
+            futures = {executor.submit(download, page): page for page in PAGES}
+            for future in as_completed(futures):
+                page = futures[future]
+                save_path = future.result()
+                if save_path:
+                    print(f"  ✓ {page} 保存到: {save_path}")
+                    results[page] = save_path
+                else:
+                    print(f"  ✗ 下载失败: {page}")
+    finally:
+        if own_client:
+            client.close()
     
-    print(f"\n共下载 {len(downloaded_files)} 个页面")
+    downloaded_files = [results[page] for page in PAGES if page in results]
+    elapsed = time.perf_counter() - started
+    print(f"\n共下载 {len(downloaded_files)} 个页面，耗时 {elapsed:.2f}s")
+    if client.stats["resumed"]:
+        print(f"  → 续传：{client.stats['resumed']} 个页面已在上次中断的运行中完成")
+    if client.cache is not None:
+        print(f"  → 未变化(304) {client.stats['cache_revalidated']} 个，"
+              f"更新 {client.stats['cache_stored']} 个，离线读取 {client.stats['cache_offline']} 个")
     return downloaded_files
 
 
+# ================================================================================================
+# 步骤2（--discover）：沿导航链接发现并下载网页
+# ================================================================================================
+
+class NavLinkParser(HTMLParser):
+    """收集 VuePress 侧边栏（a.sidebar-item）和导航下拉菜单（li.navbar-dropdown-item 中的 a）里的链接"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links: list[tuple[str, str | None]] = []   # (href, aria-label)
+        self._in_dropdown_item = False
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'li':
+            self._in_dropdown_item = 'navbar-dropdown-item' in classes
+        elif tag == 'a' and attrs.get('href'):
+            if 'sidebar-item' in classes or 'navbar-dropdown-item' in classes or self._in_dropdown_item:
+                self.links.append((attrs['href'], attrs.get('aria-label')))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'li':
+            self._in_dropdown_item = False
+
+
+def extract_nav_links(html: str) -> list[tuple[str, str | None]]:
+    """
+    提取页面导航中的链接
+    
+    :param html: 页面HTML
+    :return: (href, 链接标题) 列表，按在页面中出现的顺序
+    """
+    parser = NavLinkParser()
+    parser.feed(html)
+    parser.close()
+    return parser.links
+
+
+def normalize_page_url(url: str, base_url: str) -> str | None:
+    """
+    规范化待爬取的页面URL
+    
+    去掉 #片段 和查询串，目录地址补全为 index.html；与 base_url 不同源、不在 base_url 目录下
+    或不是 .html 页面时返回 None。
+    """
+    url = urldefrag(url)[0]
+    parsed = urlparse(url)
+    base = urlparse(base_url)
+    if (parsed.scheme, parsed.netloc) != (base.scheme, base.netloc):
+        return None
+    base_dir = base.path[:base.path.rfind('/') + 1]
+    path = parsed.path + "index.html" if parsed.path.endswith('/') else parsed.path
+    if not path.startswith(base_dir) or not path.endswith('.html'):
+        return None
+    return f"{parsed.scheme}://{parsed.netloc}{path}"
+
+
+def local_page_name(url: str, base_url: str) -> str:
+    """页面在输出目录中的文件名：相对 base_url 的路径，子目录用 "__" 连接（保持目录扁平，图片相对路径不变）"""
+    base_path = urlparse(base_url).path
+    base_dir = base_path[:base_path.rfind('/') + 1]
+    return urlparse(url).path[len(base_dir):].replace('/', '__')
+
+
+def discover_pages(
+    client: CrawlClient | None = None,
+    base_url: str = BASE_URL,
+    max_depth: int = DISCOVERY_DEPTH,
+    max_pages: int = DISCOVERY_MAX_PAGES,
+    seeds: list[str] | None = None,
+    journal: CrawlJournal | None = None,
+) -> tuple[list[Path], list[str], dict[str, str]]:
+    """
+    从起始页面出发，沿侧边栏和导航下拉菜单链接广度优先发现并下载网页
+    
+    每一层的页面通过共享客户端的线程池并发下载；只跟随与 base_url 同源且位于其目录下的
+    .html 链接，已加入队列的URL不会重复下载。
+    
+    :param client: 共享的HTTP客户端，为空时按默认配置创建
+    :param base_url: 文档站点根地址，限定爬取范围
+    :param max_depth: 最大链接深度，起始页面为第 0 层
+    :param max_pages: 最多发现的页面数
+    :param seeds: 起始页面URL，默认为 base_url 下的 PAGES
+    :param journal: 爬取任务日志，提供时跳过续传运行中已完成的页面
+    :return: (已下载的文件路径, 页面文件名, 从链接中得到的页面标题)，按发现顺序
+    """
+    print("\n" + "=" * 60)
+    print(f"步骤2: 发现并下载网页（深度 ≤ {max_depth}）")
+    print("=" * 60)
+    
+    own_client = client is None
+    if own_client:
+        client = CrawlClient()
+    
+    seen: dict[str, str] = {}               # 页面文件名 -> URL
+    titles: dict[str, str] = {}
+    
+    def enqueue(url: str, title: str | None, level: list[tuple[str, str]]) -> None:
+        normalized = normalize_page_url(url, base_url)
+        if normalized is None:
+            return
+        page = local_page_name(normalized, base_url)
+        if title and '#' not in url:
+            titles.setdefault(page, title)
+        if page in seen or len(seen) >= max_pages:
+            return
+        seen[page] = normalized
+        level.append((normalized, page))
+    
+    level: list[tuple[str, str]] = []
+    for seed in seeds or [urljoin(base_url, page) for page in PAGES]:
+        enqueue(seed, None, level)
+    
+    pages: list[str] = []
+    downloaded_files: list[Path] = []
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=client.max_workers) as executor:
+            for depth in range(max_depth + 1):
+                if not level:
+                    break
+                print(f"\n深度 {depth}: {len(level)} 个页面")
+                futures = [(url, page, executor.submit(download_page, url, page, client, journal))
+                           for url, page in level]
+                level = []
+                # 按发现顺序处理结果（下载仍是并发的），保证输出顺序确定
+                for url, page, future in futures:
+                    html = future.result()
+                    if not html:
+                        print(f"  ✗ 下载失败: {url}")
+                        continue
+                    save_path = OUTPUT_DIR / page
+                    print(f"  ✓ {page} 保存到: {save_path}")
+                    pages.append(page)
+                    downloaded_files.append(save_path)
+                    if depth < max_depth:
+                        for href, title in extract_nav_links(html):
+                            enqueue(urljoin(url, href), title, level)
+    finally:
+        if own_client:
+            client.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"\n共发现 {len(seen)} 个页面，下载 {len(downloaded_files)} 个，耗时 {elapsed:.2f}s")
+    if len(seen) >= max_pages:
+        print(f"  → 已达到页面数上限 {max_pages}")
+    if client.stats["resumed"]:
+        print(f"  → 续传：{client.stats['resumed']} 个页面已在上次中断的运行中完成")
+    if client.cache is not None:
+        print(f"  → 未变化(304) {client.stats['cache_revalidated']} 个，"
+              f"更新 {client.stats['cache_stored']} 个，离线读取 {client.stats['cache_offline']} 个")
+    return downloaded_files, pages, titles
+
+
+# ================================================================================================
+# 页面文档模型（步骤3-5共享，每个页面只解析一次）
+# ================================================================================================
+
+class PageDocument:
+    """
+    单个HTML页面的内存文档模型
+    
+    页面在首次访问 root 时解析一次，图片提取、URL替换和Markdown转换都在同一棵树上进行，
+    修改后的树只在需要时序列化回磁盘一次。可以复用上次构建结果的页面不会被解析。
+    """
+
+    def __init__(self, path: Path, html: str, backend) -> None:
+        self.path = path
+        self.name = path.name
+        self.backend = backend
+        self.source_hash = sha256_bytes(html.encode('utf-8'))
+        self.image_urls: set[str] = set()       # 页面引用的图片URL（绝对地址）
+        self.image_map: dict[str, str] = {}     # 其中已下载图片的URL到本地路径的映射
+        self.cached: dict | None = None         # 可复用的上次构建结果（见 BuildManifest）
+        self._html = html
+        self._root = None
+
+    @classmethod
+    def load(cls, path: Path, backend) -> "PageDocument":
+        """读取HTML文件（解析推迟到首次使用时）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            stage_metrics.add(bytes_read=os.fstat(f.fileno()).st_size)
+            return cls(path, f.read(), backend)
+
+    @property
+    def root(self):
+        """解析后的文档树"""
+        if self._root is None:
+            self._root = self.backend.parse(self._html)
+            self._html = None
+        return self._root
+
+    def images(self):
+        """遍历页面中带 src 的 img 标签"""
+        for img in self.root.find_all('img'):
+            if img.get('src'):
+                yield img
+
+    def content_root(self):
+        """返回主要内容区域，找不到时退回 body"""
+        root = self.root
+        return root.find('div', class_='content') or root.find('article') or root.find('main') or root.find('body')
+
+    def save(self) -> None:
+        """把修改后的树序列化回磁盘"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(self.backend.serialize(self.root))
+        stage_metrics.add(bytes_written=self.path.stat().st_size)
+
+    def release(self) -> None:
+        """释放文档树（页面转换完成后调用）"""
+        self._root = None
+        self._html = None
+
+
+def load_documents(backend_name: str = PARSER_BACKEND, pages: list[str] | None = None) -> dict[str, PageDocument]:
+    """
+    加载输出目录中的HTML页面
+    
+    :param backend_name: HTML解析后端名称
+    :param pages: 要加载的页面文件名，为空时加载输出目录中的所有页面
+    :return: 文件名到文档模型的映射
+    """
+    backend = get_backend(backend_name)
+    print(f"\n使用HTML解析后端: {backend.name}")
+    if pages is None:
+        paths = sorted(OUTPUT_DIR.glob("*.html"))
+    else:
+        paths = [OUTPUT_DIR / page for page in pages if (OUTPUT_DIR / page).exists()]
+    return {path.name: PageDocument.load(path, backend) for path in paths}
+
+
+# ================================================================================================
+# 增量构建
+# ================================================================================================
+
+def converter_fingerprint() -> str:
+    """转换代码的指纹（代码变化后缓存的片段全部失效）"""
+    digest = hashlib.sha256()
+    for module_file in (Path(__file__), Path(__file__).with_name("html_backends.py")):
+        digest.update(module_file.read_bytes())
+    return digest.hexdigest()
+
+
+def mark_unchanged_pages(documents: dict[str, PageDocument], manifest: BuildManifest) -> int:
+    """
+    标记源HTML与上次构建一致的页面（这些页面不会被解析和转换）
+    
+    :return: 可复用的页面数
+    """
+    reused = 0
+    for document in documents.values():
+        document.cached = manifest.lookup(document.name, document.source_hash)
+        if document.cached is not None:
+            reused += 1
+    print(f"\n增量构建: {reused}/{len(documents)} 个页面未变化")
+    return reused
+
+
+def restore_unchanged_pages(documents: dict[str, PageDocument], manifest: BuildManifest) -> None:
+    """
+    图片下载完成后确认未变化页面仍可复用，并恢复它们上次输出的HTML
+    
+    页面引用的图片映射与上次不同时（例如图片内容更新），该页面改为重新转换。
+    """
+    for document in documents.values():
+        if document.cached is None:
+            continue
+        if document.image_map != document.cached["images"]:
+            print(f"  → {document.name} 的图片已变化，重新转换")
+            document.cached = None
+            continue
+        manifest.restore_rendered(document.name, document.path)
+        document.release()
+
+
 # ================================================================================================
 # 步骤3：提取并下载所有图片
 # ================================================================================================
 
-def extract_and_download_images() -> dict[str, str]:
+def extract_and_download_images(
+    documents: dict[str, PageDocument],
+    client: CrawlClient | None = None,
+    base_url: str = BASE_URL,
+    journal: CrawlJournal | None = None,
+) -> dict[str, str]:
     """
-    从已下载的HTML文件中提取图片URL并下载
+    从已解析的页面中提取图片URL并并发下载
     
+    图片按内容hash存储；已在索引中且文件存在的URL不会再次请求。提供任务日志时，
+    索引中的图片先校验长度和hash，不完整的重新下载；中断的运行中已下载、但尚未写入索引的
+    图片从日志中恢复。
+    
+    :param documents: 已加载的页面文档
+    :param client: 共享的HTTP客户端，为空时按默认配置创建
+    :param base_url: 解析相对图片地址时使用的站点根地址
+    :param journal: 爬取任务日志
     :return: URL到本地路径的映射字典
     """
     print("\n" + "=" * 60)
@@ -181,85 +822,162 @@ def extract_and_download_images() -> dict[str, str]:
     url_to_local: dict[str, str] = {}
     all_image_urls: set[str] = set()
     
-    # 遍历所有HTML文件提取图片URL
-    for html_file in OUTPUT_DIR.glob("*.html"):
-        with open(html_file, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f.read(), 'html.parser')
-        
-        # 查找所有img标签
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                # 转换为绝对URL
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    src = 'https://dict.thinktrader.net' + src
-                elif not src.startswith('http'):
-                    src = urljoin(BASE_URL, src)
-                all_image_urls.add(src)
+    # 遍历所有页面提取图片URL（可复用上次构建结果的页面直接使用清单中记录的URL）
+    for document in documents.values():
+        if document.cached is not None:
+            document.image_urls = set(document.cached["images"])
+        else:
+            for img in document.images():
+                # 转换为绝对URL（同时处理 "//"、"/" 开头和相对路径）
+                src = urljoin(base_url, img.get('src'))
+                if src.startswith('http'):
+                    document.image_urls.add(src)
+        all_image_urls |= document.image_urls
     
     print(f"\n发现 {len(all_image_urls)} 个图片URL")
     
-    # 下载所有图片
-    for i, img_url in enumerate(all_image_urls, 1):
-        filename = get_image_filename(img_url)
-        save_path = IMAGES_DIR / filename
-        
-        print(f"[{i}/{len(all_image_urls)}] 下载: {filename}")
-        
-        if save_path.exists():
-            print(f"  → 已存在，跳过")
-            url_to_local[img_url] = f"images/{filename}"
-            continue
-        
-        if download_image(img_url, save_path):
-            print(f"  ✓ 保存成功")
-            url_to_local[img_url] = f"images/{filename}"
-        else:
-            print(f"  ✗ 下载失败")
-        
-        time.sleep(0.5)
+    index = load_image_index()
+    if journal is not None:
+        check_images(all_image_urls, index, journal)
+    pending = sorted(url for url in all_image_urls if url not in index)
+    for url in all_image_urls:
+        if url in index:
+            url_to_local[url] = f"images/{index[url]}"
+    print(f"  → {len(all_image_urls) - len(pending)} 个已在本地，{len(pending)} 个需要下载")
+    
+    own_client = client is None
+    if own_client:
+        client = CrawlClient()
+    
+    if client.offline and pending:
+        print(f"  → 离线模式，跳过 {len(pending)} 个未缓存的图片")
+        pending = []
+    
+    total_bytes = 0
+    downloaded = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=client.max_workers) as executor:
+            futures = {executor.submit(download_image, url, client, journal): url for url in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                result = future.result()
+                if result:
+                    filename, size = result
+                    print(f"[{i}/{len(pending)}] ✓ {filename} ({size} B)")
+                    index[url] = filename
+                    url_to_local[url] = f"images/{filename}"
+                    total_bytes += size
+                    downloaded += 1
+                else:
+                    print(f"[{i}/{len(pending)}] ✗ 下载失败: {url}")
+    finally:
+        if own_client:
+            client.close()
+    elapsed = time.perf_counter() - started
+    
+    save_image_index(index)
+    for document in documents.values():
+        document.image_map = {url: url_to_local[url] for url in sorted(document.image_urls) if url in url_to_local}
     
-    print(f"\n共下载 {len(url_to_local)} 个图片")
+    stored = len(set(url_to_local.values()))
+    print(f"\n共下载 {downloaded} 个图片，本地共 {stored} 个文件（{len(url_to_local)} 个URL）")
+    if downloaded and elapsed > 0:
+        print(f"  → {total_bytes / elapsed / 1024:.1f} KiB/s，{downloaded / elapsed:.1f} 张/s")
     return url_to_local
 
 
+def check_images(urls: set[str], index: dict[str, str], journal: CrawlJournal) -> None:
+    """
+    按任务日志校验并补全图片索引（原地修改 index）
+    
+    校验失败的图片从索引中移除（文件删除），随后会重新下载。
+    """
+    # 被终止的下载留下的临时文件
+    for tmp_path in IMAGES_DIR.glob(".download-*.tmp"):
+        tmp_path.unlink(missing_ok=True)
+    recovered = corrupt = 0
+    for url in sorted(urls):
+        filename = index.get(url)
+        if filename is not None:
+            if not verify_image(url, filename, journal):
+                print(f"  ✗ 图片不完整，重新下载: {filename}")
+                (IMAGES_DIR / filename).unlink(missing_ok=True)
+                del index[url]
+                corrupt += 1
+            continue
+        entry = journal.entry(url)
+        if entry is not None and entry["state"] == "done" and journal.verified(url, Path(entry["path"])):
+            index[url] = Path(entry["path"]).name
+            recovered += 1
+    if recovered or corrupt:
+        print(f"  → 从任务日志恢复 {recovered} 个图片，{corrupt} 个校验失败")
+
+
+def optimize_downloaded_images(
+    documents: dict[str, PageDocument],
+    url_to_local: dict[str, str],
+    webp: bool = False,
+    thumbnails: tuple[int, ...] = (),
+) -> dict[str, str]:
+    """
+    在进程池中优化页面引用的图片，并让图片引用指向优化后的文件
+    
+    :param documents: 已加载的页面文档（更新其 image_map）
+    :param url_to_local: URL到本地路径的映射
+    :param webp: 是否生成 WebP 版本（需要 Pillow）
+    :param thumbnails: 缩略图宽度（需要 Pillow）
+    :return: URL到优化后本地路径的映射
+    """
+    print("\n" + "=" * 60)
+    print("步骤3b: 优化图片")
+    print("=" * 60)
+    
+    names = sorted({Path(local).name for local in url_to_local.values()})
+    results = optimize_images(IMAGES_DIR, names, webp=webp, thumbnails=thumbnails)
+    optimized = {
+        url: f"images/{results[Path(local).name]['preferred']}" if Path(local).name in results else local
+        for url, local in url_to_local.items()
+    }
+    for document in documents.values():
+        document.image_map = {url: optimized.get(url, local) for url, local in document.image_map.items()}
+    return optimized
+
+
 # ================================================================================================
 # 步骤4：替换图片URL为本地路径
 # ================================================================================================
 
-def replace_image_urls(url_to_local: dict[str, str]) -> None:
+def replace_image_urls(
+    documents: dict[str, PageDocument],
+    url_to_local: dict[str, str],
+    base_url: str = BASE_URL,
+) -> None:
     """
-    替换HTML文件中的图片URL为本地路径
+    在文档树中把图片URL替换为本地路径，并把修改过的页面写回磁盘
     
+    :param documents: 已加载的页面文档
     :param url_to_local: URL到本地路径的映射
+    :param base_url: 解析相对图片地址时使用的站点根地址
     """
     print("\n" + "=" * 60)
     print("步骤4: 替换图片URL为本地路径")
     print("=" * 60)
     
-    for html_file in OUTPUT_DIR.glob("*.html"):
-        print(f"\n处理: {html_file.name}")
-        
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+    for document in documents.values():
+        if document.cached is not None:
+            continue
+        print(f"\n处理: {document.name}")
         
         replacements = 0
-        for url, local_path in url_to_local.items():
-            if url in content:
-                content = content.replace(url, local_path)
+        for img in document.images():
+            local_path = url_to_local.get(urljoin(base_url, img.get('src')))
+            if local_path and img.get('src') != local_path:
+                img.set('src', local_path)
                 replacements += 1
         
-        # 同时处理相对路径格式的URL
-        soup = BeautifulSoup(content, 'html.parser')
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src and src in url_to_local:
-                img['src'] = url_to_local[src]
-        
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(str(soup))
+        if replacements:
+            document.save()
         
         print(f"  ✓ 替换了 {replacements} 处图片URL")
 
@@ -268,183 +986,342 @@ def replace_image_urls(url_to_local: dict[str, str]) -> None:
 # 步骤5：整合成markdown文件
 # ================================================================================================
 
-def convert_to_markdown() -> Path:
+# 页面标题映射
+PAGE_TITLES = {
+    "start_now.html": "快速开始",
+    "xtdata.html": "XtQuant.XtData 行情模块",
+    "xttrader.html": "XtQuant.Xttrade 交易模块",
+    "code_examples.html": "完整实例",
+    "question_function.html": "常见问题",
+    "download_xtquant.html": "xtquant版本下载",
+}
+
+
+def page_title(page: str, titles: dict[str, str] | None = None) -> str:
+    """页面标题：优先使用 PAGE_TITLES，其次是发现页面时链接上的标题"""
+    return PAGE_TITLES.get(page) or (titles or {}).get(page) or page
+
+
+def markdown_preamble(pages: list[str] | None = None, titles: dict[str, str] | None = None) -> str:
+    """
+    生成文档开头和目录
+    
+    目录只依赖页面列表和标题，因此可以在转换任何页面之前先写出。
+    """
+    preamble = "# QMT API 文档\n\n"
+    preamble += "> 本文档由爬虫自动生成\n\n"
+    preamble += "---\n\n"
+    preamble += "## 目录\n\n"
+    for page in pages or PAGES:
+        title = page_title(page, titles)
+        preamble += f"- [{title}](#{page_anchor(title)})\n"
+    preamble += "\n---\n\n"
+    return preamble
+
+
+def page_anchor(title: str) -> str:
+    """页面标题对应的目录锚点"""
+    return title.replace(" ", "-").replace(".", "")
+
+
+def convert_page(path: Path, backend_name: str) -> str:
+    """
+    进程池工作函数：读取并解析页面文件，返回页面正文的Markdown
+    
+    步骤4修改过的页面已写回磁盘，因此重新解析得到的树与主进程中的一致；
+    只有Markdown字符串会传回主进程。
+    """
+    document = PageDocument.load(path, get_backend(backend_name))
+    content_root = document.content_root()
+    return html_to_markdown(content_root) if content_root else ""
+
+
+def iter_page_markdown(
+    documents: dict[str, PageDocument],
+    manifest: BuildManifest | None = None,
+    workers: int = CONVERT_WORKERS,
+    pages: list[str] | None = None,
+    titles: dict[str, str] | None = None,
+):
+    """
+    按页面顺序（默认为 PAGES）逐页生成Markdown
+    
+    每个页面转换完成后立即释放其文档树，生成器的调用方只持有当前页面的文本。
+    提供构建清单时，未变化的页面直接复用缓存的片段，新转换的片段写回清单。
+    workers 不为 1 时，需要转换的页面全部提交到进程池并行转换，结果仍按页面顺序产出，
+    与逐页转换的输出完全一致。
+    
+    :param documents: 已加载的页面文档
+    :param manifest: 增量构建清单
+    :param workers: 转换进程数，1 为在当前进程中逐页转换，0 为使用全部CPU核心
+    :param pages: 页面顺序，默认为 PAGES
+    :param titles: 页面标题（见 page_title）
+    :return: 生成 (页面文件名, 页面标题, 页面Markdown) 的迭代器
+    """
+    pages = pages or PAGES
+    pending = [page for page in pages
+               if page in documents and (manifest is None or documents[page].cached is None)]
+    executor = None
+    futures = {}
+    if workers != 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending)))
+        for page in pending:
+            document = documents[page]
+            futures[page] = executor.submit(convert_page, document.path, document.backend.name)
+            # 工作进程会重新解析页面，主进程中的树不再需要
+            document.release()
+    
+    try:
+        for page in pages:
+            document = documents.get(page)
+            if document is None:
+                continue
+            
+            title = page_title(page, titles)
+            
+            if manifest is not None and document.cached is not None:
+                print(f"\n复用: {page} -> {title}（未变化）")
+                yield page, title, manifest.fragment(page)
+                continue
+            
+            print(f"\n转换: {page} -> {title}")
+            
+            if page in futures:
+                body = futures.pop(page).result()
+            else:
+                # 提取主要内容区域（找不到时退回 body），做简单的HTML到Markdown转换
+                content_root = document.content_root()
+                body = html_to_markdown(content_root) if content_root else ""
+                document.release()
+            section = f"## {title}\n\n{body}\n\n---\n\n"
+            
+            if manifest is not None:
+                manifest.record(page, document.source_hash, document.path, document.image_map, section)
+            
+            yield page, title, section
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def convert_to_markdown(
+    documents: dict[str, PageDocument],
+    output_file: Path | None = None,
+    manifest: BuildManifest | None = None,
+    workers: int = CONVERT_WORKERS,
+    pages: list[str] | None = None,
+    titles: dict[str, str] | None = None,
+) -> Path:
     """
     将所有HTML页面整合成一个markdown文件
     
+    每个页面转换完就写入磁盘，内存中只保留当前页面的Markdown。输出先写到
+    "<文件名>.partial"，全部完成后再原子替换正式文件；中途失败时已完成的页面保留在
+    .partial 文件中。页面在文件中的字节偏移另存到 "<文件名>.toc.json"。
+    
+    :param documents: 已加载的页面文档
+    :param output_file: 输出路径，默认为 OUTPUT_DIR/QMT_API_Documentation.md
+    :param manifest: 增量构建清单，提供时复用未变化页面的片段
+    :param workers: 转换进程数，1 为逐页转换，0 为使用全部CPU核心
+    :param pages: 页面顺序，默认为 PAGES
+    :param titles: 发现页面时得到的页面标题
     :return: 生成的markdown文件路径
     """
     print("\n" + "=" * 60)
     print("步骤5: 整合成markdown文件")
     print("=" * 60)
     
-    markdown_content = "# QMT API 文档\n\n"
-    markdown_content += "> 本文档由爬虫自动生成\n\n"
-    markdown_content += "---\n\n"
-    
-    # 页面标题映射
-    page_titles = {
-        "start_now.html": "快速开始",
-        "xtdata.html": "XtQuant.XtData 行情模块",
-        "xttrader.html": "XtQuant.Xttrade 交易模块",
-        "code_examples.html": "完整实例",
-        "question_function.html": "常见问题",
-        "download_xtquant.html": "xtquant版本下载",
-    }
+    output_file = output_file or OUTPUT_DIR / "QMT_API_Documentation.md"
+    partial_file = output_file.with_name(output_file.name + ".partial")
+    toc: list[dict] = []
     
-    # 生成目录
-    markdown_content += "## 目录\n\n"
-    for page in PAGES:
-        title = page_titles.get(page, page)
-        anchor = title.replace(" ", "-").replace(".", "")
-        markdown_content += f"- [{title}](#{anchor})\n"
-    markdown_content += "\n---\n\n"
-    
-    # 处理每个页面
-    for page in PAGES:
-        html_file = OUTPUT_DIR / page
-        if not html_file.exists():
-            continue
-        
-        title = page_titles.get(page, page)
-        print(f"\n转换: {page} -> {title}")
-        
-        with open(html_file, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f.read(), 'html.parser')
-        
-        markdown_content += f"## {title}\n\n"
-        
-        # 提取主要内容区域
-        content_div = soup.find('div', class_='content') or soup.find('article') or soup.find('main')
-        if content_div:
-            # 简单的HTML到Markdown转换
-            text = html_to_markdown(content_div)
-            markdown_content += text
-        else:
-            # 如果找不到主内容区域，提取body
-            body = soup.find('body')
-            if body:
-                text = html_to_markdown(body)
-                markdown_content += text
-        
-        markdown_content += "\n\n---\n\n"
+    with open(partial_file, 'w', encoding='utf-8') as f:
+        f.write(markdown_preamble(pages, titles))
+        try:
+            for page, title, section in iter_page_markdown(documents, manifest, workers, pages, titles):
+                offset = f.tell()
+                f.write(section)
+                f.flush()
+                toc.append({
+                    "page": page,
+                    "title": title,
+                    "anchor": page_anchor(title),
+                    "offset": offset,
+                    "length": f.tell() - offset,
+                })
+        except Exception:
+            print(f"\n✗ 转换中断，已完成的 {len(toc)} 个页面保存在: {partial_file}")
+            raise
     
-    # 保存markdown文件
-    output_file = OUTPUT_DIR / "QMT_API_Documentation.md"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    os.replace(partial_file, output_file)
+    if manifest is not None:
+        manifest.save()
+    toc_file = output_file.with_name(output_file.stem + ".toc.json")
+    with open(toc_file, 'w', encoding='utf-8') as f:
+        json.dump(toc, f, ensure_ascii=False, indent=2)
+    stage_metrics.add(bytes_written=output_file.stat().st_size + toc_file.stat().st_size)
     
     print(f"\n✓ Markdown文档已保存: {output_file}")
+    print(f"✓ 页面目录已保存: {toc_file}")
     return output_file
 
 
+# 子元素在显式栈上转换完成后，如何把它的输出并入父级
+_MERGE_PARAGRAPH = 1    # p: 去除首尾空白后加空行
+_MERGE_LINK = 2         # a: [文本](href)
+_MERGE_STRONG = 3       # strong/b: **文本**
+_MERGE_EM = 4           # em/i: *文本*
+_MERGE_BLOCK = 5        # div/section/article: 原样并入后换行
+_MERGE_INLINE = 6       # span: 原样并入
+_MERGE_OTHER = 7        # 其他标签: 非空白时原样并入
+_MERGE_LIST_ITEM = 8    # li: 缩进 + 前缀 + 内容
+_MERGE_LIST = 9         # ul/ol: 列表结束后加空行
+
+_HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+_SKIPPED_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer', 'aside'])
+_CONTAINER_MERGES = {
+    'p': _MERGE_PARAGRAPH,
+    'strong': _MERGE_STRONG,
+    'b': _MERGE_STRONG,
+    'em': _MERGE_EM,
+    'i': _MERGE_EM,
+    'div': _MERGE_BLOCK,
+    'section': _MERGE_BLOCK,
+    'article': _MERGE_BLOCK,
+    'span': _MERGE_INLINE,
+}
+
+
 def html_to_markdown(element, list_level=0) -> str:
     """
-    递归将HTML转换为Markdown，支持嵌套列表
+    将HTML转换为Markdown，支持嵌套列表
     
-    :param element: BeautifulSoup元素
+    使用显式栈遍历DOM而不是递归，输出片段先收集到列表中最后一次拼接，
+    因此深层嵌套的页面不会触及递归上限，也不会反复复制整段字符串。
+    
+    :param element: 解析后端的节点（见 html_backends）
     :param list_level: 当前列表的嵌套级别 (用于缩进)
     :return: Markdown文本
     """
-    from bs4 import NavigableString, Comment
-    
-    markdown = ""
+    root_parts: list[str] = []
+    # 栈帧: [子节点迭代器, 列表层级, 当前元素标签, 输出片段, 并入方式, 并入参数]
+    # ul/ol 的栈帧迭代 (序号, li) 并直接写入父级的输出片段
+    stack = [[iter(element.children()), list_level, element.tag, root_parts, None, None]]
     
-    for child in element.children:
-        # 跳过注释节点
-        if isinstance(child, Comment):
-            continue
+    while stack:
+        frame = stack[-1]
+        children, level, parent_tag, parts, frame_merge = frame[0], frame[1], frame[2], frame[3], frame[4]
         
-        # 处理文本节点
-        if isinstance(child, NavigableString):
-            text = str(child).strip()
-            if text:
-                markdown += text + " "
+        # 列表栈帧：每个 li 压入一个新栈帧
+        if frame_merge == _MERGE_LIST:
+            for i, li in children:
+                prefix = f"{i}. " if frame[5] else "- "
+                stack.append([iter(li.children()), level, li.tag, [], _MERGE_LIST_ITEM, (parts, "  " * level + prefix)])
+                break
+            else:
+                stack.pop()
+                parts.append("\n")
             continue
         
-        # 处理元素节点
-        if hasattr(child, 'name') and child.name:
-            tag = child.name
+        # 依次处理子节点，遇到需要展开的元素时压栈并暂停当前栈帧
+        for child in children:
+            kind = child.kind
             
-            if tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                level = int(tag[1]) + 1  # 增加层级因为我们已经有了顶级标题
-                markdown += f"\n{'#' * level} {child.get_text().strip()}\n\n"
+            # 跳过注释节点
+            if kind == COMMENT:
+                continue
             
-            elif tag == 'p':
-                # 段落，递归处理内部内容（可能有链接、加粗等）
-                content = html_to_markdown(child, list_level)
-                markdown += f"{content.strip()}\n\n"
+            # 处理文本节点
+            if kind == TEXT:
+                text = child.text.strip()
+                if text:
+                    parts.append(text + " ")
+                continue
+            
+            # 处理元素节点
+            if kind != ELEMENT:
+                continue
+            tag = child.tag
+            
+            if tag in _HEADING_TAGS:
+                heading_level = int(tag[1]) + 1  # 增加层级因为我们已经有了顶级标题
+                parts.append(f"\n{'#' * heading_level} {child.get_text().strip()}\n\n")
             
             elif tag == 'pre' or tag == 'code':
                 code = child.get_text()
                 # 如果代码包含换行，或者是pre标签，使用代码块
                 if '\n' in code or tag == 'pre':
-                    markdown += f"```python\n{code}\n```\n\n"
+                    parts.append(f"```python\n{code}\n```\n\n")
                 else:
-                    markdown += f"`{code}`"
-            
-            elif tag in ['ul', 'ol']:
-                markdown += "\n"
-                is_ordered = tag == 'ol'
-                
-                # 确定当前列表项的缩进级别
-                # 如果当前element是li，说明这个ul/ol是嵌套在li内部的，需要增加缩进
-                # 否则，保持当前list_level（通常是0，表示顶级列表）
-                item_indent_level = list_level + 1 if element.name == 'li' else list_level
-                
-                for i, li in enumerate(child.find_all('li', recursive=False), 1):
-                    # 递归处理列表项的内容，并传递新的缩进级别
-                    content = html_to_markdown(li, item_indent_level)
-                    indent = "  " * item_indent_level
-                    
-                    prefix = f"{i}. " if is_ordered else "- "
-                    markdown += f"{indent}{prefix}{content.lstrip()}\n"
-                markdown += "\n"
+                    parts.append(f"`{code}`")
             
             elif tag == 'img':
                 src = child.get('src', '')
                 alt = child.get('alt', '图片')
-                markdown += f"![{alt}]({src})\n\n"
-            
-            elif tag == 'a':
-                href = child.get('href', '')
-                text = html_to_markdown(child, list_level).strip()
-                # 如果递归处理后文本为空，但有原始文本，则使用原始文本
-                if not text:
-                    text = child.get_text().strip()
-                markdown += f"[{text}]({href})" if href else text
-            
-            elif tag in ['strong', 'b']:
-                markdown += f"**{html_to_markdown(child, list_level).strip()}**"
-            
-            elif tag in ['em', 'i']:
-                markdown += f"*{html_to_markdown(child, list_level).strip()}*"
+                parts.append(f"![{alt}]({src})\n\n")
             
             elif tag == 'br':
-                markdown += "\n"
+                parts.append("\n")
             
             elif tag == 'table':
-                markdown += convert_table_to_markdown(child)
+                parts.append(convert_table_to_markdown(child))
             
-            elif tag in ['div', 'section', 'article', 'span']:
-                # 递归处理容器元素
-                markdown += html_to_markdown(child, list_level)
-                # 对于块级容器，添加换行
-                if tag in ['div', 'section', 'article']:
-                    markdown += "\n"
-            
-            elif tag in ['script', 'style', 'nav', 'header', 'footer', 'aside']:
+            elif tag in _SKIPPED_TAGS:
                 # 跳过这些标签
                 continue
             
+            elif tag in ('ul', 'ol'):
+                parts.append("\n")
+                # 如果当前元素是li，说明这个ul/ol是嵌套在li内部的，需要增加缩进
+                # 否则，保持当前list_level（通常是0，表示顶级列表）
+                item_indent_level = level + 1 if parent_tag == 'li' else level
+                items = enumerate(child.find_all('li', recursive=False), 1)
+                stack.append([items, item_indent_level, tag, parts, _MERGE_LIST, tag == 'ol'])
+                break
+            
+            elif tag == 'a':
+                stack.append([iter(child.children()), level, tag, [], _MERGE_LINK, (parts, child)])
+                break
+            
             else:
-                # 对于其他未知标签，尝试递归处理其内容
-                # 确保不会因为空内容而添加多余的空格或换行
-                inner = html_to_markdown(child, list_level)
-                if inner.strip():
-                    markdown += inner
+                # 段落、强调、容器以及未知标签：压栈处理其内容，出栈时再按 merge 方式并入
+                merge = _CONTAINER_MERGES.get(tag, _MERGE_OTHER)
+                stack.append([iter(child.children()), level, tag, [], merge, parts])
+                break
+        else:
+            # 当前栈帧的子节点处理完毕，按 merge 方式把输出并入父级
+            stack.pop()
+            if frame_merge is None:
+                continue
+            content = "".join(parts)
+            out = frame[5]
+            if frame_merge == _MERGE_BLOCK:
+                out.append(content)
+                out.append("\n")
+            elif frame_merge == _MERGE_INLINE:
+                out.append(content)
+            elif frame_merge == _MERGE_PARAGRAPH:
+                out.append(f"{content.strip()}\n\n")
+            elif frame_merge == _MERGE_LIST_ITEM:
+                out, indent_prefix = out
+                out.append(f"{indent_prefix}{content.lstrip()}\n")
+            elif frame_merge == _MERGE_LINK:
+                out, anchor = out
+                text = content.strip()
+                # 如果处理后文本为空，但有原始文本，则使用原始文本
+                if not text:
+                    text = anchor.get_text().strip()
+                href = anchor.get('href', '')
+                out.append(f"[{text}]({href})" if href else text)
+            elif frame_merge == _MERGE_STRONG:
+                out.append(f"**{content.strip()}**")
+            elif frame_merge == _MERGE_EM:
+                out.append(f"*{content.strip()}*")
+            elif content.strip():
+                out.append(content)
     
-    return markdown
+    return "".join(root_parts)
 
 
 def convert_table_to_markdown(table) -> str:
@@ -472,8 +1349,42 @@ def convert_table_to_markdown(table) -> str:
 # 主函数
 # ================================================================================================
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="QMT API 文档爬虫")
+    parser.add_argument("--base-url", default=BASE_URL, help="文档站点根地址，可指向镜像或本地替身服务")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="并发下载线程数")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="单个主机的最大并发请求数")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="每秒最大请求数，0 表示不限速")
+    parser.add_argument("--retries", type=int, default=RETRY_ATTEMPTS, help="每个请求最多尝试次数（含第一次）")
+    parser.add_argument("--backoff", type=float, default=RETRY_BACKOFF,
+                        help="第一次重试前的最长等待秒数，之后指数增长并加随机抖动")
+    parser.add_argument("--offline", action="store_true", help="不访问网络，完全使用本地缓存生成文档")
+    parser.add_argument("--full", action="store_true", help="忽略增量构建清单，重新转换所有页面")
+    parser.add_argument("--parser", default=PARSER_BACKEND, choices=["auto", "selectolax", "lxml", "bs4"],
+                        help="HTML解析后端，auto 选择已安装的最快后端")
+    parser.add_argument("--no-optimize-images", dest="optimize_images", action="store_false",
+                        help="不优化图片，Markdown 直接引用下载的原图")
+    parser.add_argument("--webp", action="store_true", help="同时生成 WebP 版本，更小时引用 WebP（需要 Pillow）")
+    parser.add_argument("--thumbnails", type=int, nargs="*", default=[], metavar="WIDTH",
+                        help="生成指定宽度的缩略图（需要 Pillow）")
+    parser.add_argument("--discover", action="store_true",
+                        help="从 PAGES 出发沿侧边栏和导航菜单链接广度优先发现页面，而不是只下载 PAGES")
+    parser.add_argument("--max-depth", type=int, default=DISCOVERY_DEPTH, help="页面发现的最大链接深度")
+    parser.add_argument("--max-pages", type=int, default=DISCOVERY_MAX_PAGES, help="页面发现的最大页面数")
+    parser.add_argument("--seed", action="append", metavar="URL",
+                        help="页面发现的起始页面（可重复），默认为 --base-url 下的 PAGES")
+    parser.add_argument("--convert-workers", type=int, default=CONVERT_WORKERS,
+                        help="Markdown转换进程数，1 为逐页转换，0 为使用全部CPU核心")
+    parser.add_argument("--metrics", type=Path, default=METRICS_FILE, help="阶段指标JSON报告的输出路径")
+    parser.add_argument("--profile", type=Path, metavar="DIR", help="为每个阶段保存 cProfile 结果（.pstats）到该目录")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
     """主函数"""
+    args = parse_args(argv)
+    
     print("=" * 60)
     print("QMT API 文档爬虫")
     print("=" * 60)
@@ -481,29 +1392,95 @@ def main():
     # 确保目录存在
     ensure_dirs()
     
-    # 步骤2：下载所有网页
-    downloaded_files = download_all_pages()
-    
-    if not downloaded_files:
-        print("\n✗ 没有成功下载任何页面，程序退出")
-        return
-    
-    # 步骤3：提取并下载图片
-    url_to_local = extract_and_download_images()
-    
-    # 步骤4：替换图片URL
-    if url_to_local:
-        replace_image_urls(url_to_local)
-    
-    # 步骤5：整合成markdown
-    output_file = convert_to_markdown()
-    
-    print("\n" + "=" * 60)
-    print("✓ 爬取完成！")
-    print(f"  - HTML文档: {OUTPUT_DIR}")
-    print(f"  - 图片目录: {IMAGES_DIR}")
-    print(f"  - Markdown: {output_file}")
-    print("=" * 60)
+    client = CrawlClient(
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        rate=args.rate,
+        burst=max(1, int(args.rate)),
+        cache=HttpCache(HTTP_CACHE_DIR),
+        offline=args.offline,
+        retry=RetryPolicy(args.retries, args.backoff, RETRY_MAX_DELAY),
+    )
+    recorder = MetricsRecorder(profile_dir=args.profile, stats=client.stats)
+    journal = CrawlJournal(JOURNAL_FILE)
+    if journal.begin():
+        print("\n检测到上次运行未完成，继续执行（已完成且校验通过的下载将被跳过）")
+    try:
+        # 步骤2：下载所有网页
+        with recorder.stage("download_pages"):
+            if args.discover:
+                downloaded_files, pages, titles = discover_pages(
+                    client, base_url=args.base_url, max_depth=args.max_depth,
+                    max_pages=args.max_pages, seeds=args.seed, journal=journal)
+            else:
+                downloaded_files = download_all_pages(client, base_url=args.base_url, journal=journal)
+                pages, titles = PAGES, {}
+        
+        if not downloaded_files:
+            print("\n✗ 没有成功下载任何页面，程序退出")
+            # 运行已结束（没有可续传的进度），下次运行不应被当作中断的运行
+            journal.finish()
+            return
+        
+        # 每个页面只解析一次，步骤3-5共享同一个文档模型
+        with recorder.stage("load_documents"):
+            documents = load_documents(args.parser, pages)
+            
+            # 增量构建：源HTML未变化的页面复用上次的转换结果
+            manifest = BuildManifest(BUILD_DIR, converter_fingerprint())
+            if not args.full:
+                mark_unchanged_pages(documents, manifest)
+        
+        # 步骤3：提取并下载图片
+        with recorder.stage("extract_images"):
+            url_to_local = extract_and_download_images(documents, client, base_url=args.base_url, journal=journal)
+        
+        # 步骤3b：优化图片（无损重新压缩，可选 WebP 和缩略图）
+        with recorder.stage("optimize_images"):
+            if args.optimize_images and url_to_local:
+                url_to_local = optimize_downloaded_images(
+                    documents, url_to_local, webp=args.webp, thumbnails=tuple(args.thumbnails))
+            restore_unchanged_pages(documents, manifest)
+        
+        # 步骤4：替换图片URL
+        with recorder.stage("replace_image_urls"):
+            if url_to_local:
+                replace_image_urls(documents, url_to_local, base_url=args.base_url)
+        
+        # 步骤5：整合成markdown
+        with recorder.stage("convert_to_markdown"):
+            output_file = convert_to_markdown(documents, manifest=manifest, workers=args.convert_workers,
+                                              pages=pages, titles=titles)
+        
+        # 步骤6：提取结构化API索引（xtdata/xttrader 页面未变化时跳过）
+        print("\n" + "=" * 60)
+        print("步骤6: 提取API索引")
+        print("=" * 60)
+        with recorder.stage("api_index"):
+            build_api_index(OUTPUT_DIR, args.parser, force=args.full)
+        
+        print("\n" + "=" * 60)
+        print("✓ 爬取完成！")
+        print(f"  - HTML文档: {OUTPUT_DIR}")
+        print(f"  - 图片目录: {IMAGES_DIR}")
+        print(f"  - Markdown: {output_file}")
+        print(f"  - API索引: {OUTPUT_DIR / INDEX_JSON}, {OUTPUT_DIR / INDEX_DB}")
+        if client.stats["retries"] or client.stats["circuit_open"]:
+            print(f"  - 重试: {client.stats['retries']} 次，等待 {client.stats['retry_wait_ms'] / 1000:.1f}s，"
+                  f"放弃 {client.stats['giveups']} 个，熔断拒绝 {client.stats['circuit_open']} 个")
+        print("=" * 60)
+        journal.finish()
+    finally:
+        client.close()
+        journal.close()
+        if recorder.stages:
+            recorder.save(args.metrics)
+            print("\n阶段指标:")
+            for line in recorder.summary():
+                print(f"  {line}")
+            print(f"  → 报告: {args.metrics}")
+            if args.profile:
+                print(f"  → 性能剖析: {args.profile}（python -m pstats <文件>）")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+QMT 文档工具链的统一入口
+
+用法：
+    uv run python qmt_docs.py crawl [爬虫参数]          # 下载页面和图片并生成 Markdown
+    uv run python qmt_docs.py convert [爬虫参数]        # 只用本地缓存重新生成 Markdown
+    uv run python qmt_docs.py postprocess [参数]        # 格式整理、链接修复、代码块缩进、检索索引
+    uv run python qmt_docs.py index query 委托状态      # 全文检索
+    uv run python qmt_docs.py startup                   # 检查各子命令的导入耗时预算（测试中也会检查）
+    uv run python qmt_docs.py <子命令> -h               # 子命令的参数说明
+
+每个子命令只在被调用时才导入对应的模块，requests、HTML解析库和进程池等重依赖
+由这些模块在真正用到时再加载，因此后处理等轻量子命令的启动开销很小。
+"""
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+
+# 子命令: (模块, 附加在参数前面的固定参数, 说明)
+COMMANDS = {
+    "crawl": ("qmt_crawler", [], "下载页面和图片并生成 Markdown"),
+    "convert": ("qmt_crawler", ["--offline"], "只用本地缓存重新生成 Markdown（不访问网络）"),
+    "postprocess": ("postprocess", [], "格式整理、链接修复、代码块缩进，生成检索索引和章节hash"),
+    "index": ("search_index", [], "全文检索索引：build / query"),
+    "api-index": ("api_index", [], "从 xtdata / xttrader 页面生成结构化API索引"),
+    "chunks": ("chunk_docs", [], "按章节拆分最终文档"),
+    "examples": ("code_examples", [], "提取、去重并检查代码示例"),
+    "site": ("static_site", [], "生成静态网站"),
+    "diff": ("doc_merkle", ["diff"], "比较两次构建的章节差异"),
+    "images": ("optimize_images", [], "优化图片目录中的图片"),
+}
+
+# 各子命令导入所需模块的耗时上限（毫秒，不含解释器自身启动）
+STARTUP_BUDGETS_MS = {
+    "crawl": 80,
+    "convert": 80,
+    "postprocess": 50,
+    "index": 30,
+    "api-index": 40,
+    "chunks": 30,
+    "examples": 30,
+    "site": 40,
+    "diff": 30,
+    "images": 30,
+}
+
+# 各子命令在导入阶段不应加载的模块（及其子模块）
+NETWORK_MODULES = ("requests", "urllib3", "certifi", "charset_normalizer", "idna")
+PARSER_MODULES = ("bs4", "lxml", "selectolax")
+HEAVY_MODULES = NETWORK_MODULES + PARSER_MODULES + ("multiprocessing", "PIL", "brotli")
+FORBIDDEN_IMPORTS = {
+    "crawl": NETWORK_MODULES + PARSER_MODULES + ("multiprocessing",),
+    "convert": NETWORK_MODULES + PARSER_MODULES + ("multiprocessing",),
+    **{command: HEAVY_MODULES for command in
+       ("postprocess", "index", "api-index", "chunks", "examples", "site", "diff", "images")},
+}
+
+
+def load(command: str):
+    """导入子命令的模块，返回其 main 函数"""
+    module_name = COMMANDS[command][0]
+    return importlib.import_module(module_name).main
+
+
+# ================================================================================================
+# 导入耗时预算
+# ================================================================================================
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, str]]:
+    """解析 -X importtime 的输出，返回 (自身微秒, 累计微秒, 缩进后的模块名) 列表"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            own, cumulative, name = line[len("import time:"):].split("|", 2)
+            # "| name"：竖线后的第一个空格是分隔符，其余空格表示嵌套层级
+            entries.append((int(own), int(cumulative), name[1:].rstrip()))
+        except ValueError:
+            continue
+    return entries
+
+
+def run_importtime(code: str) -> list[tuple[int, int, str]]:
+    import subprocess
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent)
+    return parse_importtime(result.stderr)
+
+
+def measure_startup(command: str, repeat: int = 5) -> tuple[float, set[str]]:
+    """
+    测量导入子命令模块的耗时
+
+    解释器启动时（site 及其加载的 .pth 等）导入的模块不计入；取 repeat 次中的最小值。
+
+    :return: (毫秒, 导入子命令时新加载的模块名)
+    """
+    startup = {name.strip() for _, _, name in run_importtime("pass")}
+    best = float("inf")
+    modules: set[str] = set()
+    for _ in range(repeat):
+        entries = run_importtime(f"import qmt_docs; qmt_docs.load({command!r})")
+        modules = {name.strip() for _, _, name in entries} - startup
+        total = sum(cumulative for _, cumulative, name in entries
+                    if not name.startswith(" ") and name.strip() in modules)
+        best = min(best, total / 1000)
+    return best, modules
+
+
+def forbidden_imports(command: str, modules: set[str]) -> list[str]:
+    """导入子命令时加载了的、不应在启动时加载的顶层包"""
+    return sorted({name.partition(".")[0] for name in modules} & set(FORBIDDEN_IMPORTS[command]))
+
+
+def check_startup(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="qmt_docs.py startup", description="检查各子命令的导入耗时和重依赖")
+    parser.add_argument("commands", nargs="*", metavar="COMMAND", help="要检查的子命令（默认全部）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个子命令测量次数（取最小值）")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算倍数，用于较慢的机器")
+    args = parser.parse_args(argv)
+    unknown = [command for command in args.commands if command not in STARTUP_BUDGETS_MS]
+    if unknown:
+        parser.error(f"未知的子命令: {', '.join(unknown)}")
+
+    failed = []
+    print(f"{'子命令':<14}{'导入(ms)':>10}{'预算(ms)':>10}")
+    for command in args.commands or list(STARTUP_BUDGETS_MS):
+        elapsed, modules = measure_startup(command, args.repeat)
+        budget = STARTUP_BUDGETS_MS[command] * args.scale
+        forbidden = forbidden_imports(command, modules)
+        ok = elapsed <= budget and not forbidden
+        print(f"{command:<14}{elapsed:>10.1f}{budget:>10.0f}  {'✓' if ok else '✗'}")
+        if forbidden:
+            print(f"  ✗ 导入了不应在启动时加载的模块: {', '.join(forbidden)}")
+        if not ok:
+            failed.append(command)
+
+    if failed:
+        print(f"\n✗ 超出预算: {', '.join(failed)}")
+        return 1
+    print("\n✓ 所有子命令都在导入预算以内")
+    return 0
+
+
+# ================================================================================================
+# 主函数
+# ================================================================================================
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    lines = [f"  {name:<14}{help_text}" for name, (_, _, help_text) in COMMANDS.items()]
+    lines.append(f"  {'startup':<14}检查各子命令的导入耗时预算")
+    parser = argparse.ArgumentParser(
+        prog="qmt_docs.py",
+        description="QMT 文档工具链",
+        epilog="子命令:\n" + "\n".join(lines),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=list(COMMANDS) + ["startup"], metavar="COMMAND")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="传给子命令的参数")
+    args = parser.parse_args(argv)
+    rest = args.args
+
+    if args.command == "startup":
+        return check_startup(rest)
+    fixed = COMMANDS[args.command][1]
+    # 子命令的参数说明中显示 "qmt_docs.py <子命令>"（固定参数本身是子命令时由模块的解析器显示）
+    sys.argv[0] = "qmt_docs.py" if fixed and not fixed[0].startswith("-") else f"qmt_docs.py {args.command}"
+    result = load(args.command)(fixed + rest)
+    return result or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
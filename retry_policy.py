@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+请求重试策略与按主机熔断
+
+RetryPolicy 区分可重试（429、5xx、超时、连接错误）和不可重试（404 等）的失败，
+按指数退避加随机抖动（full jitter）等待后重试，服务器给出 Retry-After 时按其等待。
+CircuitBreaker 在某个主机连续失败达到阈值后暂停向它发送请求，冷却期过后先放行一个
+试探请求，成功则恢复。
+
+本模块不在导入时加载 requests，只有实际发送请求时才需要它。
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    import requests
+
+
+# 可重试的HTTP状态码：超时、限流、服务端临时错误
+RETRY_STATUSES = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+def retry_exceptions() -> tuple[type[Exception], ...]:
+    """可重试的异常：连接失败、超时、响应中途断开"""
+    import requests
+    return (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+
+
+class CircuitOpenError(Exception):
+    """主机处于熔断状态，请求未发送"""
+
+
+def retry_after_seconds(value: str | None, now: float | None = None) -> float | None:
+    """
+    解析 Retry-After 响应头
+
+    :param value: 秒数或 HTTP 日期
+    :param now: 当前时间戳（用于测试）
+    :return: 需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    :param max_attempts: 最多尝试次数（含第一次）
+    :param base_delay: 第一次重试前的最长等待（秒），之后每次翻倍
+    :param max_delay: 退避等待的上限（秒）
+    :param max_retry_after: Retry-After 等待的上限（秒），超过时放弃重试
+    :param retry_statuses: 可重试的状态码
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_retry_after: float = 120.0,
+        retry_statuses: frozenset[int] = RETRY_STATUSES,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+
+    def retryable(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从 1 开始）前的等待时间：[0, min(上限, base * 2^(attempt-1))] 内均匀随机"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def delay(self, attempt: int, response: requests.Response | None = None) -> float | None:
+        """
+        下一次重试前的等待时间
+
+        :return: 秒数；Retry-After 超过上限时返回 None（放弃重试）
+        """
+        if response is not None:
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(attempt)
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器（线程安全）
+
+    :param failure_threshold: 连续失败多少次后熔断
+    :param cooldown: 熔断持续时间（秒），之后放行一个试探请求
+    :param now: 单调时钟函数（用于测试）
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, now=time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.now = now
+        self._lock = threading.Lock()
+        self._failures: dict[str, int] = {}
+        self._opened: dict[str, float] = {}
+        self._probing: set[str] = set()
+
+    def allow(self, host: str) -> bool:
+        """是否可以向该主机发送请求"""
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return True
+            if self.now() - opened < self.cooldown or host in self._probing:
+                return False
+            # 冷却期已过：半开状态，只放行一个试探请求
+            self._probing.add(host)
+            return True
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+            self._probing.discard(host)
+
+    def record_failure(self, host: str) -> bool:
+        """
+        记录一次失败
+
+        :return: 是否因此进入熔断
+        """
+        with self._lock:
+            probing = host in self._probing
+            self._probing.discard(host)
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if probing or (host not in self._opened and failures >= self.failure_threshold):
+                self._opened[host] = self.now()
+                return True
+            return False
+
+
+def send_with_retry(
+    send,
+    url: str,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None = None,
+    count=None,
+    sleep=time.sleep,
+    read=None,
+) -> requests.Response:
+    """
+    按重试策略发送请求
+
+    可重试的状态码和异常会在等待后重试；其他状态码（包括 404）立即返回给调用方。
+    最后一次尝试仍失败时返回该响应或抛出该异常。流式响应的响应体由 read 在重试范围内
+    读取，读取中途连接断开（ChunkedEncodingError 等）时整个请求重试。
+
+    :param send: 发送一次请求的函数，返回 requests.Response
+    :param url: 请求URL（用于按主机熔断和输出）
+    :param policy: 重试策略
+    :param breaker: 熔断器
+    :param count: 统计回调 count(key, n)，记录 retries / retry_wait_ms / circuit_open 等
+    :param sleep: 等待函数（用于测试）
+    :param read: 读取响应体的函数 read(response)，对不重试的响应调用，每次尝试都会重新调用
+    :raises CircuitOpenError: 主机处于熔断状态
+    """
+    host = urlparse(url).netloc
+    count = count or (lambda key, n=1: None)
+    retryable_errors = retry_exceptions()
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None and not breaker.allow(host):
+            count("circuit_open")
+            raise CircuitOpenError(f"主机 {host} 连续失败，暂停请求")
+
+        response = None
+        try:
+            response = send()
+            if read is not None and not policy.retryable(response.status_code):
+                read(response)
+        except retryable_errors as e:
+            if response is not None:
+                response.close()
+                response = None
+            error = e
+        else:
+            if not policy.retryable(response.status_code):
+                if breaker is not None:
+                    breaker.record_success(host)
+                return response
+            error = None
+
+        if breaker is not None and breaker.record_failure(host):
+            print(f"  ⚠ 主机 {host} 连续失败，熔断 {breaker.cooldown:.0f}s")
+        wait = policy.delay(attempt, response) if attempt < policy.max_attempts else None
+        if wait is None:
+            count("giveups")
+            if error is not None:
+                raise error
+            return response
+
+        reason = f"[{response.status_code}]" if response is not None else f"{type(error).__name__}"
+        print(f"  ↻ {reason} {url}，{wait:.1f}s 后重试（{attempt + 1}/{policy.max_attempts}）")
+        if response is not None:
+            response.close()
+        count("retries")
+        count("retry_wait_ms", int(wait * 1000))
+        sleep(wait)
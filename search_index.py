@@ -0,0 +1,313 @@
+"""
+Full-text search over the generated documentation.
+
+The markdown is split into sections at its headers (outside code blocks).
+Text is tokenized into lowercase ASCII words (identifiers also yield their
+"_"-separated parts) and CJK bigrams, so terms such as "委托状态" are found
+without word segmentation. Sections are ranked with BM25.
+
+A whole identifier outranks its parts: in a query, the parts of
+"get_market_data" only carry PART_WEIGHT, and the section that defines an
+API (its first body line is the signature, "get_market_data(...)") counts the
+identifier DEFINITION_BOOST extra times. A single CJK character matches every bigram
+that contains it.
+
+The index is one binary file next to the document. Queries memory-map it and
+binary-search the sorted term table, so only the postings of the query terms
+are read; section text for snippets is sliced out of the markdown by byte
+offset instead of loading the whole document.
+
+Usage:
+    python search_index.py build [QMT_Docs/QMT_API_Documentation_Format.md]
+    python search_index.py query 委托状态 [-n 10]
+"""
+import argparse
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from md_common import atomic_open, split_sections
+
+DOC_FILE = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
+
+MAGIC = b"QMTSRCH1"
+VERSION = 1
+# magic, version, sections, terms, avgdl, source size, then byte offsets of the
+# section table, term table, string blob and postings
+HEADER = struct.Struct("<8sIIIdQQQQQ")
+# byte offset, byte length, token count, line number, title offset, title length
+SECTION = struct.Struct("<QIIIII")
+# key offset, key length, first posting, document frequency
+TERM = struct.Struct("<IIII")
+# section id, term frequency
+POSTING = struct.Struct("<II")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title tokens count this many extra times (the header line itself counts once)
+TITLE_BOOST = 2
+# The identifier an API section defines (its signature line) counts this many extra times
+DEFINITION_BOOST = 5
+# Query weight of the "_"-separated parts of an identifier (the identifier itself: 1)
+PART_WEIGHT = 0.25
+
+TOKEN_RE = re.compile(r"[0-9a-z_]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+# API signature as the first body line of a section: "get_market_data(" or "xtdata.get_market_data("
+DEFINITION_RE = re.compile(r"^\s*(?:[A-Za-z_]\w*\.)*([A-Za-z_]\w*)\s*\(")
+
+
+def tokenize(text):
+    """Yield search tokens: ASCII words (plus identifier parts) and CJK bigrams."""
+    for m in TOKEN_RE.finditer(text.lower()):
+        run = m.group()
+        if run[0] < "\u3400":
+            yield run
+            if "_" in run:
+                parts = [p for p in run.split("_") if p]
+                if len(parts) > 1:
+                    yield from parts
+        elif len(run) == 1:
+            yield run
+        else:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+
+
+def query_weights(query):
+    """Query tokens with their weights: identifier parts count PART_WEIGHT, everything else 1."""
+    weights = {}
+    for m in TOKEN_RE.finditer(query.lower()):
+        run = m.group()
+        for token in tokenize(run):
+            weight = PART_WEIGHT if token != run and "_" in run else 1.0
+            weights[token] = max(weights.get(token, 0.0), weight)
+    return weights
+
+
+def defined_identifier(text):
+    """Identifier whose signature opens the section (first body line outside fences), if any."""
+    for line in text.splitlines()[1:]:
+        stripped = line.strip()
+        if stripped and not stripped.startswith("```"):
+            m = DEFINITION_RE.match(stripped)
+            return m.group(1).lower() if m else None
+    return None
+
+
+def is_cjk_char(token):
+    return len(token) == 1 and token >= "\u3400"
+
+
+def index_path(doc_path):
+    return doc_path.with_name(f"{doc_path.stem}.search.idx")
+
+
+def build_index(doc_path=DOC_FILE, out_path=None):
+    """
+    Build the search index for a markdown file.
+
+    Returns a dict with the number of sections and terms and the index path.
+    """
+    doc_path = Path(doc_path)
+    out_path = Path(out_path) if out_path else index_path(doc_path)
+    data = doc_path.read_bytes()
+    sections = split_sections(data)
+
+    postings = {}
+    lengths = []
+    for sid, (title, _level, _line, offset, length) in enumerate(sections):
+        text = data[offset:offset + length].decode("utf-8", errors="replace")
+        counts = Counter(tokenize(text))
+        for token in tokenize(title):
+            counts[token] += TITLE_BOOST
+        defined = defined_identifier(text)
+        if defined:
+            counts[defined] += DEFINITION_BOOST
+        lengths.append(sum(counts.values()))
+        for token, tf in counts.items():
+            postings.setdefault(token.encode("utf-8"), []).append((sid, tf))
+
+    blob = bytearray()
+    section_table = bytearray()
+    for sid, (title, _level, line, offset, length) in enumerate(sections):
+        encoded = title.encode("utf-8")
+        section_table += SECTION.pack(offset, length, lengths[sid], line, len(blob), len(encoded))
+        blob += encoded
+
+    term_table = bytearray()
+    posting_table = bytearray()
+    first = 0
+    # UTF-8 byte order equals code point order, which the prefix scan relies on
+    for key in sorted(postings):
+        entries = postings[key]
+        term_table += TERM.pack(len(blob), len(key), first, len(entries))
+        blob += key
+        for sid, tf in entries:
+            posting_table += POSTING.pack(sid, tf)
+        first += len(entries)
+
+    avgdl = sum(lengths) / len(lengths) if lengths else 0.0
+    sections_off = HEADER.size
+    terms_off = sections_off + len(section_table)
+    blob_off = terms_off + len(term_table)
+    postings_off = blob_off + len(blob)
+    header = HEADER.pack(MAGIC, VERSION, len(sections), len(postings), avgdl, len(data),
+                         sections_off, terms_off, blob_off, postings_off)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(out_path, "wb") as f:
+        for chunk in (header, section_table, term_table, blob, posting_table):
+            f.write(chunk)
+    return {"sections": len(sections), "terms": len(postings), "bytes": postings_off + len(posting_table), "path": out_path}
+
+
+class SearchIndex:
+    """Read-only, memory-mapped view of an index written by build_index()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.n_sections, self.n_terms, self.avgdl, self.source_size,
+         self.sections_off, self.terms_off, self.blob_off, self.postings_off) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"Not a search index (or unsupported version): {self.path}")
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def section(self, sid):
+        """(title, line number, byte offset, byte length) of a section."""
+        offset, length, _tokens, line, title_off, title_len = SECTION.unpack_from(self.mm, self.sections_off + sid * SECTION.size)
+        start = self.blob_off + title_off
+        return self.mm[start:start + title_len].decode("utf-8"), line, offset, length
+
+    def _section_tokens(self, sid):
+        return SECTION.unpack_from(self.mm, self.sections_off + sid * SECTION.size)[2]
+
+    def _term(self, i):
+        key_off, key_len, first, df = TERM.unpack_from(self.mm, self.terms_off + i * TERM.size)
+        start = self.blob_off + key_off
+        return self.mm[start:start + key_len], first, df
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, token):
+        """(first posting, document frequency) of the token's terms; a single CJK
+        character matches every bigram containing it."""
+        key = token.encode("utf-8")
+        if is_cjk_char(token):
+            # CJK terms sort after all ASCII ones; scan just that part of the table
+            found = []
+            for i in range(self._lower_bound("\u3400".encode("utf-8")), self.n_terms):
+                term, first, df = self._term(i)
+                if key in term:
+                    found.append((first, df))
+            return found
+        i = self._lower_bound(key)
+        if i < self.n_terms:
+            term, first, df = self._term(i)
+            if term == key:
+                return [(first, df)]
+        return []
+
+    def postings(self, first, df):
+        start = self.postings_off + first * POSTING.size
+        return POSTING.iter_unpack(self.mm[start:start + df * POSTING.size])
+
+    def search(self, query, limit=10):
+        """Rank sections for a query; returns [(score, section id)] best first."""
+        scores = {}
+        lengths = {}
+        n = self.n_sections
+        for token, weight in query_weights(query).items():
+            for first, df in self.lookup(token):
+                idf = weight * math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for sid, tf in self.postings(first, df):
+                    dl = lengths.get(sid)
+                    if dl is None:
+                        dl = lengths[sid] = self._section_tokens(sid)
+                    norm = K1 * (1 - B + B * dl / self.avgdl) if self.avgdl else K1
+                    scores[sid] = scores.get(sid, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return heapq.nlargest(limit, ((score, sid) for sid, score in scores.items()))
+
+
+def snippet(doc_mm, offset, length, query, width=80):
+    """First line of the section that contains a query token (or its first body line)."""
+    text = doc_mm[offset:offset + length].decode("utf-8", errors="replace")
+    lines = [line.strip() for line in text.splitlines()[1:] if line.strip()]
+    tokens = [t for t in tokenize(query) if not is_cjk_char(t)] or list(tokenize(query))
+    for line in lines:
+        lowered = line.lower()
+        if any(t in lowered for t in tokens):
+            return line[:width]
+    return lines[0][:width] if lines else ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over the generated documentation")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="build the index for a markdown file")
+    p_build.add_argument("doc", nargs="?", type=Path, default=DOC_FILE)
+    p_query = sub.add_parser("query", help="search the index")
+    p_query.add_argument("terms", nargs="+")
+    p_query.add_argument("-n", "--limit", type=int, default=10)
+    p_query.add_argument("--doc", type=Path, default=DOC_FILE, help="markdown file the index was built from")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not args.doc.exists():
+            print(f"File not found: {args.doc}")
+            return 1
+        stats = build_index(args.doc)
+        print(f"Indexed {stats['sections']} sections, {stats['terms']} terms ({stats['bytes']} bytes): {stats['path']}")
+        return 0
+
+    idx_file = index_path(args.doc)
+    if not idx_file.exists():
+        print(f"Index not found: {idx_file} (run: python search_index.py build {args.doc})")
+        return 1
+    query = " ".join(args.terms)
+    started = time.perf_counter()
+    with SearchIndex(idx_file) as index, open(args.doc, "rb") as f:
+        results = index.search(query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        if os.fstat(f.fileno()).st_size != index.source_size:
+            print(f"Warning: {args.doc} changed since the index was built; rebuild it.")
+        if results:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as doc_mm:
+                for score, sid in results:
+                    title, line, offset, length = index.section(sid)
+                    print(f"{score:7.2f}  {title or '(preamble)'}  [{args.doc}:{line}]")
+                    text = snippet(doc_mm, offset, length, query)
+                    if text:
+                        print(f"         {text}")
+    print(f"{len(results)} result(s) in {elapsed:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
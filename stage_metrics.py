@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+流水线阶段指标
+
+为爬虫和后处理的每个阶段记录墙钟时间、CPU时间、进程峰值内存（RSS）以及
+请求数、重试次数、读写字节数等计数，输出为JSON报告；可选地为每个阶段保存一份
+cProfile 结果（.pstats），用 `python -m pstats <文件>` 或 snakeviz 查看。
+
+用法：
+    recorder = MetricsRecorder(profile_dir=None, stats=client.stats)
+    with recorder.stage("download_pages"):
+        ...
+        stage_metrics.add(bytes_written=n)   # 在阶段内部的任意线程中累加计数
+    recorder.save(path)
+
+cProfile 只记录调用阶段的线程；线程池中的下载时间体现在墙钟时间和计数里。
+"""
+
+import cProfile
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from md_common import atomic_open
+
+
+_lock = threading.Lock()
+_current: "StageRecord | None" = None
+
+
+def add(**counters: int) -> None:
+    """给当前正在执行的阶段累加计数（没有阶段在记录时忽略）"""
+    with _lock:
+        if _current is not None:
+            _current.counters.update(counters)
+
+
+def peak_rss() -> int | None:
+    """进程至今的峰值常驻内存（字节），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _windows_peak_rss() -> int | None:
+    """Windows 上没有 resource 模块，通过 psapi.GetProcessMemoryInfo 读取 PeakWorkingSetSize"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return int(counters.PeakWorkingSetSize)
+    except (AttributeError, OSError, ImportError):
+        pass
+    return None
+
+
+class StageRecord:
+    """一个阶段的指标"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss: int | None = None
+        self.counters: Counter[str] = Counter()
+        self.breakdown: dict[str, float] = {}
+        self.profile: str | None = None
+        self.error: str | None = None
+
+    def as_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "peak_rss_bytes": self.peak_rss,
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if self.breakdown:
+            data["breakdown_s"] = {k: round(v, 6) for k, v in self.breakdown.items()}
+        if self.profile:
+            data["profile"] = self.profile
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class MetricsRecorder:
+    """
+    记录一次运行中各阶段的指标
+
+    :param profile_dir: 提供时每个阶段保存一份 cProfile 结果
+    :param stats: 运行期间持续累加的计数器（如 CrawlClient.stats），每个阶段记录其增量
+    """
+
+    def __init__(self, profile_dir: Path | None = None, stats: Counter | None = None) -> None:
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.stats = stats
+        self.stages: list[StageRecord] = []
+        self.started = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段；阶段按顺序执行，不支持嵌套"""
+        global _current
+        record = StageRecord(name)
+        before = Counter(self.stats) if self.stats is not None else None
+        profiler = cProfile.Profile() if self.profile_dir else None
+        with _lock:
+            _current = record
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record.wall = time.perf_counter() - wall_start
+            record.cpu = time.process_time() - cpu_start
+            record.peak_rss = peak_rss()
+            with _lock:
+                _current = None
+                if before is not None:
+                    record.counters.update(Counter(self.stats) - before)
+            if profiler is not None:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                path = self.profile_dir / f"{len(self.stages) + 1:02d}-{name}.pstats"
+                profiler.dump_stats(path)
+                record.profile = str(path)
+            self.stages.append(record)
+
+    def report(self) -> dict:
+        """JSON报告"""
+        import platform
+        totals: Counter[str] = Counter()
+        for record in self.stages:
+            totals.update(record.counters)
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "command": sys.argv,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stages": [record.as_dict() for record in self.stages],
+            "total": {
+                "wall_s": round(time.perf_counter() - self._wall_start, 6),
+                "cpu_s": round(time.process_time() - self._cpu_start, 6),
+                "peak_rss_bytes": peak_rss(),
+                "counters": dict(sorted(totals.items())),
+            },
+        }
+
+    def save(self, path: Path) -> dict:
+        """原子写出JSON报告"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = self.report()
+        with atomic_open(path) as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def summary(self) -> list[str]:
+        """每个阶段一行的文字摘要"""
+        lines = []
+        for record in self.stages:
+            rss = f"{record.peak_rss / 1048576:7.1f} MiB" if record.peak_rss is not None else "      -    "
+            counters = ", ".join(f"{k}={v}" for k, v in sorted(record.counters.items()))
+            lines.append(f"{record.name:<24} {record.wall:8.3f}s  cpu {record.cpu:8.3f}s  rss {rss}  {counters}")
+        return lines
@@ -0,0 +1,663 @@
+"""
+Static HTML site built from the final document.
+
+The document is split into the same per-section pages as chunk_docs.py (every
+header up to --level starts a page), each rendered to its own small HTML file,
+so opening one function's documentation loads a few KB instead of the whole
+200 KB+ markdown. Pages share one CSS and one JS file, plus a search index
+(JSON, loaded only when the search box is used) that the script queries with
+the same tokenizer as search_index.py.
+
+Assets are written as assets/<name>.<content hash>.<ext>, so they can be
+served with a far-future Expires header; pages keep stable names. Every text
+file also gets a .gz copy, and a .br copy when the optional brotli package is
+installed, for nginx's gzip_static / brotli_static. Pages are rendered and
+compressed in a process pool; pages whose HTML is unchanged since the last
+build are not rewritten, and files from the previous build that are no longer
+produced are removed.
+
+The markdown renderer covers what the crawler emits: headers, paragraphs,
+nested lists, fenced code, tables, block quotes, rules, and inline code,
+links, images and bold text. Raw HTML in the markdown is escaped.
+
+Usage:
+    python static_site.py [QMT_Docs/QMT_API_Documentation_Format.md] [--out DIR] [--workers N]
+"""
+import argparse
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sys
+import textwrap
+from pathlib import Path
+
+from chunk_docs import CHUNK_LEVEL, anchor, link_targets, plan_chunks
+from md_common import (HEADER_RE, HR_RE, LIST_ITEM_RE, TABLE_RE, anchor_key, is_fence_marker, leading_spaces,
+                       write_atomic)
+from search_index import tokenize
+
+DOC_FILE = Path("QMT_Docs") / "QMT_API_Documentation_Format.md"
+SITE_TITLE = "QMT API 文档"
+MANIFEST = "manifest.json"
+ASSETS = "assets"
+# Files smaller than this are not worth a compressed copy
+COMPRESS_MIN_BYTES = 256
+COMPRESS_SUFFIXES = frozenset([".html", ".css", ".js", ".json", ".svg"])
+
+FENCE_RE = re.compile(r'^(\s*)```\s*([\w+-]*)')
+TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+CELL_SPLIT_RE = re.compile(r'(?<!\\)\|')
+# Link and image destinations may contain spaces ("#-指定session id范围连接交易")
+# and one level of parentheses ("#-委托状态(order_status)")
+INLINE_RE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|!\[(?P<alt>[^\]]*)\]\((?P<src>(?:[^()\n]|\([^()\n]*\))*)\)'
+    r'|\[(?P<text>[^\]]+)\]\((?P<href>(?:[^()\n]|\([^()\n]*\))*)\)'
+    r'|\*\*(?P<bold>.+?)\*\*'
+)
+
+STYLESHEET = """\
+*{box-sizing:border-box}
+body{margin:0;font:15px/1.6 -apple-system,"Segoe UI","PingFang SC","Microsoft YaHei",sans-serif;color:#24292f;background:#fff}
+header{position:sticky;top:0;display:flex;gap:1em;align-items:center;padding:.5em 1em;background:#f6f8fa;border-bottom:1px solid #d0d7de;z-index:1}
+header a.home{font-weight:600;color:inherit;text-decoration:none}
+#search{flex:1;max-width:28em;padding:.3em .6em;border:1px solid #d0d7de;border-radius:6px;font:inherit}
+#search-results{position:absolute;top:100%;left:1em;right:1em;max-width:40em;max-height:70vh;overflow:auto;margin:0;padding:0;list-style:none;background:#fff;border:1px solid #d0d7de;box-shadow:0 4px 12px rgba(0,0,0,.1)}
+#search-results:empty{display:none}
+#search-results li a{display:block;padding:.4em .8em;color:inherit;text-decoration:none}
+#search-results li a:hover,#search-results li a:focus{background:#f6f8fa}
+#search-results small{display:block;color:#57606a}
+main{max-width:60em;margin:0 auto;padding:1em 1.5em 3em}
+nav.crumbs{font-size:.9em;color:#57606a}
+nav.crumbs a{color:inherit}
+nav.pager{display:flex;justify-content:space-between;gap:1em;margin-top:3em;padding-top:1em;border-top:1px solid #d0d7de}
+a{color:#0969da}
+pre{overflow:auto;padding:.8em 1em;background:#f6f8fa;border-radius:6px;line-height:1.45}
+code{font:13px/1.45 ui-monospace,SFMono-Regular,Consolas,monospace}
+:not(pre)>code{padding:.1em .3em;background:#eff1f3;border-radius:4px}
+table{border-collapse:collapse;display:block;overflow:auto}
+th,td{padding:.3em .7em;border:1px solid #d0d7de}
+th{background:#f6f8fa}
+blockquote{margin:0;padding:0 1em;color:#57606a;border-left:.25em solid #d0d7de}
+img{max-width:100%}
+ul.toc{list-style:none;padding:0}
+ul.toc .l2{padding-left:1em}ul.toc .l3{padding-left:2em}ul.toc .l4{padding-left:3em}ul.toc .l5{padding-left:4em}
+"""
+
+SCRIPT = r"""(function () {
+  var input = document.getElementById("search");
+  var list = document.getElementById("search-results");
+  var index = null;
+  var loading = null;
+  var timer = null;
+  // Same tokens as search_index.tokenize(): ASCII words (plus identifier parts) and CJK bigrams
+  var TOKEN = /[0-9a-z_]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+/g;
+
+  function tokenize(text) {
+    var tokens = [];
+    (text.toLowerCase().match(TOKEN) || []).forEach(function (run) {
+      if (run[0] < "\u3400") {
+        tokens.push(run);
+        var parts = run.split("_").filter(Boolean);
+        if (parts.length > 1) tokens.push.apply(tokens, parts);
+      } else if (run.length === 1) {
+        tokens.push(run);
+      } else {
+        for (var i = 0; i < run.length - 1; i++) tokens.push(run.slice(i, i + 2));
+      }
+    });
+    return tokens;
+  }
+
+  function load() {
+    if (!loading) {
+      loading = fetch(document.body.dataset.search)
+        .then(function (response) { return response.json(); })
+        .then(function (data) { index = data; });
+    }
+    return loading;
+  }
+
+  function postings(token) {
+    if (token.length === 1 && token >= "\u3400") {
+      // A single CJK character matches every bigram containing it, like SearchIndex.lookup()
+      var ids = [];
+      Object.keys(index.terms).forEach(function (key) {
+        if (key.indexOf(token) >= 0) ids = ids.concat(index.terms[key]);
+      });
+      return Array.from(new Set(ids));
+    }
+    return index.terms[token] || [];
+  }
+
+  function search(query) {
+    var tokens = Array.from(new Set(tokenize(query)));
+    var scores = {};
+    tokens.forEach(function (token) {
+      postings(token).forEach(function (id) { scores[id] = (scores[id] || 0) + 1; });
+    });
+    var lowered = query.trim().toLowerCase();
+    return Object.keys(scores).map(Number).sort(function (a, b) {
+      var titleA = index.pages[a][1].toLowerCase().indexOf(lowered) >= 0;
+      var titleB = index.pages[b][1].toLowerCase().indexOf(lowered) >= 0;
+      return (scores[b] - scores[a]) || (titleB - titleA) || (a - b);
+    }).slice(0, 20);
+  }
+
+  function show() {
+    var query = input.value;
+    list.textContent = "";
+    if (!query.trim()) return;
+    load().then(function () {
+      if (input.value !== query) return;
+      search(query).forEach(function (id) {
+        var page = index.pages[id];
+        var link = document.createElement("a");
+        link.href = page[0];
+        link.textContent = page[1];
+        if (page[2]) {
+          var path = document.createElement("small");
+          path.textContent = page[2];
+          link.appendChild(path);
+        }
+        var item = document.createElement("li");
+        item.appendChild(link);
+        list.appendChild(item);
+      });
+    });
+  }
+
+  input.addEventListener("focus", load);
+  input.addEventListener("input", function () {
+    clearTimeout(timer);
+    timer = setTimeout(show, 80);
+  });
+  input.addEventListener("keydown", function (event) {
+    if (event.key === "Enter" && list.firstChild) {
+      location.href = list.firstChild.firstChild.href;
+    } else if (event.key === "Escape") {
+      input.value = "";
+      list.textContent = "";
+    }
+  });
+})();
+"""
+
+
+# ================================================================================================
+# Markdown rendering
+# ================================================================================================
+
+def local_link(url):
+    """An in-page link with its fragment normalized like heading ids; other URLs unchanged."""
+    return "#" + anchor_key(url[1:]) if url.startswith("#") else url
+
+
+def dedent(line, width):
+    return line[min(width, leading_spaces(line)):]
+
+
+class Renderer:
+    """
+    Markdown to HTML for one page.
+
+    `resolve` maps a link or image target to the URL to emit (default: local_link).
+    """
+
+    def __init__(self, resolve=None):
+        self.resolve = resolve or local_link
+
+    def inline(self, text):
+        out = []
+        pos = 0
+        for m in INLINE_RE.finditer(text):
+            out.append(html.escape(text[pos:m.start()], quote=False))
+            pos = m.end()
+            if m.group("code"):
+                out.append(f"<code>{html.escape(m.group('code_text').strip(), quote=False)}</code>")
+            elif m.group("src") is not None:
+                src = html.escape(self.resolve(m.group("src")))
+                out.append(f'<img src="{src}" alt="{html.escape(m.group("alt"))}" loading="lazy">')
+            elif m.group("href") is not None:
+                href = html.escape(self.resolve(m.group("href")))
+                out.append(f'<a href="{href}">{self.inline(m.group("text"))}</a>')
+            else:
+                out.append(f"<strong>{self.inline(m.group('bold'))}</strong>")
+        out.append(html.escape(text[pos:], quote=False))
+        return "".join(out)
+
+    def heading(self, line):
+        stripped = line.strip()
+        level = len(stripped) - len(stripped.lstrip("#"))
+        title = stripped[level:].strip()
+        # "#### # Title": the crawler keeps the site's permalink marker; fix_links
+        # links these headers as "#-Title". Ids and link fragments are both
+        # normalized with anchor_key, which also keeps whitespace out of ids.
+        if title.startswith("# "):
+            title = title[2:].strip()
+            ident = anchor(title)
+        else:
+            ident = title
+        return f'<h{level} id="{html.escape(anchor_key(ident))}">{self.inline(title)}</h{level}>'
+
+    def render(self, lines, tight=False):
+        """Render block-level markdown; `tight` list items get no <p> around their text."""
+        out = []
+        i, n = 0, len(lines)
+        while i < n:
+            line = lines[i]
+            if not line.strip():
+                i += 1
+                continue
+            fence = FENCE_RE.match(line)
+            if fence:
+                width = len(fence.group(1))
+                code = []
+                i += 1
+                while i < n and not is_fence_marker(lines[i]):
+                    code.append(dedent(lines[i], width))
+                    i += 1
+                i += 1
+                # Code copied from the site inside list items keeps its page indentation
+                text = textwrap.dedent("\n".join(code)).strip("\n")
+                lang = f' class="language-{fence.group(2)}"' if fence.group(2) else ""
+                out.append(f"<pre><code{lang}>{html.escape(text, quote=False)}</code></pre>")
+            elif HEADER_RE.match(line):
+                out.append(self.heading(line))
+                i += 1
+            elif HR_RE.match(line):
+                out.append("<hr>")
+                i += 1
+            elif TABLE_RE.match(line) and i + 1 < n and TABLE_SEPARATOR_RE.match(lines[i + 1]):
+                i = self.table(lines, i, out)
+            elif line.lstrip().startswith(">"):
+                quoted = []
+                while i < n and lines[i].lstrip().startswith(">"):
+                    text = lines[i].lstrip()[1:]
+                    quoted.append(text[1:] if text.startswith(" ") else text)
+                    i += 1
+                out.append(f"<blockquote>{self.render(quoted)}</blockquote>")
+            elif LIST_ITEM_RE.match(line):
+                i = self.list(lines, i, out)
+            else:
+                paragraph = []
+                while i < n and lines[i].strip() and not self.starts_block(lines, i):
+                    paragraph.append(lines[i].strip())
+                    i += 1
+                text = self.inline(" ".join(paragraph))
+                out.append(text if tight else f"<p>{text}</p>")
+        return "\n".join(out)
+
+    def starts_block(self, lines, i):
+        line = lines[i]
+        return bool(
+            FENCE_RE.match(line) or HEADER_RE.match(line) or LIST_ITEM_RE.match(line)
+            or line.lstrip().startswith(">")
+            or HR_RE.match(line)
+            or (TABLE_RE.match(line) and i + 1 < len(lines) and TABLE_SEPARATOR_RE.match(lines[i + 1]))
+        )
+
+    def table(self, lines, i, out):
+        def cells(line):
+            row = line.strip()
+            row = row[1:] if row.startswith("|") else row
+            row = row[:-1] if row.endswith("|") and not row.endswith("\\|") else row
+            return [cell.strip().replace("\\|", "|") for cell in CELL_SPLIT_RE.split(row)]
+
+        head = "".join(f"<th>{self.inline(cell)}</th>" for cell in cells(lines[i]))
+        rows = []
+        i += 2
+        while i < len(lines) and TABLE_RE.match(lines[i]):
+            rows.append("<tr>" + "".join(f"<td>{self.inline(cell)}</td>" for cell in cells(lines[i])) + "</tr>")
+            i += 1
+        out.append(f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+        return i
+
+    def list(self, lines, i, out):
+        first = LIST_ITEM_RE.match(lines[i])
+        indent = len(first.group(1))
+        ordered = first.group(2)[0].isdigit()
+        items = []
+        n = len(lines)
+        while i < n:
+            m = LIST_ITEM_RE.match(lines[i])
+            if not m or len(m.group(1)) != indent:
+                break
+            # The item owns the following lines indented past its marker
+            # (and everything inside a fence it opens), blank lines included
+            column = m.end()
+            body = [lines[i][column:]]
+            in_fence = is_fence_marker(body[0])
+            i += 1
+            while i < n:
+                line = lines[i]
+                if in_fence:
+                    in_fence = not is_fence_marker(line)
+                elif line.strip():
+                    if leading_spaces(line) <= indent:
+                        break
+                    in_fence = is_fence_marker(line)
+                body.append(dedent(line, column))
+                i += 1
+            while body and not body[-1].strip():
+                body.pop()
+            tight = all(line.strip() for line in body)
+            items.append(f"<li>{self.render(body, tight=tight)}</li>")
+            # A blank line between items does not end the list
+            j = i
+            while j < n and not lines[j].strip():
+                j += 1
+            if j < n and (m := LIST_ITEM_RE.match(lines[j])) and len(m.group(1)) == indent:
+                i = j
+            else:
+                break
+        tag = "ol" if ordered else "ul"
+        start = int(first.group(2)[:-1]) if ordered else 1
+        attrs = f' start="{start}"' if start != 1 else ""
+        out.append(f"<{tag}{attrs}>{''.join(items)}</{tag}>")
+        return i
+
+
+def render_markdown(text, resolve=None):
+    return Renderer(resolve).render(text.splitlines())
+
+
+# ================================================================================================
+# Pages
+# ================================================================================================
+
+def page_filename(chunk):
+    return chunk["file"][:-len(".md")] + ".html"
+
+
+def hashed_name(name, data):
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{dot}{suffix}"
+
+
+def page_html(title, body, context, crumbs="", pager=""):
+    return (
+        '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{html.escape(title)}</title>\n"
+        f'<link rel="stylesheet" href="{context["css"]}">\n'
+        f'<script defer src="{context["js"]}"></script>\n'
+        f'</head>\n<body data-search="{context["search"]}">\n'
+        f'<header><a class="home" href="index.html">{html.escape(SITE_TITLE)}</a>'
+        '<input id="search" type="search" placeholder="搜索" autocomplete="off" aria-label="搜索">'
+        '<ul id="search-results"></ul></header>\n'
+        f"<main>\n{crumbs}{body}\n{pager}</main>\n</body>\n</html>\n"
+    )
+
+
+def write_file(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, data)
+
+
+def brotli_module():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compressed_variants(name, data):
+    """{".gz": bytes, ".br": bytes} for the variants that are smaller than `data`."""
+    if Path(name).suffix not in COMPRESS_SUFFIXES or len(data) < COMPRESS_MIN_BYTES:
+        return {}
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = brotli_module()
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+def publish(out_dir, name, data, previous_sha=None):
+    """
+    Write a site file and its compressed copies, unless the previous build
+    already wrote the same content. Returns its manifest entry.
+    """
+    sha = hashlib.sha256(data).hexdigest()
+    entry = {"file": name, "sha256": sha, "bytes": len(data)}
+    target = out_dir / name
+    if sha == previous_sha and target.exists():
+        suffixes = [suffix for suffix in (".gz", ".br") if target.with_name(target.name + suffix).exists()]
+        entry["compressed"] = {suffix: (out_dir / (name + suffix)).stat().st_size for suffix in suffixes}
+        entry["written"] = False
+        return entry
+    write_file(target, data)
+    variants = compressed_variants(name, data)
+    for suffix in (".gz", ".br"):
+        path = target.with_name(target.name + suffix)
+        if suffix in variants:
+            write_file(path, variants[suffix])
+        else:
+            path.unlink(missing_ok=True)
+    entry["compressed"] = {suffix: len(body) for suffix, body in variants.items()}
+    entry["written"] = True
+    return entry
+
+
+_context = None
+
+
+def _init_worker(context):
+    global _context
+    _context = context
+
+
+def build_page(job):
+    """Render one page and publish it (runs in a worker process)."""
+    context = _context
+    chunk_id = job["id"]
+
+    def resolve(url):
+        if url.startswith("#"):
+            key = anchor_key(url[1:])
+            target = context["anchors"].get(key)
+            if target is None or target == chunk_id:
+                return local_link(url)
+            return f"{context['pages'][target]}#{key}"
+        return context["images"].get(url, url)
+
+    renderer = Renderer(resolve)
+    body = renderer.render(job["text"].splitlines())
+    if job["children"]:
+        links = "".join(f'<li><a href="{context["pages"][c]}">{html.escape(t)}</a></li>'
+                        for c, t in job["children"])
+        body += f'\n<ul class="toc">{links}</ul>'
+    crumbs = ""
+    if job["path"]:
+        parts = []
+        for title in job["path"]:
+            target = context["anchors"].get(anchor_key(anchor(title)))
+            label = html.escape(title)
+            parts.append(f'<a href="{context["pages"][target]}">{label}</a>' if target is not None else label)
+        crumbs = f'<nav class="crumbs">{" / ".join(parts)}</nav>\n'
+    pager = ""
+    if job["prev"] is not None or job["next"] is not None:
+        links = []
+        for key, label in (("prev", "上\u4e00页"), ("next", "下\u4e00页")):
+            neighbour = job[key]
+            if neighbour is None:
+                links.append("<span></span>")
+            else:
+                links.append(f'<a href="{context["pages"][neighbour[0]]}">{label}: {html.escape(neighbour[1])}</a>')
+        pager = f'<nav class="pager">{"".join(links)}</nav>\n'
+    title = f"{job['title']} - {SITE_TITLE}" if job["title"] else SITE_TITLE
+    data = page_html(title, body, context, crumbs, pager).encode("utf-8")
+    name = context["pages"][chunk_id]
+    return publish(Path(context["out_dir"]), name, data, context["previous"].get(name))
+
+
+# ================================================================================================
+# Build
+# ================================================================================================
+
+def site_dir(doc_path):
+    return doc_path.with_name("site")
+
+
+def page_text(data, chunk):
+    return data[chunk["offset"]:chunk["offset"] + chunk["length"]].decode("utf-8")
+
+
+def search_data(data, chunks, pages):
+    """Compact inverted index: page list plus term -> page ids."""
+    terms = {}
+    for chunk in chunks:
+        for token in set(tokenize(chunk["title"] + "\n" + page_text(data, chunk))):
+            terms.setdefault(token, []).append(chunk["id"])
+    return {
+        "pages": [[pages[c["id"]], c["title"] or SITE_TITLE, " / ".join(c["path"])] for c in chunks],
+        "terms": dict(sorted(terms.items())),
+    }
+
+
+def copy_images(doc_path, data, out_dir):
+    """Copy the images the document references into assets/ under hashed names; returns {markdown src: site URL}."""
+    images = {}
+    for m in INLINE_RE.finditer(data.decode("utf-8")):
+        src = m.group("src")
+        if not src or src in images or re.match(r'^[a-z]+:', src):
+            continue
+        path = doc_path.parent / src
+        if not path.is_file():
+            continue
+        name = f"{ASSETS}/img/{hashed_name(path.name, path.read_bytes())}"
+        target = out_dir / name
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+        images[src] = name
+    return images
+
+
+def build_site(doc_path=DOC_FILE, out_dir=None, level=CHUNK_LEVEL, workers=0):
+    """
+    Build the static site for a markdown document.
+
+    Returns the manifest (pages, assets, and how many files were written).
+    """
+    doc_path = Path(doc_path)
+    out_dir = Path(out_dir) if out_dir else site_dir(doc_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = doc_path.read_bytes()
+    chunks, anchors = plan_chunks(data, level)
+    # Normalized fragment -> page, for "-Title" anchors and the table of contents' plain slugs
+    anchors = link_targets(anchors)
+
+    manifest_path = out_dir / MANIFEST
+    previous = {}
+    previous_files = set()
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        previous = {e["file"]: e["sha256"] for e in old.get("pages", []) + old.get("assets", [])}
+        previous_files = set(old.get("files", []))
+
+    pages = {chunk["id"]: page_filename(chunk) for chunk in chunks}
+    assets = []
+    names = {}
+    search = json.dumps(search_data(data, chunks, pages), ensure_ascii=False, separators=(",", ":"))
+    for key, name, body in (("css", "site.css", STYLESHEET), ("js", "site.js", SCRIPT), ("search", "search.json", search)):
+        encoded = body.encode("utf-8")
+        names[key] = f"{ASSETS}/{hashed_name(name, encoded)}"
+        assets.append(publish(out_dir, names[key], encoded, previous.get(names[key])))
+    images = copy_images(doc_path, data, out_dir)
+
+    context = {
+        "out_dir": str(out_dir),
+        "anchors": anchors,
+        "pages": pages,
+        "images": images,
+        "previous": previous,
+        **names,
+    }
+    jobs = []
+    for chunk in chunks:
+        own_path = chunk["path"] + [chunk["title"]]
+        children = [(c["id"], c["title"]) for c in chunks
+                    if c["id"] > chunk["id"] and c["path"] == own_path and chunk["level"]]
+        jobs.append({
+            "id": chunk["id"],
+            "title": chunk["title"],
+            "path": chunk["path"],
+            "text": page_text(data, chunk),
+            "children": children,
+            "prev": (chunk["id"] - 1, chunks[chunk["id"] - 1]["title"] or SITE_TITLE) if chunk["id"] else None,
+            "next": (chunk["id"] + 1, chunks[chunk["id"] + 1]["title"]) if chunk["id"] + 1 < len(chunks) else None,
+        })
+
+    if workers != 1 and len(jobs) > 1:
+        # Imported here so importing this module stays cheap
+        from concurrent.futures import ProcessPoolExecutor
+        max_workers = min(workers or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(context,)) as executor:
+            entries = list(executor.map(build_page, jobs, chunksize=max(1, len(jobs) // (max_workers * 4))))
+    else:
+        _init_worker(context)
+        entries = [build_page(job) for job in jobs]
+    for entry, chunk in zip(entries, chunks):
+        entry["title"] = chunk["title"]
+        entry["path"] = chunk["path"]
+
+    # Table of contents
+    toc = "".join(
+        f'<li class="l{c["level"]}"><a href="{pages[c["id"]]}">{html.escape(c["title"])}</a></li>'
+        for c in chunks if c["title"]
+    )
+    index = page_html(SITE_TITLE, f'<h1>{html.escape(SITE_TITLE)}</h1>\n<ul class="toc">{toc}</ul>', names)
+    entries.append(publish(out_dir, "index.html", index.encode("utf-8"), previous.get("index.html")))
+
+    files = set(images.values())
+    for entry in entries + assets:
+        files.add(entry["file"])
+        files.update(entry["file"] + suffix for suffix in entry["compressed"])
+    for name in previous_files - files:
+        (out_dir / name).unlink(missing_ok=True)
+
+    manifest = {
+        "source": doc_path.name,
+        "source_sha256": hashlib.sha256(data).hexdigest(),
+        "level": level,
+        "brotli": brotli_module() is not None,
+        "pages": [{k: v for k, v in e.items() if k != "written"} for e in entries],
+        "assets": [{k: v for k, v in e.items() if k != "written"} for e in assets],
+        "files": sorted(files),
+    }
+    write_file(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    manifest["written"] = sum(e["written"] for e in entries + assets)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a static HTML site from the final document")
+    parser.add_argument("doc", nargs="?", type=Path, default=DOC_FILE)
+    parser.add_argument("--out", type=Path, help="site directory (default: site/ next to the document)")
+    parser.add_argument("--level", type=int, default=CHUNK_LEVEL, help="deepest header level that starts a page")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0: one per CPU, 1: no pool)")
+    args = parser.parse_args(argv)
+
+    if not args.doc.exists():
+        print(f"File not found: {args.doc}")
+        return 1
+    manifest = build_site(args.doc, args.out, args.level, args.workers)
+    pages = manifest["pages"]
+    total = sum(p["bytes"] for p in pages)
+    gzipped = sum(p["compressed"].get(".gz", p["bytes"]) for p in pages)
+    print(f"Built {len(pages)} pages ({manifest['written']} written), {total} bytes, {gzipped} gzipped: "
+          f"{args.out or site_dir(args.doc)}")
+    if not manifest["brotli"]:
+        print("brotli is not installed; only .gz copies were written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""测试共用的 fixture：本地替身站点"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from local_mirror import DOCS_DIR, serve  # noqa: E402
+
+
+@pytest.fixture
+def mirror():
+    """用 QMT_Docs/ 中保存的页面和图片模拟文档站点，返回其 BASE_URL"""
+    with serve(docs_dir=DOCS_DIR) as base_url:
+        yield base_url
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """在临时目录中运行（爬虫的输出路径相对于当前目录）"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
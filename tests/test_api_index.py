@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""结构化API索引：从已保存的 xtdata / xttrader 页面提取并按名称查询"""
+
+import json
+import shutil
+import stat
+from pathlib import Path
+
+import pytest
+
+import api_index
+from md_common import file_mode
+
+DOCS_DIR = Path(__file__).resolve().parent.parent / "QMT_Docs"
+
+
+@pytest.fixture(scope="module")
+def docs_dir(tmp_path_factory):
+    """复制两个API页面并生成索引"""
+    docs = tmp_path_factory.mktemp("docs")
+    for page in api_index.API_PAGES:
+        shutil.copy(DOCS_DIR / page, docs / page)
+    api_index.main(["--docs-dir", str(docs)])
+    return docs
+
+
+def run_lookup(docs_dir, name, capsys):
+    """通过 --lookup 查询，返回解析后的JSON输出"""
+    capsys.readouterr()
+    api_index.main(["--docs-dir", str(docs_dir), "--lookup", name])
+    return json.loads(capsys.readouterr().out)
+
+
+def test_index_files_are_readable(docs_dir):
+    for name in (api_index.INDEX_JSON, api_index.INDEX_DB):
+        assert stat.S_IMODE((docs_dir / name).stat().st_mode) == file_mode(), name
+    assert not list(docs_dir.glob(".*"))
+
+
+def test_lookup_function(docs_dir, capsys):
+    result = run_lookup(docs_dir, "get_market_data", capsys)
+    [function] = result["functions"]
+    assert function["module"] == "xtdata"
+    assert function["signature"].startswith("get_market_data(field_list=[], stock_list=[], period='1d'")
+    assert function["description"]
+    parameters = {p["name"]: p for p in function["parameters"]}
+    assert list(parameters)[:3] == ["field_list", "stock_list", "period"]
+    assert parameters["period"]["type"] == "string"
+    assert parameters["period"]["default"] == "'1d'"
+    assert parameters["stock_list"]["description"] == "合约代码列表"
+
+
+def test_lookup_structure(docs_dir, capsys):
+    result = run_lookup(docs_dir, "XtTrade", capsys)
+    assert result["functions"] == [] and result["enums"] == []
+    [structure] = result["structures"]
+    assert structure["module"] == "xttrader"
+    fields = {f["name"]: f for f in structure["fields"]}
+    assert {"account_id", "stock_code", "traded_price", "traded_volume", "order_id"} <= set(fields)
+    assert fields["traded_price"]["type"] == "float"
+    assert fields["traded_price"]["description"] == "成交均价"
+
+
+def test_lookup_enum(docs_dir, capsys):
+    result = run_lookup(docs_dir, "order_status", capsys)
+    [enum] = result["enums"]
+    assert enum["module"] == "xttrader"
+    values = {v["name"]: v for v in enum["values"]}
+    assert values["xtconstant.ORDER_UNREPORTED"]["value"] == "48"
+    assert values["xtconstant.ORDER_UNREPORTED"]["label"] == "未报"
+
+    [enum] = run_lookup(docs_dir, "market", capsys)["enums"]
+    assert {"name": "xtconstant.SH_MARKET", "value": None, "label": "上交所", "group": None} in enum["values"]
+
+
+def test_lookup_unknown_name(docs_dir, capsys):
+    assert run_lookup(docs_dir, "no_such_api", capsys) == {"functions": [], "structures": [], "enums": []}
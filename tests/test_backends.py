@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""各HTML解析后端的Markdown输出应与 BeautifulSoup(html.parser) 逐字节一致"""
+
+from pathlib import Path
+
+import pytest
+
+from html_backends import available_backends
+from qmt_crawler import convert_page
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "pages"
+SAVED_DIR = Path(__file__).resolve().parent.parent / "QMT_Docs"
+# 小型样例页面覆盖各类标签，另加 QMT_Docs/ 中保存的真实页面
+PAGES = sorted(FIXTURES_DIR.glob("*.html")) + sorted(SAVED_DIR.glob("*.html"))
+
+
+@pytest.mark.parametrize("backend", ["selectolax", "lxml"])
+@pytest.mark.parametrize("page", PAGES, ids=lambda path: path.name)
+def test_backend_matches_bs4(backend, page):
+    if backend not in available_backends():
+        pytest.skip(f"{backend} 未安装")
+    reference = convert_page(page, "bs4")
+    assert reference.strip()
+    assert convert_page(page, backend) == reference
+
+
+def test_lxml_get_text_deep_nesting():
+    """嵌套深度超过递归限制时 get_text() 仍按文档顺序返回全部文本"""
+    import sys
+
+    etree = pytest.importorskip("lxml.etree")
+    from html_backends import LxmlBackend, LxmlNode
+
+    LxmlBackend()
+    depth = sys.getrecursionlimit() + 100
+    root = element = etree.Element("div")
+    for _ in range(depth):
+        element.append(etree.Comment("注释"))
+        element = etree.SubElement(element, "div")
+        element.text = "a"
+        element.tail = "b"
+    element.text = "底层"
+    assert LxmlNode(root).get_text() == "a" * (depth - 1) + "底层" + "b" * depth
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""分块之间的链接"""
+
+from pathlib import Path
+
+from chunk_docs import link_targets, write_chunks
+from md_common import ANCHOR_LINK_RE, anchor_key
+
+DOC_FILE = Path(__file__).resolve().parent.parent / "QMT_Docs" / "QMT_API_Documentation_Format.md"
+
+DOC = """# 文档
+
+## 目录
+
+- [快速开始](#快速开始)
+- [XtQuant.XtData 行情模块](#XtQuantXtData-行情模块)
+
+## 快速开始
+
+见[指定session id范围连接交易](#-指定session id范围连接交易)和[委托状态](#-委托状态(order_status))。
+
+## XtQuant.XtData 行情模块
+
+##### # 指定session id范围连接交易
+
+本节内的链接：[委托状态](#-委托状态(order_status))
+
+###### # 委托状态(order_status)
+
+回到[上一节](#-指定session id范围连接交易)
+"""
+
+
+def chunk_texts(manifest, out_dir):
+    return {c["file"]: (c, (out_dir / c["file"]).read_text(encoding="utf-8")) for c in manifest["chunks"]}
+
+
+def test_links_with_spaces_and_toc_are_relinked(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text(DOC, encoding="utf-8")
+    out_dir = tmp_path / "chunks"
+    manifest = write_chunks(doc, out_dir)
+    texts = {c["title"]: text for c, text in chunk_texts(manifest, out_dir).values()}
+
+    assert "[快速开始](002-快速开始.md#快速开始)" in texts["目录"]
+    assert "[XtQuant.XtData 行情模块](003-XtQuant.XtData-行情模块.md#XtQuantXtData-行情模块)" in texts["目录"]
+    assert "(004-指定session-id范围连接交易.md#-指定session id范围连接交易)" in texts["快速开始"]
+    assert "(004-指定session-id范围连接交易.md#-委托状态(order_status))" in texts["快速开始"]
+    # 同一分块内的链接保持不变
+    assert "(#-委托状态(order_status))" in texts["指定session id范围连接交易"]
+    assert "(#-指定session id范围连接交易)" in texts["指定session id范围连接交易"]
+    assert manifest["foreign_links"] == []
+
+
+def test_no_chunk_links_to_another_chunks_anchor(tmp_path):
+    """真实文档的每个分块中，剩下的页内链接都指向本分块的锚点"""
+    out_dir = tmp_path / "chunks"
+    manifest = write_chunks(DOC_FILE, out_dir)
+    targets = link_targets(manifest["anchors"])
+    for chunk, text in chunk_texts(manifest, out_dir).values():
+        for m in ANCHOR_LINK_RE.finditer(text):
+            assert targets.get(anchor_key(m.group(1)), chunk["id"]) == chunk["id"], (chunk["file"], m.group(1))
+    assert manifest["foreign_links"] == []
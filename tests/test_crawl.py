@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""针对本地替身站点的爬取测试"""
+
+import re
+from pathlib import Path
+
+import qmt_crawler
+from http_cache import HttpCache
+from md_common import file_mode
+from qmt_crawler import CrawlClient, download_all_pages
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_crawl_against_mirror(mirror, workdir):
+    """完整爬取一次：所有页面、图片和 Markdown 都应生成，页面中的图片改为引用本地文件"""
+    qmt_crawler.main(["--base-url", mirror, "--rate", "0", "--no-optimize-images"])
+
+    output_dir = workdir / qmt_crawler.OUTPUT_DIR
+    for page in qmt_crawler.PAGES:
+        assert (output_dir / page).is_file(), page
+    images = [path for path in (output_dir / "images").iterdir() if path.is_file()]
+    assert len(images) == 3
+    # 与 open() 新建的文件权限相同，其他用户和 Web 服务器可以读取
+    expected_mode = file_mode()
+    assert all(path.stat().st_mode & 0o777 == expected_mode for path in images)
+    for cache_dir in (qmt_crawler.HTTP_CACHE_DIR, qmt_crawler.BUILD_DIR):
+        cached = [path for path in (workdir / cache_dir).rglob("*") if path.is_file()]
+        assert cached and all(path.stat().st_mode & 0o777 == expected_mode for path in cached), cache_dir
+
+    markdown = (output_dir / "QMT_API_Documentation.md").read_text(encoding="utf-8")
+    for title in qmt_crawler.PAGE_TITLES.values():
+        assert f"## {title}" in markdown
+    # 替身站点提供的正是 QMT_Docs/ 中的页面，转换结果应与提交的文档逐字节一致
+    assert markdown == (ROOT / "QMT_Docs" / "QMT_API_Documentation.md").read_text(encoding="utf-8")
+
+    html = (output_dir / "start_now.html").read_text(encoding="utf-8")
+    sources = re.findall(r'src="([^"]+\.png)"', html)
+    assert sources and all(src.startswith("images/") for src in sources)
+    assert all((output_dir / src).is_file() for src in sources)
+
+
+def test_revalidate_and_offline(mirror, workdir):
+    """第二次抓取全部以 304 命中缓存；离线模式只读缓存，不发请求"""
+    qmt_crawler.ensure_dirs()
+
+    def crawl(offline=False):
+        client = CrawlClient(rate=0, cache=HttpCache(qmt_crawler.HTTP_CACHE_DIR), offline=offline)
+        try:
+            files = download_all_pages(client, base_url=mirror)
+        finally:
+            client.close()
+        return files, client.stats
+
+    files, stats = crawl()
+    assert len(files) == len(qmt_crawler.PAGES)
+    assert stats["cache_stored"] == len(qmt_crawler.PAGES)
+
+    files, stats = crawl()
+    assert len(files) == len(qmt_crawler.PAGES)
+    assert stats["cache_revalidated"] == len(qmt_crawler.PAGES)
+
+    files, stats = crawl(offline=True)
+    assert len(files) == len(qmt_crawler.PAGES)
+    assert stats["cache_offline"] == len(qmt_crawler.PAGES)
+    assert stats["requests"] == 0
+
+
+def test_run_without_pages_is_finished(workdir, tmp_path_factory):
+    """没有下载到任何页面时运行也应正常结束，下次运行不被当作中断后续传"""
+    from crawl_journal import CrawlJournal
+    from local_mirror import serve
+
+    empty = tmp_path_factory.mktemp("empty")
+    with serve(docs_dir=empty) as base_url:
+        qmt_crawler.main(["--base-url", base_url, "--rate", "0", "--retries", "1"])
+
+    journal = CrawlJournal(workdir / qmt_crawler.JOURNAL_FILE)
+    try:
+        assert journal.begin() is False
+    finally:
+        journal.close()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""无序和有序列表项下代码块围栏的缩进"""
+
+import pytest
+
+from indent_code_blocks import indent_lines
+
+FENCE = "```"
+
+
+@pytest.mark.parametrize("lines", [
+    ["1. item", f"   {FENCE}py", "code", f"   {FENCE}", "text"],
+    ["- item", f"  {FENCE}py", "  code", f"  {FENCE}"],
+    ["10.  item", f"     {FENCE}", "     x", f"     {FENCE}"],
+    ["- a", "  1. b", f"     {FENCE}", "     x", f"     {FENCE}"],
+])
+def test_correct_fences_stay(lines):
+    assert list(indent_lines(lines)) == lines
+
+
+def test_fence_moves_to_ordered_item_content():
+    lines = ["1. item", f"{FENCE}py", "code", FENCE, "text"]
+    expected = ["1. item", f"   {FENCE}py", "   code", f"   {FENCE}", "text"]
+    assert list(indent_lines(lines)) == expected
+    assert list(indent_lines(expected)) == expected
+
+
+def test_dash_fence_item_content():
+    lines = ["1. item", "   - ```python", "x = 1", "```"]
+    assert list(indent_lines(lines)) == ["1. item", "   - ```python", "     x = 1", "     ```"]
+
+
+def test_less_indented_text_closes_item():
+    lines = ["1. item", "  note", FENCE, "x", FENCE]
+    assert list(indent_lines(lines)) == lines
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""后处理生成的文件"""
+
+import stat
+
+import doc_merkle
+import postprocess
+from md_common import file_mode
+
+DOC = """# 文档
+
+## 快速开始
+
+见[委托状态](#委托状态)。
+
+## 委托状态
+
+```python
+print("ok")
+```
+"""
+
+
+def test_outputs_are_readable(tmp_path):
+    source = tmp_path / "QMT_API_Documentation.md"
+    output = tmp_path / "QMT_API_Documentation_Format.md"
+    metrics = tmp_path / "metrics.json"
+
+    # 第二次运行时文档有变化，因此也会保留上一版的 merkle 树
+    for doc in (DOC, DOC + "\n## 新增\n"):
+        source.write_text(doc, encoding="utf-8")
+        postprocess.main([str(source), str(output), "--metrics", str(metrics), "--chunks", "--examples", "--site"])
+
+    assert output.read_text(encoding="utf-8") == postprocess.postprocess(doc)
+    assert doc_merkle.previous_tree_path(output).exists()
+    files = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert not [path for path in files if path.name.startswith(".")]
+    for path in files:
+        assert stat.S_IMODE(path.stat().st_mode) == file_mode(), path.relative_to(tmp_path)
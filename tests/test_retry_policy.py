@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""重试策略与熔断器：用假的 sleep / now 驱动，不真正等待"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import qmt_crawler
+import retry_policy
+from qmt_crawler import CrawlClient, download_image
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, retry_after_seconds, send_with_retry
+
+URL = "https://dict.thinktrader.net/nativeApi/start_now.html"
+HOST = "dict.thinktrader.net"
+
+
+class FakeResponse:
+    """只实现重试逻辑和 download_image 用到的部分"""
+
+    def __init__(self, status_code=200, headers=None, chunks=(), fail_after=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.chunks = list(chunks)
+        self.fail_after = fail_after
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("连接中途断开")
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Clock:
+    def __init__(self):
+        self.time = 1000.0
+        self.sleeps = []
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+
+def sender(*outcomes):
+    """依次返回响应或抛出异常的 send 函数"""
+    outcomes = list(outcomes)
+    calls = []
+
+    def send():
+        outcome = outcomes.pop(0)
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    send.calls = calls
+    return send
+
+
+@pytest.fixture
+def upper_bound(monkeypatch):
+    """抖动取上限，使退避时间确定"""
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda low, high: high)
+
+
+def test_backoff_doubles_up_to_max_delay(upper_bound):
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert [policy.backoff(attempt) for attempt in range(1, 6)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_backoff_is_jittered_within_bound():
+    policy = RetryPolicy(base_delay=2.0, max_delay=30.0)
+    delays = [policy.backoff(3) for _ in range(200)]
+    assert all(0 <= d <= 8.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_seconds_and_date():
+    now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    later = format_datetime(datetime(2024, 1, 1, 12, 0, 30, tzinfo=timezone.utc), usegmt=True)
+    assert retry_after_seconds("7") == 7.0
+    assert retry_after_seconds(later, now=now.timestamp()) == 30.0
+    assert retry_after_seconds(later, now=now.timestamp() + 60) == 0.0
+    assert retry_after_seconds("不是日期") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_retry_after_overrides_backoff(upper_bound):
+    policy = RetryPolicy(base_delay=1.0, max_retry_after=60.0)
+    assert policy.delay(1, FakeResponse(503, {"Retry-After": "12"})) == 12.0
+    assert policy.delay(1, FakeResponse(503, {"Retry-After": "600"})) is None
+    assert policy.delay(2, FakeResponse(503)) == 2.0
+
+
+def test_send_retries_statuses_and_errors(upper_bound):
+    clock = Clock()
+    counts = Counter()
+    first = FakeResponse(429, {"Retry-After": "3"})
+    send = sender(first, requests.ConnectionError("拒绝连接"), FakeResponse(200))
+
+    response = send_with_retry(send, URL, RetryPolicy(max_attempts=3, base_delay=1.0),
+                               count=lambda key, n=1: counts.update({key: n}), sleep=clock.sleep)
+
+    assert response.status_code == 200
+    assert clock.sleeps == [3.0, 2.0]
+    assert first.closed
+    assert counts == {"retries": 2, "retry_wait_ms": 5000}
+
+
+def test_send_returns_non_retryable_status_at_once():
+    clock = Clock()
+    send = sender(FakeResponse(404), FakeResponse(200))
+    assert send_with_retry(send, URL, RetryPolicy(), sleep=clock.sleep).status_code == 404
+    assert clock.sleeps == [] and len(send.calls) == 1
+
+
+def test_send_gives_up_after_max_attempts(upper_bound):
+    clock = Clock()
+    send = sender(FakeResponse(503), FakeResponse(503), FakeResponse(503))
+    assert send_with_retry(send, URL, RetryPolicy(max_attempts=3), sleep=clock.sleep).status_code == 503
+    assert len(clock.sleeps) == 2
+
+    send = sender(requests.Timeout("超时"), requests.Timeout("超时"))
+    with pytest.raises(requests.Timeout):
+        send_with_retry(send, URL, RetryPolicy(max_attempts=2), sleep=clock.sleep)
+
+
+def test_breaker_open_half_open_closed():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30.0, now=clock.now)
+
+    # 关闭：未达阈值前照常放行
+    assert not breaker.record_failure(HOST)
+    assert not breaker.record_failure(HOST)
+    assert breaker.allow(HOST)
+    # 打开：冷却期内拒绝
+    assert breaker.record_failure(HOST)
+    assert not breaker.allow(HOST)
+    clock.time += 29.0
+    assert not breaker.allow(HOST)
+    # 半开：冷却期过后只放行一个试探请求
+    clock.time += 1.0
+    assert breaker.allow(HOST)
+    assert not breaker.allow(HOST)
+    # 试探失败：重新打开并重新计时
+    assert breaker.record_failure(HOST)
+    assert not breaker.allow(HOST)
+    clock.time += 30.0
+    assert breaker.allow(HOST)
+    # 试探成功：关闭，失败计数清零
+    breaker.record_success(HOST)
+    assert breaker.allow(HOST) and breaker.allow(HOST)
+    assert not breaker.record_failure(HOST)
+    assert breaker.allow("other.example.com")
+
+
+def test_send_stops_when_circuit_opens(upper_bound):
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30.0, now=clock.now)
+    send = sender(FakeResponse(500), FakeResponse(500), FakeResponse(200))
+
+    with pytest.raises(CircuitOpenError):
+        send_with_retry(send, URL, RetryPolicy(max_attempts=5, base_delay=1.0), breaker, sleep=clock.sleep)
+    assert len(send.calls) == 2
+
+    # 冷却期过后的试探请求成功，熔断器恢复
+    clock.time += 30.0
+    send = sender(FakeResponse(200))
+    assert send_with_retry(send, URL, RetryPolicy(), breaker, sleep=clock.sleep).status_code == 200
+    assert breaker.allow(HOST)
+
+
+def test_read_failure_is_retried(upper_bound):
+    clock = Clock()
+    broken = FakeResponse(200, chunks=[b"ab", b"cd"], fail_after=1)
+    send = sender(broken, FakeResponse(200, chunks=[b"ab", b"cd"]))
+    bodies = []
+
+    def read(response):
+        bodies.append(b"".join(response.iter_content()))
+
+    response = send_with_retry(send, URL, RetryPolicy(max_attempts=2), sleep=clock.sleep, read=read)
+    assert response.status_code == 200
+    assert bodies == [b"abcd"]
+    assert broken.closed and len(clock.sleeps) == 1
+
+
+def test_download_image_retries_broken_body(workdir, monkeypatch):
+    """响应体中途断开的图片重新下载，保存完整内容且不留临时文件"""
+    qmt_crawler.ensure_dirs()
+    body = [b"\x89PNG\r\n\x1a\n", b"x" * 1000, b"y" * 1000]
+    responses = [
+        FakeResponse(200, {"Content-Type": "image/png"}, body, fail_after=2),
+        FakeResponse(200, {"Content-Type": "image/png", "Content-Length": str(sum(map(len, body)))}, body),
+    ]
+    client = CrawlClient(rate=0, retry=RetryPolicy(max_attempts=2, base_delay=0.0))
+    monkeypatch.setattr(client, "get", lambda url, **kwargs: responses.pop(0))
+
+    filename, size = download_image("https://example.com/a.png", client)
+
+    saved = workdir / qmt_crawler.IMAGES_DIR / filename
+    assert saved.read_bytes() == b"".join(body) and size == saved.stat().st_size
+    assert client.stats["retries"] == 1
+    assert not list(saved.parent.glob(".download-*"))
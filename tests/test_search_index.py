@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""搜索索引：标识符的排序和单个汉字的查询"""
+
+from search_index import SearchIndex, build_index
+
+DOC = """# 文档
+
+##### # 获取行情数据
+
+```python
+get_market_data(field_list=[], stock_list=[], period='1d', start_time='', end_time='', count=-1)
+```
+
+- 释义
+  - 从缓存获取行情数据，是主动获取行情的主要接口
+- 参数
+  - field_list - list 数据字段列表，传空则为全部字段
+  - stock_list - list 合约代码列表
+  - period - string 周期
+  - start_time - string 起始时间
+  - end_time - string 结束时间
+
+##### # 获取最新交易日k线数据
+
+```python
+get_full_kline(field_list=[], stock_list=[], period='1m')
+```
+
+- 参数
+  - 参考 `get_market_data`函数
+
+##### # 获取行情示例
+
+```python
+code_list = ['600000.SH', '000001.SZ']
+xtdata.subscribe_quote(code_list[0], period='1d', count=-1)
+data = xtdata.get_market_data(['close'], code_list, period='1d')
+print(data['close'].tail())
+```
+
+##### # 委托类型
+
+- 即时成交剩余撤销
+"""
+
+
+def search(tmp_path, query):
+    doc = tmp_path / "doc.md"
+    doc.write_text(DOC, encoding="utf-8")
+    stats = build_index(doc)
+    with SearchIndex(stats["path"]) as index:
+        return [index.section(sid)[0] for _score, sid in index.search(query)]
+
+
+def test_defining_section_ranks_first(tmp_path):
+    assert search(tmp_path, "get_market_data")[0] == "获取行情数据"
+
+
+def test_identifier_parts_still_match(tmp_path):
+    assert "获取行情示例" in search(tmp_path, "market")
+
+
+def test_single_cjk_character_matches_inside_bigrams(tmp_path):
+    # 二元词 "余撤"、"撤销"："销" 只出现在词尾，"撤" 既在词首也在词尾
+    assert search(tmp_path, "销") == ["委托类型"]
+    assert search(tmp_path, "撤") == ["委托类型"]
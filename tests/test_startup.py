@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+各子命令的导入耗时预算
+
+在子进程中用 python -X importtime 测量（见 qmt_docs.measure_startup），任一子命令超出
+STARTUP_BUDGETS_MS 或在导入阶段加载了 FORBIDDEN_IMPORTS 中的模块时失败。
+较慢的机器上可以用环境变量 QMT_STARTUP_SCALE 放宽预算（例如 2）。
+"""
+
+import os
+
+import pytest
+
+from qmt_docs import STARTUP_BUDGETS_MS, forbidden_imports, measure_startup
+
+SCALE = float(os.environ.get("QMT_STARTUP_SCALE", "1"))
+
+
+@pytest.mark.parametrize("command", list(STARTUP_BUDGETS_MS))
+def test_startup_budget(command):
+    elapsed, modules = measure_startup(command, repeat=3)
+    assert forbidden_imports(command, modules) == []
+    budget = STARTUP_BUDGETS_MS[command] * SCALE
+    assert elapsed <= budget, f"{command}: 导入耗时 {elapsed:.1f} ms，超出预算 {budget:.0f} ms"
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""静态站点的标题 id、页内链接和搜索"""
+
+import html
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from search_index import SearchIndex, build_index
+from static_site import ASSETS, SCRIPT, Renderer, build_site
+
+DOC = """# 文档
+
+## 目录
+
+- [快速开始](#快速开始)
+- [XtQuant.XtData 行情模块](#XtQuantXtData-行情模块)
+
+## 快速开始
+
+见[指定session id范围连接交易](#-指定session id范围连接交易)。
+
+## XtQuant.XtData 行情模块
+
+##### # 指定session id范围连接交易
+
+参见[委托状态](#-委托状态(order_status))
+
+###### # 委托状态(order_status)
+
+| 值 | 含义 |
+| --- | --- |
+| 48 | 未报 |
+"""
+
+
+def test_link_with_space_and_matching_heading_id():
+    renderer = Renderer()
+    link = renderer.inline("[指定session id范围连接交易](#-指定session id范围连接交易)")
+    assert link == '<a href="#-指定session-id范围连接交易">指定session id范围连接交易</a>'
+    heading = renderer.heading("##### # 指定session id范围连接交易")
+    assert 'id="-指定session-id范围连接交易"' in heading
+
+
+def test_every_internal_link_resolves(tmp_path):
+    doc = tmp_path / "doc.md"
+    doc.write_text(DOC, encoding="utf-8")
+    out_dir = tmp_path / "site"
+    build_site(doc, out_dir, workers=1)
+
+    pages = {p.name: p.read_text(encoding="utf-8") for p in out_dir.glob("*.html")}
+    ids = {name: set(re.findall(r' id="([^"]*)"', text)) for name, text in pages.items()}
+    checked = 0
+    for name, text in pages.items():
+        assert "](#" not in text, name
+        for href in re.findall(r'<a href="([^"]*)"', text):
+            page, _, fragment = html.unescape(href).partition("#")
+            page = page or name
+            assert page in pages, (name, href)
+            if fragment:
+                assert fragment in ids[page], (name, href)
+                checked += 1
+    assert checked >= 4
+
+
+SEARCH_DOC = """# 文档
+
+## 委托状态
+
+委托的当前状态。
+
+## 账号状态
+
+账号是否可用。
+
+## 成交数量
+
+本次成交的数量。
+"""
+
+
+def site_search(out_dir, query):
+    """站点搜索框对查询显示的标题（用 node 运行 site.js 中的 search()）"""
+    [search_json] = (out_dir / ASSETS).glob("search.*.json")
+    # 取加载状态与 DOM 事件处理之间的部分：tokenize()、load()、postings()、search()
+    functions = SCRIPT[SCRIPT.index("  var TOKEN"):SCRIPT.index("  function show()")]
+    script = (f"var index = {search_json.read_text(encoding='utf-8')};\n{functions}\n"
+              f"console.log(JSON.stringify(search({json.dumps(query)}).map(function (id) {{ return index.pages[id][1]; }})));")
+    result = subprocess.run(["node"], input=script, capture_output=True, text=True, encoding="utf-8", check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="未安装 node")
+@pytest.mark.parametrize("query, titles", [
+    ("态", {"委托状态", "账号状态"}),   # 只作为二元词的第二个字出现
+    ("状", {"委托状态", "账号状态"}),
+    ("成交", {"成交数量"}),
+])
+def test_site_search_matches_cli(tmp_path, query, titles):
+    doc = tmp_path / "doc.md"
+    doc.write_text(SEARCH_DOC, encoding="utf-8")
+    out_dir = tmp_path / "site"
+    build_site(doc, out_dir, workers=1)
+    with SearchIndex(build_index(doc)["path"]) as index:
+        found = {index.section(sid)[0] for _score, sid in index.search(query, limit=100)}
+
+    assert found == titles
+    assert set(site_search(out_dir, query)) == titles